@@ -331,6 +331,9 @@ resource "aws_lambda_function" "log_processor" {
       ENVIRONMENT = var.environment
       SNS_TOPIC_ARN = var.security_sns_topic_arn
       ELASTICSEARCH_ENDPOINT = var.elasticsearch_endpoint
+      ALERT_STATE_PATH = "/tmp/alert_state.json"
+      BRUTE_FORCE_STATE_PATH = "/tmp/brute_force_state.json"
+      THREAT_INTEL_CACHE_PATH = "/tmp/threat_intel.qbti"
     }
   }
 
@@ -350,6 +353,70 @@ data "archive_file" "log_processor_zip" {
     })
     filename = "lambda_function.py"
   }
+  source {
+    content  = file("${path.module}/lambda/alert_aggregator.py")
+    filename = "alert_aggregator.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/analysis_cache.py")
+    filename = "analysis_cache.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/archive_sink.py")
+    filename = "archive_sink.py"
+  }
+  source {
+    content  = file("${path.module}/../../shared/lambda/aws_clients.py")
+    filename = "aws_clients.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/brute_force.py")
+    filename = "brute_force.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/cloudwatch_payload.py")
+    filename = "cloudwatch_payload.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/elasticsearch_bulk.py")
+    filename = "elasticsearch_bulk.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/event_buffer.py")
+    filename = "event_buffer.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/event_records.py")
+    filename = "event_records.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/event_sampler.py")
+    filename = "event_sampler.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/parallel_analysis.py")
+    filename = "parallel_analysis.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/pipeline_metrics.py")
+    filename = "pipeline_metrics.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/rollups.py")
+    filename = "rollups.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/rule_packs.py")
+    filename = "rule_packs.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/sink_fanout.py")
+    filename = "sink_fanout.py"
+  }
+  source {
+    content  = file("${path.module}/lambda/threat_intel.py")
+    filename = "threat_intel.py"
+  }
 }
 
 # Lambda Permission for CloudWatch Logs
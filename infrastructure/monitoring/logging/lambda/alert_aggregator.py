@@ -0,0 +1,195 @@
+# """
+# Alert aggregation for security notifications
+# Groups alert events by fingerprint and suppresses repeats within a window
+# """
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from brute_force import counter_key
+
+logger = logging.getLogger()
+
+DEFAULT_WINDOW_SECONDS = 300
+DEFAULT_MAX_FINGERPRINTS = 10000
+
+STATE_VERSION = 1
+
+
+def fingerprint(event):
+    #    """
+    #    Identify repeats of an alert by finding type, source IP and log group
+    #    """
+    findings = event.get("security_findings") or [{"type": "unknown"}]
+    # JSON logs can set fields to any type; keys must be hashable, and one
+    # unhashable key would otherwise lose every alert in the batch
+    return (
+        counter_key(findings[0]["type"]),
+        counter_key(event.get("ip_address", "unknown")),
+        counter_key(event.get("log_group", "unknown")),
+    )
+
+
+class AlertAggregator:
+    #    """
+    #    Decide which digests to publish for a stream of alert events
+    #    """
+
+    def __init__(
+        self,
+        window_seconds=DEFAULT_WINDOW_SECONDS,
+        max_fingerprints=DEFAULT_MAX_FINGERPRINTS,
+        state_path=None,
+        clock=time.time,
+    ):
+        self.window_seconds = window_seconds
+        self.max_fingerprints = max_fingerprints
+        self.state_path = state_path
+        self.clock = clock
+        self.window_start = None
+        # fingerprint -> group summary for the current window
+        self.groups = OrderedDict()
+
+        if state_path:
+            self.load_state()
+
+    @classmethod
+    def from_environment(cls):
+        #    """
+        #    Create an aggregator configured from ALERT_* environment variables
+        #    """
+        return cls(
+            window_seconds=int(
+                os.environ.get("ALERT_WINDOW_SECONDS", DEFAULT_WINDOW_SECONDS)
+            ),
+            max_fingerprints=int(
+                os.environ.get("ALERT_MAX_FINGERPRINTS", DEFAULT_MAX_FINGERPRINTS)
+            ),
+            state_path=os.environ.get("ALERT_STATE_PATH") or None,
+        )
+
+    def add(self, events):
+        #    """
+        #    Record alert events and return the digests that should be published
+        #    """
+        now = self.clock()
+        digests = []
+
+        summary = self._close_expired_window(now)
+        if summary is not None:
+            digests.append(summary)
+        if self.window_start is None:
+            self.window_start = now
+
+        new_groups = OrderedDict()
+        for event in events:
+            key = fingerprint(event)
+            group = self.groups.get(key)
+            if group is None:
+                if len(self.groups) >= self.max_fingerprints:
+                    self.groups.popitem(last=False)
+                group = self.groups[key] = {
+                    "finding_type": key[0],
+                    "ip_address": key[1],
+                    "log_group": key[2],
+                    "count": 0,
+                    "suppressed": 0,
+                    "first_seen": event.get("timestamp"),
+                    "last_seen": event.get("timestamp"),
+                    "sample": event.get("message", "")[:200],
+                }
+                new_groups[key] = group
+            elif key not in new_groups:
+                group["suppressed"] += 1
+            group["count"] += 1
+            group["last_seen"] = event.get("timestamp")
+
+        # Fingerprints first seen in this window are alerted right away;
+        # repeats are only counted until the window closes
+        if new_groups:
+            digests.append(self._digest("new", list(new_groups.values())))
+
+        if self.state_path:
+            self.save_state()
+        return digests
+
+    def flush(self):
+        #    """
+        #    Close the current window if it has expired and return its summary digests
+        #    """
+        summary = self._close_expired_window(self.clock())
+        if summary is not None and self.state_path:
+            self.save_state()
+        return [summary] if summary is not None else []
+
+    def _close_expired_window(self, now):
+        #    """
+        #    Start a new window once the current one has passed, summarising repeats
+        #    """
+        if self.window_start is None or now - self.window_start < self.window_seconds:
+            return None
+
+        repeated = [group for group in self.groups.values() if group["suppressed"]]
+        summary = self._digest("summary", repeated) if repeated else None
+        self.window_start = None
+        self.groups = OrderedDict()
+        return summary
+
+    def _digest(self, kind, groups):
+        return {
+            "kind": kind,
+            "window_start": self.window_start,
+            "window_seconds": self.window_seconds,
+            "events": sum(group["count"] for group in groups),
+            "groups": [dict(group) for group in groups],
+        }
+
+    def save_state(self):
+        #    """
+        #    Atomically write the current window to the state file
+        #    """
+        state = {
+            "version": STATE_VERSION,
+            "window_seconds": self.window_seconds,
+            "window_start": self.window_start,
+            "groups": list(self.groups.values()),
+        }
+        temporary_path = f"{self.state_path}.tmp"
+        try:
+            with open(temporary_path, "w") as state_file:
+                json.dump(state, state_file, separators=(",", ":"))
+            os.replace(temporary_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Could not save alert state: {str(e)}")
+
+    def load_state(self):
+        #    """
+        #    Restore the current window from the state file when it matches
+        #    """
+        try:
+            with open(self.state_path) as state_file:
+                state = json.load(state_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable alert state: {str(e)}")
+            return
+
+        if (
+            state.get("version") != STATE_VERSION
+            or state.get("window_seconds") != self.window_seconds
+        ):
+            logger.info("Ignoring alert state with a different window")
+            return
+
+        self.window_start = state.get("window_start")
+        self.groups = OrderedDict(
+            (
+                (group["finding_type"], group["ip_address"], group["log_group"]),
+                group,
+            )
+            for group in state.get("groups", [])[-self.max_fingerprints :]
+        )
@@ -0,0 +1,109 @@
+# """
+# Bounded cache of security pattern findings for repeated identical messages
+# """
+
+import os
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+
+# Longer messages are analyzed every time, so the cache holds at most
+# max_entries * max_message_length characters of keys
+DEFAULT_MAX_MESSAGE_LENGTH = 2048
+
+
+class AnalysisCache:
+    #    """
+    #    LRU cache in front of an analyze(message) -> findings function
+    #    """
+
+    def __init__(
+        self,
+        analyze,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        max_message_length=DEFAULT_MAX_MESSAGE_LENGTH,
+    ):
+        self._analyze = analyze
+        self.max_entries = max_entries
+        self.max_message_length = max_message_length
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # Hashes of messages seen once. Findings are only cached on the
+        # second sighting, so a flood of unique lines cannot evict the
+        # repeated ones; the set is cleared when it reaches max_entries.
+        self._seen_once = set()
+
+    @classmethod
+    def from_environment(cls, analyze):
+        #    """
+        #    Create a cache configured from ANALYSIS_CACHE_* environment variables
+        #    """
+        return cls(
+            analyze,
+            max_entries=int(
+                os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+            ),
+            max_message_length=int(
+                os.environ.get(
+                    "ANALYSIS_CACHE_MAX_MESSAGE_LENGTH", DEFAULT_MAX_MESSAGE_LENGTH
+                )
+            ),
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def analyze(self, message):
+        #    """
+        #    Return findings for message, from the cache when it was seen before
+        #    """
+        entries = self._entries
+        findings = entries.get(message)
+        if findings is not None:
+            entries.move_to_end(message)
+            self.hits += 1
+            return list(findings)
+
+        self.misses += 1
+        findings = self._analyze(message)
+        if self.max_entries <= 0 or len(message) > self.max_message_length:
+            return findings
+
+        key = hash(message)
+        if key in self._seen_once:
+            self._seen_once.discard(key)
+            entries[message] = tuple(findings)
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            if len(self._seen_once) >= self.max_entries:
+                self._seen_once.clear()
+            self._seen_once.add(key)
+        return findings
+
+    def clear(self):
+        #    """
+        #    Drop cached findings, e.g. after the patterns change
+        #    """
+        self._entries.clear()
+        self._seen_once.clear()
+
+    def set_analyzer(self, analyze):
+        #    """
+        #    Analyze with a new function, dropping findings cached from the old one
+        #    """
+        self._analyze = analyze
+        self.clear()
+
+    def counters(self):
+        #    """
+        #    Cumulative hit, miss and eviction counts
+        #    """
+        return {
+            "analysis_cache_hits": self.hits,
+            "analysis_cache_misses": self.misses,
+            "analysis_cache_evictions": self.evictions,
+        }
@@ -0,0 +1,204 @@
+# """
+# Columnar archive of processed security events for election audits
+# Writes Parquet or Arrow IPC files partitioned by environment, log group and month
+# """
+
+import json
+import logging
+import os
+import time
+import uuid
+from urllib.parse import quote
+
+logger = logging.getLogger()
+
+DEFAULT_FORMAT = "parquet"
+DEFAULT_ROW_GROUP_SIZE = 10000
+DEFAULT_COMPRESSION = "zstd"
+
+FILE_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Low-cardinality columns are dictionary encoded in memory and on disk
+DICTIONARY_COLUMNS = (
+    "log_group",
+    "level",
+    "user",
+    "ip_address",
+    "severity",
+    "threat_type",
+    "rule_pack",
+)
+
+
+def _text(value):
+    #    """
+    #    String column value for a field that JSON logs may set to any type
+    #    """
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _schema(pa):
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [
+            ("timestamp", pa.timestamp("us")),
+            ("log_group", dictionary),
+            ("level", dictionary),
+            ("user", dictionary),
+            ("ip_address", dictionary),
+            ("user_agent", pa.string()),
+            ("message", pa.string()),
+            ("finding_types", pa.list_(dictionary)),
+            ("matched_text", pa.list_(pa.string())),
+            ("severity", dictionary),
+            ("risk_score", pa.int16()),
+            ("threat_type", dictionary),
+            ("rule_pack", dictionary),
+        ]
+    )
+
+
+class ArchiveSink:
+    #    """
+    #    Write batches of security events as columnar files under a root directory
+    #    """
+
+    def __init__(
+        self,
+        root,
+        environment,
+        file_format=DEFAULT_FORMAT,
+        row_group_size=DEFAULT_ROW_GROUP_SIZE,
+        compression=DEFAULT_COMPRESSION,
+    ):
+        if file_format not in FILE_EXTENSIONS:
+            raise ValueError(f"Unsupported archive format: {file_format}")
+        self.root = root
+        self.environment = environment
+        self.file_format = file_format
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.files_written = 0
+        self.rows_written = 0
+
+    @classmethod
+    def from_environment(cls):
+        #    """
+        #    Create a sink configured from ARCHIVE_* environment variables, or
+        #    None when no archive directory is configured
+        #    """
+        root = os.environ.get("ARCHIVE_PATH")
+        if not root:
+            return None
+        return cls(
+            root,
+            os.environ.get("ENVIRONMENT", "unknown"),
+            file_format=os.environ.get("ARCHIVE_FORMAT", DEFAULT_FORMAT).lower(),
+            row_group_size=int(
+                os.environ.get("ARCHIVE_ROW_GROUP_SIZE", DEFAULT_ROW_GROUP_SIZE)
+            ),
+            compression=os.environ.get("ARCHIVE_COMPRESSION", DEFAULT_COMPRESSION),
+        )
+
+    def partition_dir(self, log_group, month):
+        #    """
+        #    Hive-style directory for one environment, log group and month
+        #    """
+        return os.path.join(
+            self.root,
+            f"environment={quote(self.environment, safe='')}",
+            f"log_group={quote(log_group, safe='')}",
+            f"month={month}",
+        )
+
+    def write(self, events):
+        #    """
+        #    Write events into one new file per partition and return the paths
+        #    """
+        partitions = {}
+        for event in events:
+            key = (event.get("log_group", "unknown"), event.get("timestamp", "")[:7])
+            partitions.setdefault(key, []).append(event)
+
+        paths = []
+        for (log_group, month), partition_events in partitions.items():
+            paths.append(
+                self._write_file(
+                    self.partition_dir(log_group, month or "unknown"), partition_events
+                )
+            )
+        return paths
+
+    def _write_file(self, directory, events):
+        #    """
+        #    Write one file atomically, split into row groups of row_group_size
+        #    """
+        import pyarrow as pa
+
+        table = self.to_table(events)
+        os.makedirs(directory, exist_ok=True)
+        name = (
+            f"part-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-"
+            f"{uuid.uuid4().hex[:12]}{FILE_EXTENSIONS[self.file_format]}"
+        )
+        path = os.path.join(directory, name)
+        temp_path = os.path.join(directory, f".{name}.tmp")
+
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(
+                table,
+                temp_path,
+                row_group_size=self.row_group_size,
+                compression=self.compression,
+                use_dictionary=list(DICTIONARY_COLUMNS) + ["finding_types"],
+            )
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            with pa.OSFile(temp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                    writer.write_table(table, max_chunksize=self.row_group_size)
+
+        # Readers listing the partition never see a partly written file
+        os.replace(temp_path, path)
+        self.files_written += 1
+        self.rows_written += table.num_rows
+        return path
+
+    def to_table(self, events):
+        #    """
+        #    Convert security events into an Arrow table with the archive schema
+        #    """
+        import pyarrow as pa
+
+        columns = {name: [] for name in _schema(pa).names}
+        for event in events:
+            findings = event.get("security_findings", [])
+            threat = event.get("threat_intelligence")
+            columns["timestamp"].append(event.get("timestamp"))
+            # One non-string field would make Arrow reject the whole table
+            columns["log_group"].append(_text(event.get("log_group")))
+            columns["level"].append(_text(event.get("level")))
+            columns["user"].append(_text(event.get("user")))
+            columns["ip_address"].append(_text(event.get("ip_address")))
+            columns["user_agent"].append(_text(event.get("user_agent")))
+            columns["message"].append(_text(event.get("message")))
+            columns["finding_types"].append([f["type"] for f in findings])
+            columns["matched_text"].append(
+                [_text(f.get("matched_text")) for f in findings]
+            )
+            columns["severity"].append(_text(event.get("severity")))
+            columns["risk_score"].append(event.get("risk_score"))
+            columns["threat_type"].append(
+                _text(threat["threat_type"]) if threat else None
+            )
+            columns["rule_pack"].append(_text(event.get("rule_pack")))
+
+        # ISO timestamp strings are parsed by Arrow in one vectorised cast
+        columns["timestamp"] = pa.array(columns["timestamp"], pa.string()).cast(
+            pa.timestamp("us")
+        )
+        return pa.Table.from_pydict(columns, schema=_schema(pa))
@@ -0,0 +1,249 @@
+# """
+# Sliding-window brute-force detection across log batches
+# Counts failed authentication findings per IP and per user with bounded memory
+# """
+
+import json
+import logging
+import os
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger()
+
+DEFAULT_WINDOW_SECONDS = 300
+DEFAULT_BUCKET_SECONDS = 10
+DEFAULT_IP_THRESHOLD = 20
+DEFAULT_USER_THRESHOLD = 10
+DEFAULT_MAX_KEYS = 50000
+DEFAULT_SNAPSHOT_INTERVAL_SECONDS = 60
+
+SNAPSHOT_VERSION = 1
+
+
+class SlidingWindowCounter:
+    #    """
+    #    Per-key event counts over a sliding window, evicting least recently seen keys
+    #    """
+
+    def __init__(self, window_seconds, bucket_seconds, max_keys):
+        self.bucket_seconds = bucket_seconds
+        self.size = max(1, -(-window_seconds // bucket_seconds))
+        self.max_keys = max_keys
+        self.evictions = 0
+        # key -> [newest bucket number, ring of per-bucket counts]
+        self.keys = OrderedDict()
+
+    def add(self, key, timestamp_seconds, count=1):
+        #    """
+        #    Record count events for key and return its total within the window
+        #    """
+        bucket = int(timestamp_seconds // self.bucket_seconds)
+        state = self.keys.get(key)
+
+        if state is None:
+            if len(self.keys) >= self.max_keys:
+                self.keys.popitem(last=False)
+                self.evictions += 1
+            state = [bucket, array("I", bytes(4 * self.size))]
+            self.keys[key] = state
+        else:
+            self.keys.move_to_end(key)
+
+        newest, counts = state
+        if bucket > newest:
+            # Clear buckets that slid out of the window since the last event
+            if bucket - newest >= self.size:
+                counts[:] = array("I", bytes(4 * self.size))
+            else:
+                for expired in range(newest + 1, bucket + 1):
+                    counts[expired % self.size] = 0
+            state[0] = bucket
+        elif bucket <= newest - self.size:
+            # Older than the window; late events do not count
+            return sum(counts)
+
+        counts[bucket % self.size] += count
+        return sum(counts)
+
+    def total(self, key, timestamp_seconds):
+        #    """
+        #    Return the count for key within the window ending at timestamp_seconds
+        #    """
+        state = self.keys.get(key)
+        if state is None:
+            return 0
+
+        bucket = int(timestamp_seconds // self.bucket_seconds)
+        newest, counts = state
+        # Only buckets inside both the requested window and the ring are live
+        first = max(bucket, newest) - self.size + 1
+        return sum(counts[b % self.size] for b in range(first, min(bucket, newest) + 1))
+
+    def to_dict(self):
+        return {key: [newest, list(counts)] for key, (newest, counts) in self.keys.items()}
+
+    def load_dict(self, data):
+        self.keys = OrderedDict(
+            (key, [newest, array("I", counts)])
+            for key, (newest, counts) in data.items()
+            if len(counts) == self.size
+        )
+        while len(self.keys) > self.max_keys:
+            self.keys.popitem(last=False)
+
+
+def counter_key(value):
+    #    """
+    #    Hashable, snapshot-safe key for a field that JSON logs may set to any type
+    #    """
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return "unknown"
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class BruteForceDetector:
+    #    """
+    #    Track failed logins per IP and per user and flag keys over threshold
+    #    """
+
+    def __init__(
+        self,
+        window_seconds=DEFAULT_WINDOW_SECONDS,
+        bucket_seconds=DEFAULT_BUCKET_SECONDS,
+        ip_threshold=DEFAULT_IP_THRESHOLD,
+        user_threshold=DEFAULT_USER_THRESHOLD,
+        max_keys=DEFAULT_MAX_KEYS,
+        state_path=None,
+        snapshot_interval=DEFAULT_SNAPSHOT_INTERVAL_SECONDS,
+    ):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.ip_threshold = ip_threshold
+        self.user_threshold = user_threshold
+        self.state_path = state_path
+        self.snapshot_interval = snapshot_interval
+        self.ip_counter = SlidingWindowCounter(window_seconds, bucket_seconds, max_keys)
+        self.user_counter = SlidingWindowCounter(window_seconds, bucket_seconds, max_keys)
+        self.last_snapshot = 0.0
+        self.dirty = False
+
+        if state_path:
+            self.load_snapshot()
+
+    @classmethod
+    def from_environment(cls):
+        #    """
+        #    Create a detector configured from BRUTE_FORCE_* environment variables
+        #    """
+        return cls(
+            window_seconds=int(
+                os.environ.get("BRUTE_FORCE_WINDOW_SECONDS", DEFAULT_WINDOW_SECONDS)
+            ),
+            bucket_seconds=int(
+                os.environ.get("BRUTE_FORCE_BUCKET_SECONDS", DEFAULT_BUCKET_SECONDS)
+            ),
+            ip_threshold=int(
+                os.environ.get("BRUTE_FORCE_IP_THRESHOLD", DEFAULT_IP_THRESHOLD)
+            ),
+            user_threshold=int(
+                os.environ.get("BRUTE_FORCE_USER_THRESHOLD", DEFAULT_USER_THRESHOLD)
+            ),
+            max_keys=int(os.environ.get("BRUTE_FORCE_MAX_KEYS", DEFAULT_MAX_KEYS)),
+            state_path=os.environ.get("BRUTE_FORCE_STATE_PATH") or None,
+            snapshot_interval=int(
+                os.environ.get(
+                    "BRUTE_FORCE_SNAPSHOT_INTERVAL_SECONDS",
+                    DEFAULT_SNAPSHOT_INTERVAL_SECONDS,
+                )
+            ),
+        )
+
+    def observe(self, security_events):
+        #    """
+        #    Count brute-force findings and annotate those events with window totals
+        #    """
+        for event in security_events:
+            if not any(f["type"] == "brute_force" for f in event["security_findings"]):
+                continue
+
+            timestamp = datetime.fromisoformat(event["timestamp"]).timestamp()
+            ip_address = counter_key(event.get("ip_address", "unknown"))
+            user = counter_key(event.get("user", "unknown"))
+
+            ip_attempts = (
+                self.ip_counter.add(ip_address, timestamp)
+                if ip_address != "unknown"
+                else 0
+            )
+            user_attempts = (
+                self.user_counter.add(user, timestamp) if user != "unknown" else 0
+            )
+            threshold_exceeded = (
+                ip_attempts >= self.ip_threshold or user_attempts >= self.user_threshold
+            )
+
+            event["brute_force"] = {
+                "ip_attempts": ip_attempts,
+                "user_attempts": user_attempts,
+                "window_seconds": self.window_seconds,
+                "threshold_exceeded": threshold_exceeded,
+            }
+            if threshold_exceeded:
+                event["severity"] = "HIGH"
+            self.dirty = True
+
+        if self.state_path and self.dirty:
+            if time.time() - self.last_snapshot >= self.snapshot_interval:
+                self.save_snapshot()
+
+        return security_events
+
+    def save_snapshot(self):
+        #    """
+        #    Atomically write counter state to the snapshot file
+        #    """
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "bucket_seconds": self.bucket_seconds,
+            "buckets": self.ip_counter.size,
+            "ip": self.ip_counter.to_dict(),
+            "user": self.user_counter.to_dict(),
+        }
+        temporary_path = f"{self.state_path}.tmp"
+        try:
+            with open(temporary_path, "w") as snapshot_file:
+                json.dump(snapshot, snapshot_file, separators=(",", ":"))
+            os.replace(temporary_path, self.state_path)
+            self.last_snapshot = time.time()
+            self.dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save brute-force state: {str(e)}")
+
+    def load_snapshot(self):
+        #    """
+        #    Restore counter state from the snapshot file when it matches this layout
+        #    """
+        try:
+            with open(self.state_path) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable brute-force state: {str(e)}")
+            return
+
+        if (
+            snapshot.get("version") != SNAPSHOT_VERSION
+            or snapshot.get("bucket_seconds") != self.bucket_seconds
+            or snapshot.get("buckets") != self.ip_counter.size
+        ):
+            logger.info("Ignoring brute-force state with a different window layout")
+            return
+
+        self.ip_counter.load_dict(snapshot.get("ip", {}))
+        self.user_counter.load_dict(snapshot.get("user", {}))
@@ -0,0 +1,214 @@
+# """
+# Streaming decoder for CloudWatch Logs subscription payloads
+# Decodes base64, gunzips and parses logEvents incrementally in bounded chunks
+# """
+
+import binascii
+import codecs
+import json
+import time
+import zlib
+
+# Base64 chunks must be a multiple of 4 characters to decode independently
+BASE64_CHUNK_SIZE = 64 * 1024
+DECOMPRESS_CHUNK_SIZE = 256 * 1024
+
+_WHITESPACE = json.decoder.WHITESPACE
+_decoder = json.JSONDecoder()
+
+
+def iter_decompressed_chunks(data, chunk_size=BASE64_CHUNK_SIZE):
+    #    """
+    #    Yield gunzipped bytes of a base64-encoded gzip payload chunk by chunk
+    #    """
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+    for offset in range(0, len(data), chunk_size):
+        compressed = binascii.a2b_base64(data[offset : offset + chunk_size])
+        while compressed:
+            chunk = decompressor.decompress(compressed, DECOMPRESS_CHUNK_SIZE)
+            if chunk:
+                yield chunk
+            compressed = decompressor.unconsumed_tail
+
+    chunk = decompressor.flush()
+    if chunk:
+        yield chunk
+    if not decompressor.eof:
+        raise ValueError("Truncated gzip payload")
+
+
+def iter_log_events(data, header, chunk_size=BASE64_CHUNK_SIZE, metrics=None):
+    #    """
+    #    Yield logEvents from an awslogs.data payload while filling header fields,
+    #    recording decode time and decompressed bytes in metrics if given
+    #    """
+    parser = _PayloadParser(header)
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    clock = time.perf_counter
+
+    started = clock()
+    for chunk in iter_decompressed_chunks(data, chunk_size):
+        events = parser.feed(text_decoder.decode(chunk))
+        if metrics is not None:
+            metrics.add_time("decode", clock() - started)
+            metrics.increment("bytes_decoded", len(chunk))
+        yield from events
+        started = clock()
+
+    events = parser.feed(text_decoder.decode(b"", final=True), final=True)
+    if metrics is not None:
+        metrics.add_time("decode", clock() - started)
+    yield from events
+
+
+class _PayloadParser:
+    #    """
+    #    Incremental parser for the top-level subscription document
+    #    """
+
+    def __init__(self, header):
+        self.header = header
+        self.buffer = ""
+        self.pos = 0
+        self.state = "start"
+        self.key = None
+        # Events seen before logGroup are held back so callers can rely on it
+        self.pending = []
+
+    def feed(self, text, final=False):
+        #    """
+        #    Consume decoded text and return the log events completed by it
+        #    """
+        if self.pos > len(self.buffer) // 2:
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+        self.buffer += text
+
+        events = []
+        while self._step(events, final):
+            pass
+
+        if final:
+            if self.state != "done":
+                raise ValueError("Truncated CloudWatch Logs payload")
+            events.extend(self.pending)
+            self.pending = []
+        elif "logGroup" not in self.header:
+            self.pending.extend(events)
+            return []
+        elif self.pending:
+            events = self.pending + events
+            self.pending = []
+        return events
+
+    def _skip_whitespace(self):
+        self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+        return self.pos < len(self.buffer)
+
+    def _decode_value(self, final):
+        #    """
+        #    Decode the next complete JSON value, or return None when more text is needed
+        #    """
+        try:
+            value, end = _decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        # A number running to the end of the buffer may continue in the next chunk
+        if end == len(self.buffer) and not final:
+            return None
+        self.pos = end
+        return (value,)
+
+    def _read_events(self, events, final):
+        #    """
+        #    Decode as many complete array elements as the buffer holds
+        #    """
+        buffer = self.buffer
+        pos = self.pos
+        end_of_buffer = len(buffer)
+        match_whitespace = _WHITESPACE.match
+        raw_decode = _decoder.raw_decode
+        append = events.append
+
+        try:
+            while pos < end_of_buffer:
+                char = buffer[pos]
+                if char == ",":
+                    pos = match_whitespace(buffer, pos + 1).end()
+                    continue
+                if char == "]":
+                    pos += 1
+                    self.state = "key"
+                    return True
+                if char in " \t\n\r":
+                    pos = match_whitespace(buffer, pos).end()
+                    continue
+                try:
+                    value, end = raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    return False
+                if end == end_of_buffer and not final:
+                    return False
+                append(value)
+                pos = end
+            return False
+        finally:
+            self.pos = pos
+
+    def _step(self, events, final):
+        #    """
+        #    Advance the parser by one token, returning False when input is exhausted
+        #    """
+        if self.state == "done" or not self._skip_whitespace():
+            return False
+
+        char = self.buffer[self.pos]
+
+        if self.state == "start":
+            if char != "{":
+                raise ValueError("CloudWatch Logs payload is not a JSON object")
+            self.pos += 1
+            self.state = "key"
+
+        elif self.state == "key":
+            if char == "}":
+                self.pos += 1
+                self.state = "done"
+                return True
+            if char == ",":
+                self.pos += 1
+                return True
+            decoded = self._decode_value(final)
+            if decoded is None:
+                return False
+            self.key = decoded[0]
+            self.state = "colon"
+
+        elif self.state == "colon":
+            if char != ":":
+                raise ValueError("Malformed CloudWatch Logs payload")
+            self.pos += 1
+            self.state = "events_start" if self.key == "logEvents" else "value"
+
+        elif self.state == "value":
+            decoded = self._decode_value(final)
+            if decoded is None:
+                return False
+            self.header[self.key] = decoded[0]
+            self.state = "key"
+
+        elif self.state == "events_start":
+            if char != "[":
+                raise ValueError("logEvents is not a JSON array")
+            self.pos += 1
+            self.state = "events"
+
+        elif self.state == "events":
+            return self._read_events(events, final)
+
+        return True
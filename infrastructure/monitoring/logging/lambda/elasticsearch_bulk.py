@@ -0,0 +1,275 @@
+# """
+# Bulk indexing client for shipping security events to Elasticsearch
+# Streams NDJSON into gzip-compressed _bulk requests over a pooled connection
+# """
+
+import http.client
+import json
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+from event_records import to_document
+
+logger = logging.getLogger()
+
+DEFAULT_MAX_BATCH_BYTES = 5 * 1024 * 1024
+DEFAULT_MAX_BATCH_DOCS = 1000
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 0.2
+DEFAULT_TIMEOUT_SECONDS = 10
+
+# Statuses worth retrying, for the whole request or for individual items
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Only per-item status and error type are needed to decide on retries
+BULK_PATH = "/_bulk?filter_path=errors,items.*.status,items.*.error.type"
+
+# Errors raised when a pooled keep-alive connection was closed by the server
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+# Connections live for the whole execution environment so warm invocations
+# skip the TCP and TLS handshakes; each thread has its own, since an HTTP
+# connection carries one request at a time
+_connection_pool = {}
+
+
+def parse_endpoint(endpoint):
+    #    """
+    #    Split an endpoint into scheme, host and port, defaulting to HTTPS
+    #    """
+    if "://" not in endpoint:
+        endpoint = f"https://{endpoint}"
+    parts = urlsplit(endpoint)
+    default_port = 443 if parts.scheme == "https" else 80
+    return parts.scheme, parts.hostname, parts.port or default_port
+
+
+def get_connection(endpoint, timeout):
+    #    """
+    #    Return the calling thread's pooled keep-alive connection for an endpoint
+    #    """
+    key = (parse_endpoint(endpoint), threading.get_ident())
+    connection = _connection_pool.get(key)
+    if connection is None:
+        scheme, host, port = key[0]
+        if scheme == "https":
+            connection = http.client.HTTPSConnection(host, port, timeout=timeout)
+        else:
+            connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        _connection_pool[key] = connection
+    return connection
+
+
+def discard_connection(endpoint):
+    #    """
+    #    Close and forget the calling thread's pooled connection for an endpoint
+    #    """
+    connection = _connection_pool.pop(
+        (parse_endpoint(endpoint), threading.get_ident()), None
+    )
+    if connection is not None:
+        connection.close()
+
+
+def sigv4_auth(region=None, service="es"):
+    #    """
+    #    Build a request signer for IAM-authenticated Amazon Elasticsearch domains
+    #    """
+    import boto3
+    from botocore.auth import SigV4Auth
+    from botocore.awsrequest import AWSRequest
+
+    session = boto3.Session()
+    region = region or session.region_name
+
+    def sign(method, url, headers, body):
+        request = AWSRequest(method=method, url=url, data=body, headers=headers)
+        SigV4Auth(session.get_credentials(), service, region).add_auth(request)
+        return dict(request.headers.items())
+
+    return sign
+
+
+class BulkIndexer:
+    #    """
+    #    Ship documents through the _bulk API in size- and count-capped batches
+    #    """
+
+    def __init__(
+        self,
+        endpoint,
+        max_batch_bytes=DEFAULT_MAX_BATCH_BYTES,
+        max_batch_docs=DEFAULT_MAX_BATCH_DOCS,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff_seconds=DEFAULT_BACKOFF_SECONDS,
+        timeout=DEFAULT_TIMEOUT_SECONDS,
+        compress=True,
+        auth=None,
+        sleep=time.sleep,
+    ):
+        self.endpoint = endpoint
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_docs = max_batch_docs
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.compress = compress
+        self.auth = auth
+        self.sleep = sleep
+
+    @classmethod
+    def from_environment(cls, endpoint):
+        #    """
+        #    Create an indexer configured from ELASTICSEARCH_* environment variables
+        #    """
+        auth = None
+        if os.environ.get("ELASTICSEARCH_AUTH", "").lower() == "sigv4":
+            auth = sigv4_auth()
+
+        return cls(
+            endpoint,
+            max_batch_bytes=int(
+                os.environ.get("ELASTICSEARCH_BULK_MAX_BYTES", DEFAULT_MAX_BATCH_BYTES)
+            ),
+            max_batch_docs=int(
+                os.environ.get("ELASTICSEARCH_BULK_MAX_DOCS", DEFAULT_MAX_BATCH_DOCS)
+            ),
+            max_retries=int(
+                os.environ.get("ELASTICSEARCH_BULK_MAX_RETRIES", DEFAULT_MAX_RETRIES)
+            ),
+            timeout=float(
+                os.environ.get("ELASTICSEARCH_TIMEOUT_SECONDS", DEFAULT_TIMEOUT_SECONDS)
+            ),
+            auth=auth,
+        )
+
+    def index(self, documents):
+        #    """
+        #    Index (index_name, document) pairs and return shipping statistics
+        #    """
+        stats = {"indexed": 0, "failed": 0, "retried": 0, "requests": 0}
+        batch = []
+        batch_bytes = 0
+
+        for index_name, document in documents:
+            item = (
+                json.dumps({"index": {"_index": index_name}})
+                + "\n"
+                + json.dumps(to_document(document))
+                + "\n"
+            ).encode("utf-8")
+
+            if batch and (
+                len(batch) >= self.max_batch_docs
+                or batch_bytes + len(item) > self.max_batch_bytes
+            ):
+                self._ship(batch, stats)
+                batch = []
+                batch_bytes = 0
+
+            batch.append(item)
+            batch_bytes += len(item)
+
+        if batch:
+            self._ship(batch, stats)
+
+        return stats
+
+    def _ship(self, items, stats):
+        #    """
+        #    Send one batch, retrying only the items that failed transiently
+        #    """
+        attempt = 0
+        while True:
+            stats["requests"] += 1
+            try:
+                status, response = self._post(self._encode(items))
+            except (OSError, http.client.HTTPException) as e:
+                logger.warning(f"Elasticsearch bulk request failed: {str(e)}")
+                status, response = None, None
+
+            if status == 200:
+                retry_items = []
+                for item, result in zip(items, response.get("items", [])):
+                    item_status = next(iter(result.values())).get("status", 500)
+                    if item_status < 300:
+                        stats["indexed"] += 1
+                    elif item_status in RETRYABLE_STATUSES:
+                        retry_items.append(item)
+                    else:
+                        stats["failed"] += 1
+                items = retry_items
+            elif status is not None and status not in RETRYABLE_STATUSES:
+                logger.error(f"Elasticsearch rejected bulk request with HTTP {status}")
+                stats["failed"] += len(items)
+                return
+
+            if not items:
+                return
+
+            attempt += 1
+            if attempt > self.max_retries:
+                logger.error(f"Giving up on {len(items)} documents after retries")
+                stats["failed"] += len(items)
+                return
+
+            stats["retried"] += len(items)
+            delay = self.backoff_seconds * (2 ** (attempt - 1))
+            self.sleep(delay * (0.5 + random.random() / 2))
+
+    def _encode(self, items):
+        #    """
+        #    Stream NDJSON items through a gzip compressor into a request body
+        #    """
+        if not self.compress:
+            return b"".join(items)
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        chunks = [compressor.compress(item) for item in items]
+        chunks.append(compressor.flush())
+        return b"".join(chunks)
+
+    def _post(self, body):
+        #    """
+        #    POST a bulk body on the pooled connection and return status and JSON
+        #    """
+        headers = {"Content-Type": "application/x-ndjson"}
+        if self.compress:
+            headers["Content-Encoding"] = "gzip"
+        if self.auth is not None:
+            scheme, host, port = parse_endpoint(self.endpoint)
+            url = f"{scheme}://{host}:{port}{BULK_PATH}"
+            headers = self.auth("POST", url, headers, body)
+
+        try:
+            return self._request(body, headers)
+        except STALE_CONNECTION_ERRORS:
+            # The server dropped an idle keep-alive connection; reconnect once
+            discard_connection(self.endpoint)
+            return self._request(body, headers)
+
+    def _request(self, body, headers):
+        #    """
+        #    Issue the request and read the full response so the connection is reusable
+        #    """
+        connection = get_connection(self.endpoint, self.timeout)
+        try:
+            connection.request("POST", BULK_PATH, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+        except Exception:
+            discard_connection(self.endpoint)
+            raise
+
+        if response.status != 200:
+            return response.status, None
+        return response.status, json.loads(payload)
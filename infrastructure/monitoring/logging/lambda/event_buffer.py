@@ -0,0 +1,170 @@
+# """
+# Micro-batching buffer for security events across warm Lambda invocations
+# Coalesces small batches so downstream requests carry more events each
+# """
+
+import atexit
+import logging
+import os
+import signal
+import sys
+import time
+
+logger = logging.getLogger()
+
+DEFAULT_MAX_EVENTS = 0
+DEFAULT_MAX_AGE_SECONDS = 30
+DEFAULT_DEADLINE_MARGIN_MS = 5000
+# Events kept for retry after failed flushes; beyond this the oldest are
+# dropped so a sink that keeps failing cannot grow the buffer without bound
+DEFAULT_MAX_RETAINED_EVENTS = 10000
+
+
+class EventBuffer:
+    #    """
+    #    Hold events until a size, age or invocation deadline limit is reached
+    #    """
+
+    def __init__(
+        self,
+        flush_events,
+        max_events=DEFAULT_MAX_EVENTS,
+        max_age_seconds=DEFAULT_MAX_AGE_SECONDS,
+        deadline_margin_ms=DEFAULT_DEADLINE_MARGIN_MS,
+        max_retained_events=DEFAULT_MAX_RETAINED_EVENTS,
+        clock=time.monotonic,
+    ):
+        self.flush_events = flush_events
+        self.max_events = max_events
+        self.max_age_seconds = max_age_seconds
+        self.deadline_margin_ms = deadline_margin_ms
+        self.max_retained_events = max_retained_events
+        self.clock = clock
+        self.events = []
+        self.oldest = None
+        self.flushes = 0
+        self.dropped = 0
+        self.hooks_installed = False
+
+    @classmethod
+    def from_environment(cls, flush_events):
+        #    """
+        #    Create a buffer configured from EVENT_BUFFER_* environment variables
+        #    """
+        return cls(
+            flush_events,
+            max_events=int(os.environ.get("EVENT_BUFFER_MAX_EVENTS", DEFAULT_MAX_EVENTS)),
+            max_age_seconds=float(
+                os.environ.get("EVENT_BUFFER_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS)
+            ),
+            deadline_margin_ms=int(
+                os.environ.get(
+                    "EVENT_BUFFER_DEADLINE_MARGIN_MS", DEFAULT_DEADLINE_MARGIN_MS
+                )
+            ),
+            max_retained_events=int(
+                os.environ.get(
+                    "EVENT_BUFFER_MAX_RETAINED_EVENTS", DEFAULT_MAX_RETAINED_EVENTS
+                )
+            ),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_events > 1
+
+    def add(self, events, context=None):
+        #    """
+        #    Buffer events and flush when a limit is reached; returns True if flushed
+        #    """
+        if events:
+            if not self.events:
+                self.oldest = self.clock()
+            self.events.extend(events)
+
+        if self.events and self.should_flush(context):
+            self.flush()
+            return True
+        return False
+
+    def should_flush(self, context=None):
+        #    """
+        #    Check the size, age and remaining-time limits
+        #    """
+        if not self.enabled or len(self.events) >= self.max_events:
+            return True
+        if self.clock() - self.oldest >= self.max_age_seconds:
+            return True
+        # The environment may be frozen or reclaimed after this invocation,
+        # so do not hold events into the last part of the time budget
+        if context is not None:
+            return context.get_remaining_time_in_millis() <= self.deadline_margin_ms
+        return False
+
+    def flush(self):
+        #    """
+        #    Hand all buffered events to the flush callback; if it raises, the
+        #    events are kept for the next flush, up to max_retained_events
+        #    """
+        if not self.events:
+            return
+        # Swap first so a flush triggered from a signal handler during
+        # another flush never sends an event twice
+        events, self.events = self.events, []
+        oldest, self.oldest = self.oldest, None
+        self.flushes += 1
+        try:
+            self.flush_events(events)
+        except Exception:
+            # Ahead of anything buffered meanwhile, so order is kept
+            self.events[:0] = events
+            self.oldest = oldest
+            self.drop_excess()
+            raise
+
+    def drop_excess(self):
+        #    """
+        #    Drop the oldest events beyond max_retained_events (0 for no limit)
+        #    """
+        excess = len(self.events) - self.max_retained_events
+        if self.max_retained_events and excess > 0:
+            del self.events[:excess]
+            self.dropped += excess
+            logger.error(
+                f"Dropped {excess} events after failed flushes; "
+                f"{len(self.events)} kept for retry"
+            )
+
+    def install_shutdown_hooks(self):
+        #    """
+        #    Flush on interpreter exit and on SIGTERM so buffered events are not lost
+        #    """
+        if self.hooks_installed:
+            return
+        self.hooks_installed = True
+        install_shutdown_flush(self.flush, "buffered events")
+
+
+def install_shutdown_flush(flush, description):
+    #    """
+    #    Call flush() on interpreter exit and on SIGTERM, then run the previous
+    #    SIGTERM handler
+    #    """
+    atexit.register(flush)
+
+    def handle_sigterm(signum, frame):
+        try:
+            flush()
+        except Exception as e:
+            logger.error(f"Error flushing {description} on shutdown: {str(e)}")
+
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            sys.exit(0)
+
+    try:
+        previous = signal.signal(signal.SIGTERM, handle_sigterm)
+    except ValueError:
+        # Signal handlers can only be installed from the main thread
+        logger.warning(f"Could not install SIGTERM handler for {description}")
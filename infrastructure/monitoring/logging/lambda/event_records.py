@@ -0,0 +1,209 @@
+# """
+# Compact record types for security events and findings in the log pipeline
+# Records behave like the dicts they replace and become dicts only when a
+# sink serializes them
+# """
+
+from collections.abc import MutableMapping
+
+
+class _Absent:
+    #    """
+    #    Marker for a slot with no value; None is a value, since JSON logs
+    #    can set fields to null
+    #    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<absent>"
+
+    def __reduce__(self):
+        # Copies and unpickled records keep the one marker
+        return "_ABSENT"
+
+
+_ABSENT = _Absent()
+
+
+class _Record(MutableMapping):
+    #    """
+    #    Mapping over a fixed set of slots; a field holding _ABSENT is an
+    #    absent key
+    #    """
+
+    # Every slot is always assigned, since reading an unassigned slot raises
+    # internally and that dominates the cost of get() and to_dict()
+    __slots__ = ()
+    _fields = frozenset()
+    # Fields added after construction; the others are always present
+    _optional = frozenset()
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            value = getattr(self, key)
+            if value is not _ABSENT:
+                return value
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        # Called for nearly every field read, so skip the KeyError round trip
+        if key in self._fields:
+            value = getattr(self, key)
+            if value is not _ABSENT:
+                return value
+        return default
+
+    def __setitem__(self, key, value):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        # Removing a field the record is built with would leave to_dict()
+        # to filter every record for it, so only optional fields can go
+        if key not in self._optional or getattr(self, key) is _ABSENT:
+            raise KeyError(key)
+        setattr(self, key, _ABSENT)
+
+    def __contains__(self, key):
+        return key in self._fields and getattr(self, key) is not _ABSENT
+
+    def __iter__(self):
+        for name in self.__slots__:
+            if getattr(self, name) is not _ABSENT:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Finding(_Record):
+    #    """
+    #    One pattern match; the pattern itself is referred to by its ID
+    #    """
+
+    __slots__ = ("type", "pattern_id", "matched_text")
+    _fields = frozenset(__slots__)
+
+    def __init__(self, type, pattern_id, matched_text):
+        self.type = type
+        self.pattern_id = pattern_id
+        self.matched_text = matched_text
+
+    def to_dict(self):
+        return {
+            "type": self.type,
+            "pattern_id": self.pattern_id,
+            "matched_text": self.matched_text,
+        }
+
+
+class SecurityEvent(_Record):
+    #    """
+    #    A log event with security findings, plus the fields brute-force
+    #    detection, enrichment and sampling add later
+    #    """
+
+    __slots__ = (
+        "timestamp",
+        "log_group",
+        "level",
+        "user",
+        "ip_address",
+        "user_agent",
+        "message",
+        "security_findings",
+        "severity",
+        "rule_pack",
+        "environment",
+        "brute_force",
+        "threat_intelligence",
+        "risk_score",
+        "sample_weight",
+    )
+    _fields = frozenset(__slots__)
+    _optional = frozenset(
+        ("brute_force", "threat_intelligence", "risk_score", "sample_weight")
+    )
+
+    def __init__(
+        self,
+        timestamp,
+        log_group,
+        level,
+        user,
+        ip_address,
+        user_agent,
+        message,
+        security_findings,
+        severity,
+        rule_pack,
+        environment,
+    ):
+        self.timestamp = timestamp
+        self.log_group = log_group
+        self.level = level
+        self.user = user
+        self.ip_address = ip_address
+        self.user_agent = user_agent
+        self.message = message
+        self.security_findings = security_findings
+        self.severity = severity
+        self.rule_pack = rule_pack
+        self.environment = environment
+        self.brute_force = _ABSENT
+        self.threat_intelligence = _ABSENT
+        self.risk_score = _ABSENT
+        self.sample_weight = _ABSENT
+
+    def to_dict(self):
+        # A literal is much cheaper than looping over the slots, and findings
+        # are inlined to save a method call each
+        document = {
+            "timestamp": self.timestamp,
+            "log_group": self.log_group,
+            "level": self.level,
+            "user": self.user,
+            "ip_address": self.ip_address,
+            "user_agent": self.user_agent,
+            "message": self.message,
+            "security_findings": [
+                {
+                    "type": f.type,
+                    "pattern_id": f.pattern_id,
+                    "matched_text": f.matched_text,
+                }
+                if type(f) is Finding
+                else f
+                for f in self.security_findings
+            ],
+            "severity": self.severity,
+            "rule_pack": self.rule_pack,
+            "environment": self.environment,
+        }
+        if self.brute_force is not _ABSENT:
+            document["brute_force"] = self.brute_force
+        if self.threat_intelligence is not _ABSENT:
+            document["threat_intelligence"] = self.threat_intelligence
+        if self.risk_score is not _ABSENT:
+            document["risk_score"] = self.risk_score
+        if self.sample_weight is not _ABSENT:
+            document["sample_weight"] = self.sample_weight
+        return document
+
+def to_document(value):
+    #    """
+    #    Plain dict for a record, or the value itself if it already is one;
+    #    called by sinks just before serializing
+    #    """
+    # An exact type check, since isinstance against the ABC is far slower
+    if type(value) in _RECORD_TYPES:
+        return value.to_dict()
+    return value
+
+
+_RECORD_TYPES = frozenset((Finding, SecurityEvent))
@@ -0,0 +1,125 @@
+# """
+# Load-aware sampling of lower-severity security events before shipping
+# Keeps every HIGH event and weights sampled events so counts can be rebuilt
+# """
+
+import hashlib
+import os
+import time
+from collections import deque
+
+DEFAULT_TARGET_EVENTS_PER_SECOND = 0
+DEFAULT_WINDOW_SECONDS = 10
+DEFAULT_SAMPLED_SEVERITIES = ("LOW", "MEDIUM")
+
+_HASH_SCALE = float(2**64)
+
+
+class AdaptiveSampler:
+    #    """
+    #    Sample events of the given severities down to a target rate over a
+    #    sliding window, or pass everything through when the target is 0
+    #    """
+
+    def __init__(
+        self,
+        target_events_per_second=DEFAULT_TARGET_EVENTS_PER_SECOND,
+        window_seconds=DEFAULT_WINDOW_SECONDS,
+        severities=DEFAULT_SAMPLED_SEVERITIES,
+        clock=time.time,
+    ):
+        self.target_events_per_second = target_events_per_second
+        self.window_seconds = window_seconds
+        self.severities = frozenset(severities)
+        self.clock = clock
+        # (second, candidate events seen in that second), oldest first
+        self.seen = deque()
+        self.seen_total = 0
+        self.kept = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_environment(cls):
+        #    """
+        #    Create a sampler configured from SAMPLING_* environment variables
+        #    """
+        severities = os.environ.get("SAMPLING_SEVERITIES")
+        return cls(
+            target_events_per_second=float(
+                os.environ.get(
+                    "SAMPLING_TARGET_EVENTS_PER_SECOND", DEFAULT_TARGET_EVENTS_PER_SECOND
+                )
+            ),
+            window_seconds=int(
+                os.environ.get("SAMPLING_WINDOW_SECONDS", DEFAULT_WINDOW_SECONDS)
+            ),
+            severities=(
+                [s.strip().upper() for s in severities.split(",") if s.strip()]
+                if severities
+                else DEFAULT_SAMPLED_SEVERITIES
+            ),
+        )
+
+    @property
+    def enabled(self):
+        return self.target_events_per_second > 0
+
+    def probability(self):
+        #    """
+        #    Keep probability for the current candidate rate over the window
+        #    """
+        rate = self.seen_total / self.window_seconds
+        if rate <= self.target_events_per_second:
+            return 1.0
+        return self.target_events_per_second / rate
+
+    def sample(self, events):
+        #    """
+        #    Return the events to ship, each carrying a sample_weight
+        #    """
+        if not self.enabled:
+            return events
+
+        severities = self.severities
+        candidates = sum(1 for e in events if e.get("severity") in severities)
+        self._observe(candidates)
+        probability = self.probability()
+        weight = 1.0 / probability
+
+        kept = []
+        for event in events:
+            if event.get("severity") not in severities:
+                event["sample_weight"] = 1.0
+                kept.append(event)
+            elif probability >= 1.0 or fingerprint_fraction(event) < probability:
+                event["sample_weight"] = weight
+                kept.append(event)
+        self.dropped += len(events) - len(kept)
+        self.kept += len(kept)
+        return kept
+
+    def counters(self):
+        return {"events_sampled_kept": self.kept, "events_sampled_dropped": self.dropped}
+
+    def _observe(self, count):
+        second = int(self.clock())
+        seen = self.seen
+        if seen and seen[-1][0] == second:
+            seen[-1] = (second, seen[-1][1] + count)
+        else:
+            seen.append((second, count))
+        self.seen_total += count
+        while seen[0][0] <= second - self.window_seconds:
+            self.seen_total -= seen.popleft()[1]
+
+
+def fingerprint_fraction(event):
+    #    """
+    #    Map an event to a stable fraction in [0, 1) so the same event is kept
+    #    or dropped identically on every instance and on replay
+    #    """
+    fingerprint = (
+        f"{event.get('log_group')}\n{event.get('timestamp')}\n{event.get('message')}"
+    )
+    digest = hashlib.blake2b(fingerprint.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / _HASH_SCALE
@@ -3,33 +3,117 @@
 # Processes CloudWatch logs and sends alerts for security events
 # """
 
-import base64
-import gzip
 import json
 import logging
 import os
 import re
 from datetime import datetime
+from time import perf_counter
+
+from alert_aggregator import AlertAggregator
+from analysis_cache import AnalysisCache
+from archive_sink import ArchiveSink
+from aws_clients import get_client
+from brute_force import BruteForceDetector
+from cloudwatch_payload import iter_log_events
+from elasticsearch_bulk import BulkIndexer
+from event_buffer import (
+    DEFAULT_DEADLINE_MARGIN_MS,
+    DEFAULT_MAX_RETAINED_EVENTS,
+    EventBuffer,
+    install_shutdown_flush,
+)
+from event_records import Finding, SecurityEvent
+from event_sampler import AdaptiveSampler
+from parallel_analysis import process_log_events
+from pipeline_metrics import PipelineMetrics
+from rollups import RollupAggregator
+from rule_packs import RulePack, RulePackProvider
+from sink_fanout import (
+    DEFAULT_DEADLINE_MARGIN_MS as DEFAULT_SINK_DEADLINE_MARGIN_MS,
+    Sink,
+    SinkFanout,
+)
+from threat_intel import ThreatIntelProvider
+
+# Optional accelerated JSON decoders, falling back to the stdlib
+try:
+    import orjson
+
+    _fast_json_loads = orjson.loads
+    _FAST_JSON_ERRORS = (orjson.JSONDecodeError,)
+except ImportError:
+    try:
+        import msgspec
+
+        _fast_json_loads = msgspec.json.decode
+        _FAST_JSON_ERRORS = (msgspec.DecodeError,)
+    except ImportError:
+        _fast_json_loads = None
+        _FAST_JSON_ERRORS = ()
 
-import boto3
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-sns_client = boto3.client("sns")
-es_client = boto3.client("es")
+# AWS clients are built on first use through aws_clients.get_client so
+# cold starts do not pay for clients an invocation never needs
+
+# Bulk indexer is kept across warm invocations to reuse its connection
+_bulk_indexer = None
+
+# Output sinks share one event loop and worker pool across warm invocations
+_sink_fanout = None
+
+# Brute-force window counters persist across warm invocations
+_brute_force_detector = None
+
+# Threat intelligence index is loaded once and refreshed on its TTL
+_threat_intel_provider = None
+
+# Alert suppression windows persist across warm invocations
+_alert_aggregator = None
+
+# Events waiting to be shipped to Elasticsearch across warm invocations
+_event_buffer = None
+
+# Rule pack source, checked for changes across warm invocations
+_rule_pack_provider = None
+
+# Events waiting to be written to the columnar audit archive; False when
+# no archive is configured
+_archive_buffer = None
+_archive_sink = None
+
+# Per-minute rollup buckets waiting for their minute to close
+_rollup_aggregator = None
+
+# Archive buffering is off unless ARCHIVE_BUFFER_MAX_EVENTS is set. Buffered
+# events are only flushed at shutdown when Lambda sends SIGTERM, which it does
+# only for functions with a registered extension, so enable it only there
+DEFAULT_ARCHIVE_BUFFER_MAX_EVENTS = 0
+DEFAULT_ARCHIVE_BUFFER_MAX_AGE_SECONDS = 300
 
-# Security patterns to detect
+# Per-invocation stage timers and counters, emitted as EMF log lines
+PIPELINE_METRICS = PipelineMetrics.from_environment(
+    stages=("decode", "json_parse", "pattern_match", "field_extraction"),
+    counters=("lines", "json_lines", "text_lines", "security_events"),
+)
+_next_metrics_sample = PIPELINE_METRICS.sampler.__next__
+
+# Security patterns to detect. Gaps are bounded ({0,256}) and flanked by
+# single characters rather than other quantifiers, so each candidate start
+# costs a bounded number of steps; "select\s+.*\s+from" and
+# "<script[^>]*>" made scans quadratic in the message length.
 SECURITY_PATTERNS = {
     "sql_injection": [
-        r"(?i)(union\s+select|select\s+.*\s+from|insert\s+into|delete\s+from|drop\s+table)",
+        r"(?i)(union\s+select|select\s.{0,256}\sfrom|insert\s+into|delete\s+from|drop\s+table)",
         r"(?i)(\'\s*or\s+\'\d+\'\s*=\s*\'\d+|\'\s*or\s+\d+\s*=\s*\d+)",
         r"(?i)(exec\s*\(|execute\s*\(|sp_executesql)",
     ],
     "xss_attempt": [
-        r"(?i)(<script[^>]*>|</script>|javascript:|vbscript:|onload=|onerror=)",
+        r"(?i)(<script[^>]{0,256}>|</script>|javascript:|vbscript:|onload=|onerror=)",
         r"(?i)(alert\s*\(|confirm\s*\(|prompt\s*\()",
         r"(?i)(<iframe|<object|<embed|<applet)",
     ],
@@ -53,43 +137,391 @@ SECURITY_PATTERNS = {
     ],
 }
 
+# Literals, lowercased, of which every match of a SECURITY_PATTERNS entry
+# contains at least one; lines with none of them cannot produce findings.
+# "su\s+-" has no rarer literal than "su" followed by whitespace, so each
+# ASCII character matched by \s is listed.
+SECURITY_PREFILTER_KEYWORDS = (
+    "select",
+    "union",
+    "insert",
+    "delete",
+    "drop",
+    "exec",
+    "'",
+    "script",
+    "onload",
+    "onerror",
+    "alert",
+    "confirm",
+    "prompt",
+    "<iframe",
+    "<object",
+    "<embed",
+    "<applet",
+    ";",
+    "|",
+    "&&",
+    "..",
+    "%2e%2e",
+    "%252e",
+    "passwd",
+    "shadow",
+    "system32",
+    "failed",
+    "credentials",
+    "attempts",
+    "locked",
+    "exceeded",
+    "sudo",
+    "escalation",
+    "unauthorized",
+    "denied",
+    "violation",
+) + tuple("su" + ws for ws in " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f")
+
+
+# Messages longer than the scan window are scanned in overlapping windows,
+# stopping once every pattern has matched; characters past the maximum scan
+# length are not scanned. The overlap exceeds the longest bounded gap so a
+# match fits in at least one window.
+DEFAULT_SCAN_WINDOW = 8192
+DEFAULT_MAX_SCAN_LENGTH = 65536
+SCAN_WINDOW_OVERLAP = 512
+
+
+class SecurityPatternMatcher:
+    #    """
+    #    Precompiled single-pass matcher for a set of security patterns
+    #    """
+
+    def __init__(
+        self,
+        patterns,
+        prefilter_keywords=None,
+        scan_window=DEFAULT_SCAN_WINDOW,
+        max_scan_length=DEFAULT_MAX_SCAN_LENGTH,
+    ):
+        self.patterns = patterns
+        self.prefilter_keywords = prefilter_keywords
+        self.scan_window = max(scan_window, 2 * SCAN_WINDOW_OVERLAP)
+        self.max_scan_length = max_scan_length
+        self.prefilter_checked = 0
+        self.prefilter_skipped = 0
+        self.windowed_scans = 0
+        self.truncated_scans = 0
+        self.compiled = []
+        # Findings carry a short ID such as "sql_injection:0" instead of the
+        # pattern text, which is looked up here when needed
+        self.pattern_ids = {}
+
+        folded, scoped = [], []
+        for pattern_type, pattern_list in patterns.items():
+            for position, pattern in enumerate(pattern_list):
+                screened = not _UNSCREENABLE_PATTERN.search(pattern)
+                pattern_id = f"{pattern_type}:{position}"
+                self.pattern_ids[pattern_id] = pattern
+                self.compiled.append(
+                    (pattern_type, pattern_id, pattern, re.compile(pattern), screened)
+                )
+                if screened:
+                    folded_body = _case_folded_body(pattern)
+                    if folded_body is None:
+                        scoped.append(_scope_inline_flags(pattern))
+                    else:
+                        folded.append(folded_body)
+
+        # ASCII lines are lowercased once and scanned by a flat alternation,
+        # which lets the regex engine skip ahead on the first character
+        self.folded_screen = re.compile("|".join(folded)) if folded else None
+        self.scoped_screen = re.compile("|".join(scoped)) if scoped else None
+        all_scoped = [_scope_inline_flags(p) for _, _, p, _, s in self.compiled if s]
+        self.full_screen = re.compile("|".join(all_scoped)) if all_scoped else None
+
+    def screen(self, message):
+        #    """
+        #    Return the leftmost position any screened pattern can match at, or None
+        #    """
+        if not message.isascii():
+            match = self.full_screen.search(message) if self.full_screen else None
+            return match.start() if match else None
+
+        lowered = message.lower()
+        if self.prefilter_keywords is not None:
+            self.prefilter_checked += 1
+            if not self._has_prefilter_keyword(lowered):
+                self.prefilter_skipped += 1
+                return None
+
+        start = None
+        if self.folded_screen is not None:
+            match = self.folded_screen.search(lowered)
+            if match:
+                start = match.start()
+        if self.scoped_screen is not None:
+            match = self.scoped_screen.search(message)
+            if match and (start is None or match.start() < start):
+                start = match.start()
+        return start
+
+    def _has_prefilter_keyword(self, lowered):
+        #    """
+        #    Check lowercased message for any prefilter keyword
+        #    """
+        for keyword in self.prefilter_keywords:
+            if keyword in lowered:
+                return True
+        return False
+
+    def analyze(self, message):
+        #    """
+        #    Return findings for every matching pattern, scanning long messages
+        #    in windows up to the maximum scan length
+        #    """
+        if len(message) <= self.scan_window:
+            return self._analyze_window(message)
+
+        self.windowed_scans += 1
+        if len(message) > self.max_scan_length:
+            self.truncated_scans += 1
+            message = message[: self.max_scan_length]
+
+        # The first match of each pattern is kept, in pattern order
+        by_pattern = {}
+        offset = 0
+        while True:
+            window = message[offset : offset + self.scan_window]
+            for finding in self._analyze_window(window):
+                by_pattern.setdefault(finding.pattern_id, finding)
+            if len(by_pattern) == len(self.compiled):
+                break
+            if offset + self.scan_window >= len(message):
+                break
+            offset += self.scan_window - SCAN_WINDOW_OVERLAP
+
+        return [
+            by_pattern[pattern_id]
+            for _, pattern_id, _, _, _ in self.compiled
+            if pattern_id in by_pattern
+        ]
+
+    def counters(self):
+        #    """
+        #    Cumulative counts of long messages scanned in windows or truncated
+        #    """
+        return {
+            "scan_windowed": self.windowed_scans,
+            "scan_truncated": self.truncated_scans,
+        }
+
+    def _analyze_window(self, message):
+        #    """
+        #    Scan message once and return findings for every matching pattern
+        #    """
+        findings = []
+
+        # No pattern can match before the leftmost screen hit, so per-pattern
+        # searches resume from there and clean lines stop after one scan
+        start = self.screen(message)
+
+        for pattern_type, pattern_id, _, regex, screened in self.compiled:
+            if screened:
+                if start is None:
+                    continue
+                match = regex.search(message, start)
+            else:
+                match = regex.search(message)
+            if match:
+                findings.append(Finding(pattern_type, pattern_id, match.group(0)))
+
+        return findings
+
+
+# Backreferences and named groups break once patterns share one alternation
+_UNSCREENABLE_PATTERN = re.compile(r"\\[1-9]|\(\?P[<=]|\(\?\(")
+
+
+def _scope_inline_flags(pattern):
+    #    """
+    #    Turn a leading global flag group into a scoped group so patterns can be joined
+    #    """
+    match = re.match(r"\(\?([aiLmsux]+)\)", pattern)
+    if match:
+        return f"(?{match.group(1)}:{pattern[match.end():]})"
+    return f"(?:{pattern})"
+
+
+def _case_folded_body(pattern):
+    #    """
+    #    Return a case-sensitive body equivalent to a (?i) pattern on lowercased ASCII text
+    #    """
+    if not pattern.startswith("(?i)"):
+        return None
+    body = pattern[4:]
+    if body != body.lower():
+        return None
+
+    # Drop a single wrapping group so its alternatives join the top-level branch
+    if body.startswith("(") and not body.startswith("(?"):
+        if body.endswith(")") and not body.endswith("\\)"):
+            try:
+                re.compile(body[1:-1])
+                return body[1:-1]
+            except re.error:
+                pass
+    return body
+
+
+# Severity of each finding type; the first finding of a listed type sets
+# the event's severity and other types are LOW
+SECURITY_SEVERITIES = {
+    "sql_injection": "HIGH",
+    "command_injection": "HIGH",
+    "privilege_escalation": "HIGH",
+    "xss_attempt": "MEDIUM",
+    "path_traversal": "MEDIUM",
+}
+
+# Used until a rule pack is configured with RULE_PACK_PATH, and kept when
+# a configured pack cannot be loaded
+BUILTIN_RULE_PACK = RulePack(
+    "builtin",
+    "1",
+    SECURITY_PATTERNS,
+    SECURITY_SEVERITIES,
+    SECURITY_PREFILTER_KEYWORDS,
+)
+
+
+def build_security_matcher(rule_pack):
+    #    """
+    #    Compile a rule pack into the matcher used by analyze_security_patterns
+    #    """
+    return SecurityPatternMatcher(
+        rule_pack.patterns,
+        rule_pack.prefilter_keywords,
+        scan_window=int(os.environ.get("LOG_SCAN_WINDOW", DEFAULT_SCAN_WINDOW)),
+        max_scan_length=int(
+            os.environ.get("LOG_SCAN_MAX_LENGTH", DEFAULT_MAX_SCAN_LENGTH)
+        ),
+    )
+
+
+# The active pack and its matcher are swapped by refresh_security_rules
+# at the start of an invocation, before any worker processes are forked
+BUILTIN_RULE_PACK.compiled = build_security_matcher(BUILTIN_RULE_PACK)
+ACTIVE_RULE_PACK = BUILTIN_RULE_PACK
+SECURITY_PATTERN_MATCHER = BUILTIN_RULE_PACK.compiled
+PIPELINE_METRICS.track(lambda: SECURITY_PATTERN_MATCHER.counters())
+
+# Retry storms, scanners and health checks repeat identical messages, so
+# findings are cached per message text; hit and miss counts are emitted
+# with the pipeline metrics
+SECURITY_ANALYSIS_CACHE = AnalysisCache.from_environment(
+    SECURITY_PATTERN_MATCHER.analyze
+)
+PIPELINE_METRICS.track(SECURITY_ANALYSIS_CACHE.counters)
+
+# Under load LOW and MEDIUM events are sampled down to a target rate before
+# they are shipped; rollups and the audit archive still see every event
+EVENT_SAMPLER = AdaptiveSampler.from_environment()
+PIPELINE_METRICS.track(lambda: EVENT_SAMPLER.counters())
+
 
 def lambda_handler(event, context):
     #    """
     #    Main Lambda handler for log processing
     #    """
+    metrics = PIPELINE_METRICS
+    metrics.reset()
+    handler_started = perf_counter()
     try:
-        # Process CloudWatch Logs data
-        cw_data = event["awslogs"]["data"]
-        compressed_payload = base64.b64decode(cw_data)
-        uncompressed_payload = gzip.decompress(compressed_payload)
-        log_data = json.loads(uncompressed_payload)
+        refresh_security_rules()
 
-        logger.info(f"Processing {len(log_data['logEvents'])} log events")
+        # Decode CloudWatch Logs data incrementally so only one chunk of the
+        # batch is held in memory at a time
+        log_data = {}
+        log_events = iter_log_events(event["awslogs"]["data"], log_data, metrics=metrics)
 
         # Process each log event
+        processed_events = 0
         security_events = []
-        for log_event in log_data["logEvents"]:
-            processed_event = process_log_event(log_event, log_data["logGroup"])
+        for processed_event in process_log_events(
+            process_log_event, log_events, log_data, metrics
+        ):
+            processed_events += 1
             if processed_event:
                 security_events.append(processed_event)
 
-        # Send security events to Elasticsearch
+        logger.info(f"Processed {processed_events} log events")
+        metrics.increment("lines", processed_events)
+        metrics.increment("security_events", len(security_events))
+
+        # Count failed logins across batches before severities are used
         if security_events:
-            send_to_elasticsearch(security_events)
+            started = perf_counter()
+            get_brute_force_detector().observe(security_events)
+
+            # Threat intelligence and risk scores go into the documents and
+            # the alert decision
+            enrich_security_events(security_events)
+            metrics.add_time("enrich", perf_counter() - started)
+
+        # Count every security event into per-minute rollups; the minutes
+        # that have closed, or all of them unless open minutes are held
+        # across invocations, are shipped by the rollups sink
+        started = perf_counter()
+        try:
+            rollup_aggregator = get_rollup_aggregator()
+            rollup_aggregator.add(security_events)
+            rollups = rollup_aggregator.drain()
+        except Exception as e:
+            # Rollups feed dashboards and must not fail the batch
+            logger.error(f"Error aggregating security rollups: {str(e)}")
+            rollups = []
+        metrics.add_time("rollup", perf_counter() - started)
+
+        shipped_events = EVENT_SAMPLER.sample(security_events)
+        priority_events = [e for e in shipped_events if e.get("severity") == "HIGH"]
+        bulk_events = [e for e in shipped_events if e.get("severity") != "HIGH"]
+
+        # Buffers install their shutdown hooks on first use, which has to
+        # happen on the main thread
+        event_buffer = get_event_buffer()
+        archive_buffer = get_archive_buffer()
+
+        # Alerts for high-severity or high-risk events, which also publish
+        # summaries for suppression windows that have closed
+        threshold = int(
+            os.environ.get("RISK_ALERT_THRESHOLD", DEFAULT_RISK_ALERT_THRESHOLD)
+        )
+        alert_events = [e for e in security_events if should_alert(e, threshold)]
+
+        # Every sink runs concurrently under its own timeout, so a slow bulk
+        # request or archive write cannot hold up alerting, and a failing
+        # sink does not fail the invocation. The execution environment is
+        # frozen after returning, so sinks are waited on up to their timeouts,
+        # cut short to return before the invocation deadline
+        sink_calls = {
+            "alerts": (alert_events, handler_started),
+            "priority": (priority_events,),
+            # Coalesces small batches across warm invocations when enabled
+            "elasticsearch": (event_buffer, bulk_events, context),
+            "rollups": (rollups,),
+        }
+        if archive_buffer:
+            # Every security event is kept in the columnar audit archive
+            sink_calls["archive"] = (archive_buffer, security_events, context)
+        get_sink_fanout().run(sink_calls, metrics, context)
 
-            # Send high-severity alerts
-            high_severity_events = [
-                e for e in security_events if e.get("severity") == "HIGH"
-            ]
-            if high_severity_events:
-                send_security_alert(high_severity_events)
+        metrics.add_time("handler", perf_counter() - handler_started)
+        metrics.emit({"Environment": os.environ.get("ENVIRONMENT", "unknown")})
 
         return {
             "statusCode": 200,
             "body": json.dumps(
                 {
-                    "processed_events": len(log_data["logEvents"]),
+                    "processed_events": processed_events,
                     "security_events": len(security_events),
                     "high_severity_events": len(
                         [e for e in security_events if e.get("severity") == "HIGH"]
@@ -111,37 +543,60 @@ def process_log_event(log_event, log_group):
         message = log_event["message"]
         timestamp = log_event["timestamp"]
 
+        # Per-event stages are timed and classified on a sample of events,
+        # so unsampled events only pay for one C-level next() call
+        sampled = _next_metrics_sample()
+        if sampled:
+            started = perf_counter()
+
         # Parse JSON log messages
-        try:
-            log_json = json.loads(message)
+        log_json = parse_json_message(message)
+        if log_json is not None:
             message_text = log_json.get("message", message)
-            level = log_json.get("level", "INFO")
-            user = log_json.get("user", "unknown")
-            ip_address = log_json.get("ip_address", "unknown")
-            user_agent = log_json.get("user_agent", "unknown")
-        except json.JSONDecodeError:
+        else:
             message_text = message
-            level = extract_log_level(message)
-            user = extract_user(message)
-            ip_address = extract_ip_address(message)
-            user_agent = extract_user_agent(message)
+        if sampled:
+            parsed = perf_counter()
 
         # Analyze message for security patterns
         security_findings = analyze_security_patterns(message_text)
+        if sampled:
+            PIPELINE_METRICS.add_sampled_time("json_parse", parsed - started)
+            PIPELINE_METRICS.add_sampled_time("pattern_match", perf_counter() - parsed)
+            PIPELINE_METRICS.increment_sampled(
+                "json_lines" if log_json is not None else "text_lines"
+            )
 
         if security_findings:
-            return {
-                "timestamp": datetime.fromtimestamp(timestamp / 1000).isoformat(),
-                "log_group": log_group,
-                "level": level,
-                "user": user,
-                "ip_address": ip_address,
-                "user_agent": user_agent,
-                "message": message_text,
-                "security_findings": security_findings,
-                "severity": determine_severity(security_findings),
-                "environment": os.environ.get("ENVIRONMENT", "unknown"),
-            }
+            # Fields are only kept for findings, so only extract them then
+            extract_started = perf_counter()
+            if log_json is not None:
+                level = log_json.get("level", "INFO")
+                user = log_json.get("user", "unknown")
+                ip_address = log_json.get("ip_address", "unknown")
+                user_agent = log_json.get("user_agent", "unknown")
+            else:
+                level, user, ip_address, user_agent = extract_fields(message)
+            PIPELINE_METRICS.add_time(
+                "field_extraction", perf_counter() - extract_started
+            )
+
+            for finding in security_findings:
+                PIPELINE_METRICS.increment(f"{finding['type']}_findings")
+
+            return SecurityEvent(
+                format_event_timestamp(timestamp),
+                log_group,
+                level,
+                user,
+                ip_address,
+                user_agent,
+                message_text,
+                security_findings,
+                determine_severity(security_findings),
+                ACTIVE_RULE_PACK.label,
+                os.environ.get("ENVIRONMENT", "unknown"),
+            )
 
         return None
 
@@ -150,224 +605,562 @@ def process_log_event(log_event, log_group):
         return None
 
 
+def parse_json_message(message):
+    #    """
+    #    Parse a JSON object log message, returning None for plain-text lines
+    #    """
+    # Only objects carry structured fields, so skip decoding for anything
+    # else instead of raising and catching a decode error per text line
+    if not message.startswith("{"):
+        if not message[:1].isspace() or not message.lstrip().startswith("{"):
+            return None
+
+    if _fast_json_loads is not None:
+        try:
+            log_json = _fast_json_loads(message)
+            return log_json if isinstance(log_json, dict) else None
+        except _FAST_JSON_ERRORS:
+            # The stdlib also accepts NaN, Infinity and unbounded integers
+            pass
+
+    try:
+        log_json = json.loads(message)
+    except json.JSONDecodeError:
+        return None
+    return log_json if isinstance(log_json, dict) else None
+
+
 def analyze_security_patterns(message):
     #    """
     #    Analyze message for security patterns
     #    """
-    findings = []
-
-    for pattern_type, patterns in SECURITY_PATTERNS.items():
-        for pattern in patterns:
-            if re.search(pattern, message):
-                findings.append(
-                    {
-                        "type": pattern_type,
-                        "pattern": pattern,
-                        "matched_text": re.search(pattern, message).group(0),
-                    }
-                )
-
-    return findings
+    return SECURITY_ANALYSIS_CACHE.analyze(message)
 
 
 def determine_severity(security_findings):
     #    """
     #    Determine severity based on security findings
     #    """
-    high_severity_types = ["sql_injection", "command_injection", "privilege_escalation"]
-    medium_severity_types = ["xss_attempt", "path_traversal"]
+    severities = ACTIVE_RULE_PACK.severities
 
     for finding in security_findings:
-        if finding["type"] in high_severity_types:
-            return "HIGH"
-        elif finding["type"] in medium_severity_types:
-            return "MEDIUM"
+        severity = severities.get(finding["type"])
+        if severity is not None:
+            return severity
 
     return "LOW"
 
 
-def extract_log_level(message):
+# Local time of the most recent whole second as (epoch second, ISO text);
+# log events in a batch arrive in time order, so most share the prefix
+_timestamp_prefix = (None, "")
+
+
+def format_event_timestamp(timestamp):
     #    """
-    #    Extract log level from message
+    #    Format epoch milliseconds exactly as datetime.fromtimestamp(ms / 1000)
+    #    .isoformat() does, reusing the formatted second across events
     #    """
-    level_pattern = r"\b(DEBUG|INFO|WARN|ERROR|FATAL)\b"
-    match = re.search(level_pattern, message, re.IGNORECASE)
-    return match.group(1).upper() if match else "INFO"
+    global _timestamp_prefix
+
+    if type(timestamp) is not int:
+        return datetime.fromtimestamp(timestamp / 1000).isoformat()
+
+    second, millisecond = divmod(timestamp, 1000)
+    cached_second, prefix = _timestamp_prefix
+    if second != cached_second:
+        prefix = datetime.fromtimestamp(second).isoformat()
+        _timestamp_prefix = (second, prefix)
+
+    # isoformat drops the fraction entirely when it is zero
+    if millisecond:
+        return f"{prefix}.{millisecond:03d}000"
+    return prefix
+
+
+# Field patterns are compiled once; each starts with a literal or boundary
+# the regex engine can skip ahead on, which a combined case-insensitive
+# alternation of all fields cannot
+_LEVEL_PATTERN = re.compile(r"\b(DEBUG|INFO|WARN|ERROR|FATAL)\b", re.IGNORECASE)
+_USER_PATTERNS = [
+    re.compile(r"user[:\s]+([a-zA-Z0-9_\-\.@]+)", re.IGNORECASE),
+    re.compile(r"username[:\s]+([a-zA-Z0-9_\-\.@]+)", re.IGNORECASE),
+    re.compile(r"email[:\s]+([a-zA-Z0-9_\-\.@]+)", re.IGNORECASE),
+]
+_IP_PATTERN = re.compile(r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b")
+_USER_AGENT_PATTERN = re.compile(r"user[_\-\s]?agent[:\s]+([^\n\r]+)", re.IGNORECASE)
+
+
+def extract_fields(message):
+    #    """
+    #    Extract log level, user, IP address and user agent from a text message
+    #    """
+    level = _LEVEL_PATTERN.search(message)
+
+    # Earlier user patterns win wherever later ones match
+    for pattern in _USER_PATTERNS:
+        user = pattern.search(message)
+        if user:
+            break
+
+    ip_address = _IP_PATTERN.search(message)
+    user_agent = _USER_AGENT_PATTERN.search(message)
+
+    return (
+        level.group(1).upper() if level else "INFO",
+        user.group(1) if user else "unknown",
+        ip_address.group(0) if ip_address else "unknown",
+        user_agent.group(1).strip() if user_agent else "unknown",
+    )
+
+
+def send_to_elasticsearch(security_events, priority=False):
+    #    """
+    #    Send security events to Elasticsearch, to the priority index for the
+    #    priority lane
+    #    """
+    if not security_events:
+        return
+
+    try:
+        es_endpoint = os.environ.get("ELASTICSEARCH_ENDPOINT")
+        if not es_endpoint:
+            logger.warning("Elasticsearch endpoint not configured")
+            return
+
+        lane = "priority_" if priority else ""
+        index_prefix = (
+            "quantumballot-security-priority" if priority else "quantumballot-security"
+        )
+
+        started = perf_counter()
+        result = get_bulk_indexer(es_endpoint).index(
+            monthly_index_names(index_prefix, security_events)
+        )
+        PIPELINE_METRICS.add_time(f"{lane}ship", perf_counter() - started)
+        PIPELINE_METRICS.increment(f"{lane}documents_shipped", result["indexed"])
+        PIPELINE_METRICS.increment(f"{lane}ship_requests", result["requests"])
+
+        logger.info(
+            f"Sent {result['indexed']} events to Elasticsearch {index_prefix} "
+            f"({result['failed']} failed, {result['requests']} requests)"
+        )
+
+    except Exception as e:
+        logger.error(f"Error sending to Elasticsearch: {str(e)}")
 
 
-def extract_user(message):
+def monthly_index_names(index_prefix, security_events):
+    #    """
+    #    Yield (index name, event) pairs, indexing each event under the month
+    #    of its own timestamp rather than the month it happens to be shipped in
+    #    """
+    # Index names must be lowercase; each month's name is built once per batch
+    index_names = {}
+    for event in security_events:
+        month = event.get("timestamp", "")[:7]
+        index_name = index_names.get(month)
+        if index_name is None:
+            index_name = index_names[month] = (
+                f"{index_prefix}-{month or datetime.now().strftime('%Y-%m')}"
+            )
+        yield index_name, event
+
+
+def send_alerts(alert_events, handler_started):
     #    """
-    #    Extract user from message
+    #    Alert sink: publish alerts and record how long after the invocation
+    #    started they went out
     #    """
-    user_patterns = [
-        r"user[:\s]+([a-zA-Z0-9_\-\.@]+)",
-        r"username[:\s]+([a-zA-Z0-9_\-\.@]+)",
-        r"email[:\s]+([a-zA-Z0-9_\-\.@]+)",
-    ]
+    started = perf_counter()
+    send_security_alert(alert_events)
+    PIPELINE_METRICS.add_time("alert", perf_counter() - started)
+    if alert_events:
+        PIPELINE_METRICS.add_time("time_to_alert", perf_counter() - handler_started)
 
-    for pattern in user_patterns:
-        match = re.search(pattern, message, re.IGNORECASE)
-        if match:
-            return match.group(1)
 
-    return "unknown"
+def send_priority_events(priority_events):
+    #    """
+    #    Priority sink: HIGH events straight to the priority index
+    #    """
+    send_to_elasticsearch(priority_events, priority=True)
 
 
-def extract_ip_address(message):
+def add_to_buffer(buffer, events, context):
     #    """
-    #    Extract IP address from message
+    #    Elasticsearch and archive sinks: hand events to their buffer, which
+    #    ships them when full or near the invocation deadline
     #    """
-    ip_pattern = r"\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b"
-    match = re.search(ip_pattern, message)
-    return match.group(0) if match else "unknown"
+    buffer.add(events, context)
 
 
-def extract_user_agent(message):
+def get_sink_fanout():
     #    """
-    #    Extract user agent from message
+    #    Return the output sink fan-out, kept across warm invocations so its
+    #    loop and workers' pooled connections are reused
     #    """
-    ua_pattern = r"user[_\-\s]?agent[:\s]+([^\n\r]+)"
-    match = re.search(ua_pattern, message, re.IGNORECASE)
-    return match.group(1).strip() if match else "unknown"
+    global _sink_fanout
+
+    if _sink_fanout is None:
+        # Sinks look up the send functions when called, so they can be
+        # replaced after the fan-out is built. A timed-out call keeps running
+        # on its worker, so sinks updating the unlocked alert aggregator or
+        # an event buffer take one call at a time
+        _sink_fanout = SinkFanout(
+            [
+                Sink.from_environment(
+                    "alerts", lambda *a: send_alerts(*a), max_in_flight=1
+                ),
+                Sink.from_environment("priority", lambda *a: send_priority_events(*a)),
+                Sink.from_environment(
+                    "elasticsearch", lambda *a: add_to_buffer(*a), max_in_flight=1
+                ),
+                Sink.from_environment(
+                    "archive", lambda *a: add_to_buffer(*a), max_in_flight=1
+                ),
+                Sink.from_environment(
+                    "rollups", lambda *a: send_rollups_to_elasticsearch(*a)
+                ),
+            ],
+            deadline_margin_ms=int(
+                os.environ.get(
+                    "SINK_DEADLINE_MARGIN_MS", DEFAULT_SINK_DEADLINE_MARGIN_MS
+                )
+            ),
+        )
+    return _sink_fanout
 
 
-def send_to_elasticsearch(security_events):
+def send_rollups_to_elasticsearch(rollups):
     #    """
-    #    Send security events to Elasticsearch
+    #    Send per-minute rollup documents to Elasticsearch
     #    """
+    if not rollups:
+        return
+
     try:
         es_endpoint = os.environ.get("ELASTICSEARCH_ENDPOINT")
         if not es_endpoint:
             logger.warning("Elasticsearch endpoint not configured")
             return
 
-        # Prepare bulk index request
-        bulk_data = []
-        for event in security_events:
-            index_action = {
-                "index": {
-                    "_index": f"QuantumBallot-security-{datetime.now().strftime('%Y-%m')}",
-                    "_type": "_doc",
-                }
-            }
-            bulk_data.append(json.dumps(index_action))
-            bulk_data.append(json.dumps(event))
+        # Rollups go to their own index for the month of the bucket
+        started = perf_counter()
+        result = get_bulk_indexer(es_endpoint).index(
+            (f"quantumballot-rollups-{rollup['@timestamp'][:7]}", rollup)
+            for rollup in rollups
+        )
+        PIPELINE_METRICS.add_time("ship", perf_counter() - started)
+        PIPELINE_METRICS.increment("rollups_shipped", result["indexed"])
+        PIPELINE_METRICS.increment("ship_requests", result["requests"])
 
-        # Send to Elasticsearch (implementation would depend on your ES setup)
-        logger.info(f"Would send {len(security_events)} events to Elasticsearch")
+        logger.info(
+            f"Sent {result['indexed']} rollups to Elasticsearch "
+            f"({result['failed']} failed, {result['requests']} requests)"
+        )
 
     except Exception as e:
-        logger.error(f"Error sending to Elasticsearch: {str(e)}")
+        logger.error(f"Error sending rollups to Elasticsearch: {str(e)}")
+
+
+def get_bulk_indexer(es_endpoint):
+    #    """
+    #    Return the bulk indexer for an endpoint, reused across warm invocations
+    #    """
+    global _bulk_indexer
+
+    if _bulk_indexer is None or _bulk_indexer.endpoint != es_endpoint:
+        _bulk_indexer = BulkIndexer.from_environment(es_endpoint)
+    return _bulk_indexer
+
+
+def get_brute_force_detector():
+    #    """
+    #    Return the brute-force detector shared by warm invocations
+    #    """
+    global _brute_force_detector
+
+    if _brute_force_detector is None:
+        _brute_force_detector = BruteForceDetector.from_environment()
+    return _brute_force_detector
+
+
+def get_event_buffer():
+    #    """
+    #    Return the Elasticsearch event buffer shared by warm invocations
+    #    """
+    global _event_buffer
+
+    if _event_buffer is None:
+        _event_buffer = EventBuffer.from_environment(send_to_elasticsearch)
+        if _event_buffer.enabled:
+            _event_buffer.install_shutdown_hooks()
+    return _event_buffer
+
+
+def get_archive_buffer():
+    #    """
+    #    Return the audit archive buffer shared by warm invocations, or None
+    #    when ARCHIVE_PATH is not set
+    #    """
+    global _archive_buffer, _archive_sink
+
+    if _archive_buffer is None:
+        _archive_sink = ArchiveSink.from_environment()
+        if _archive_sink is None:
+            _archive_buffer = False
+        else:
+            _archive_buffer = EventBuffer(
+                archive_security_events,
+                max_events=int(
+                    os.environ.get(
+                        "ARCHIVE_BUFFER_MAX_EVENTS", DEFAULT_ARCHIVE_BUFFER_MAX_EVENTS
+                    )
+                ),
+                max_age_seconds=float(
+                    os.environ.get(
+                        "ARCHIVE_BUFFER_MAX_AGE_SECONDS",
+                        DEFAULT_ARCHIVE_BUFFER_MAX_AGE_SECONDS,
+                    )
+                ),
+                deadline_margin_ms=int(
+                    os.environ.get(
+                        "EVENT_BUFFER_DEADLINE_MARGIN_MS", DEFAULT_DEADLINE_MARGIN_MS
+                    )
+                ),
+                max_retained_events=int(
+                    os.environ.get(
+                        "ARCHIVE_BUFFER_MAX_RETAINED_EVENTS",
+                        DEFAULT_MAX_RETAINED_EVENTS,
+                    )
+                ),
+            )
+            if _archive_buffer.enabled:
+                _archive_buffer.install_shutdown_hooks()
+            buffer = _archive_buffer
+            PIPELINE_METRICS.track(lambda: {"archive_events_dropped": buffer.dropped})
+    return _archive_buffer or None
+
+
+def get_rollup_aggregator():
+    #    """
+    #    Return the rollup aggregator shared by warm invocations
+    #    """
+    global _rollup_aggregator
+
+    if _rollup_aggregator is None:
+        _rollup_aggregator = RollupAggregator.from_environment()
+        if _rollup_aggregator.holding and os.environ.get("ELASTICSEARCH_ENDPOINT"):
+            # Minutes still open when the environment shuts down are shipped
+            # as partial rollups rather than lost
+            aggregator = _rollup_aggregator
+            install_shutdown_flush(
+                lambda: send_rollups_to_elasticsearch(aggregator.flush()), "rollups"
+            )
+    return _rollup_aggregator
+
+
+def archive_security_events(security_events):
+    #    """
+    #    Write security events to the columnar audit archive; raises on failure
+    #    so the archive buffer keeps the events and retries them
+    #    """
+    try:
+        started = perf_counter()
+        paths = _archive_sink.write(security_events)
+        PIPELINE_METRICS.add_time("archive", perf_counter() - started)
+        PIPELINE_METRICS.increment("events_archived", len(security_events))
+        logger.info(f"Archived {len(security_events)} events to {len(paths)} files")
+    except Exception as e:
+        logger.error(f"Error archiving security events: {str(e)}")
+        raise
 
 
-def send_security_alert(high_severity_events):
+def get_alert_aggregator():
     #    """
-    #    Send security alert for high-severity events
+    #    Return the alert aggregator shared by warm invocations
+    #    """
+    global _alert_aggregator
+
+    if _alert_aggregator is None:
+        _alert_aggregator = AlertAggregator.from_environment()
+    return _alert_aggregator
+
+
+def send_security_alert(alert_events):
+    #    """
+    #    Send aggregated security alert digests for high-severity events
     #    """
     try:
         sns_topic_arn = os.environ.get("SNS_TOPIC_ARN")
         if not sns_topic_arn:
-            logger.warning("SNS topic ARN not configured")
+            if alert_events:
+                logger.warning("SNS topic ARN not configured")
             return
 
-        # Prepare alert message
-        alert_message = f"""
-SECURITY ALERT - {os.environ.get('ENVIRONMENT', 'Unknown')} Environment
-
-{len(high_severity_events)} high-severity security events detected:
-
-#"""
-        #
-        #        for event in high_severity_events[:5]:  # Limit to first 5 events
-        #            alert_message += f"""
-        # Timestamp: {event['timestamp']}
-        # User: {event['user']}
-        # IP Address: {event['ip_address']}
-        # Findings: {', '.join([f['type'] for f in event['security_findings']])}
-        # Message: {event['message'][:200]}...
-        #
-        # """
-
-        if len(high_severity_events) > 5:
-            alert_message += f"\n... and {len(high_severity_events) - 5} more events"
-
-        # Send SNS notification
-        sns_client.publish(
-            TopicArn=sns_topic_arn,
-            Subject=f"Security Alert - {os.environ.get('ENVIRONMENT', 'Unknown')} Environment",
-            Message=alert_message,
-        )
+        # Repeats of an alert within the window are counted, not re-sent
+        aggregator = get_alert_aggregator()
+        digests = aggregator.add(alert_events) if alert_events else aggregator.flush()
 
-        logger.info(f"Sent security alert for {len(high_severity_events)} events")
+        environment = os.environ.get("ENVIRONMENT", "Unknown")
+        for digest in digests:
+            title = "Security Alert" if digest["kind"] == "new" else "Security Alert Digest"
+            get_client("sns").publish(
+                TopicArn=sns_topic_arn,
+                Subject=f"{title} - {environment} Environment",
+                Message=format_alert_digest(digest, environment),
+            )
+
+        if digests:
+            logger.info(f"Sent {len(digests)} security alert digests")
+        elif alert_events:
+            logger.info(f"Suppressed {len(alert_events)} repeated security alerts")
 
     except Exception as e:
         logger.error(f"Error sending security alert: {str(e)}")
 
 
-def enrich_with_threat_intelligence(event):
+def format_alert_digest(digest, environment):
     #    """
-    #    Enrich event with threat intelligence data
+    #    Render an alert digest as the SNS message body
     #    """
-    try:
-        ip_address = event.get("ip_address", "")
+    if digest["kind"] == "new":
+        headline = (
+            f"{digest['events']} high-severity or high-risk security events detected:"
+        )
+    else:
+        minutes = digest["window_seconds"] // 60
+        headline = (
+            f"{digest['events']} security events repeated in the last {minutes} minutes:"
+        )
 
-        # Check against known malicious IPs (placeholder implementation)
-        malicious_ips = get_malicious_ip_list()
+    lines = [f"SECURITY ALERT - {environment} Environment", "", headline, ""]
+    for group in digest["groups"][:5]:  # Limit to first 5 fingerprints
+        lines += [
+            f"Finding: {group['finding_type']}",
+            f"IP Address: {group['ip_address']}",
+            f"Log Group: {group['log_group']}",
+            f"Count: {group['count']} ({group['suppressed']} suppressed)",
+            f"First Seen: {group['first_seen']}",
+            f"Last Seen: {group['last_seen']}",
+            f"Message: {group['sample']}...",
+            "",
+        ]
 
-        if ip_address in malicious_ips:
-            event["threat_intelligence"] = {
-                "malicious_ip": True,
-                "threat_type": malicious_ips[ip_address],
-                "confidence": "HIGH",
-            }
+    if len(digest["groups"]) > 5:
+        lines.append(f"... and {len(digest['groups']) - 5} more alert groups")
 
-        return event
+    return "\n".join(lines)
 
-    except Exception as e:
-        logger.error(f"Error enriching with threat intelligence: {str(e)}")
-        return event
+
+def get_rule_pack_provider():
+    #    """
+    #    Get or create the rule pack provider
+    #    """
+    global _rule_pack_provider
+    if _rule_pack_provider is None:
+        _rule_pack_provider = RulePackProvider.from_environment(
+            BUILTIN_RULE_PACK, build_security_matcher
+        )
+    return _rule_pack_provider
 
 
-def get_malicious_ip_list():
+def refresh_security_rules():
     #    """
-    #    Get list of known malicious IPs (placeholder implementation)
+    #    Switch analysis and severities to the provider's current rule pack
     #    """
-    # In a real implementation, this would fetch from threat intelligence feeds
-    return {
-        "192.168.1.100": "botnet",
-        "10.0.0.50": "scanner",
-        "172.16.0.25": "malware_c2",
-    }
+    global ACTIVE_RULE_PACK, SECURITY_PATTERN_MATCHER
+    rule_pack = get_rule_pack_provider().get_pack()
+    if rule_pack is not ACTIVE_RULE_PACK:
+        ACTIVE_RULE_PACK = rule_pack
+        SECURITY_PATTERN_MATCHER = rule_pack.compiled
+        SECURITY_ANALYSIS_CACHE.set_analyzer(SECURITY_PATTERN_MATCHER.analyze)
+    return rule_pack
 
 
-def calculate_risk_score(event):
+def get_threat_intel_provider():
     #    """
-    #    Calculate risk score for the event
+    #    Return the threat intelligence provider shared by warm invocations
+    #    """
+    global _threat_intel_provider
+
+    if _threat_intel_provider is None:
+        _threat_intel_provider = ThreatIntelProvider.from_environment()
+    return _threat_intel_provider
+
+
+# Risk score contributions per finding type, malicious IP and brute force
+FINDING_RISK_SCORES = {
+    "sql_injection": 50,
+    "command_injection": 50,
+    "xss_attempt": 30,
+    "path_traversal": 30,
+}
+DEFAULT_FINDING_RISK_SCORE = 10
+MALICIOUS_IP_RISK_SCORE = 40
+BRUTE_FORCE_RISK_SCORE = 25
+MAX_RISK_SCORE = 100
+
+DEFAULT_RISK_ALERT_THRESHOLD = 75
+
+
+def enrich_security_events(security_events):
+    #    """
+    #    Add threat intelligence and risk scores to a batch of security events
     #    """
     try:
+        # Attack traffic repeats the same few IPs, so resolve each one once;
+        # JSON logs can set ip_address to any type, and only strings are IPs
+        index = get_threat_intel_provider().get_index()
+        ip_addresses = {
+            ip_address
+            for ip_address in (e.get("ip_address", "") for e in security_events)
+            if isinstance(ip_address, str)
+        }
+        threat_types = {
+            ip_address: index.lookup(ip_address) for ip_address in ip_addresses
+        }
+    except Exception as e:
+        logger.error(f"Error enriching with threat intelligence: {str(e)}")
+        threat_types = {}
+
+    finding_scores = FINDING_RISK_SCORES
+    for event in security_events:
+        ip_address = event.get("ip_address", "")
+        threat_type = (
+            threat_types.get(ip_address) if isinstance(ip_address, str) else None
+        )
         score = 0
+        brute_force_finding = False
+        for finding in event["security_findings"]:
+            finding_type = finding["type"]
+            score += finding_scores.get(finding_type, DEFAULT_FINDING_RISK_SCORE)
+            if finding_type == "brute_force":
+                brute_force_finding = True
+
+        if threat_type is not None:
+            event["threat_intelligence"] = {
+                "malicious_ip": True,
+                "threat_type": threat_type,
+                "confidence": "HIGH",
+            }
+            score += MALICIOUS_IP_RISK_SCORE
 
-        # Base score for security findings
-        for finding in event.get("security_findings", []):
-            if finding["type"] in ["sql_injection", "command_injection"]:
-                score += 50
-            elif finding["type"] in ["xss_attempt", "path_traversal"]:
-                score += 30
-            else:
-                score += 10
+        brute_force = event.get("brute_force")
+        if (
+            brute_force.get("threshold_exceeded")
+            if brute_force is not None
+            else brute_force_finding
+        ):
+            score += BRUTE_FORCE_RISK_SCORE
 
-        # Additional score for threat intelligence
-        if event.get("threat_intelligence", {}).get("malicious_ip"):
-            score += 40
+        event["risk_score"] = min(score, MAX_RISK_SCORE)
 
-        # Additional score for repeated attempts
-        if "brute_force" in [f["type"] for f in event.get("security_findings", [])]:
-            score += 25
+    return security_events
 
-        event["risk_score"] = min(score, 100)  # Cap at 100
-        return event
 
-    except Exception as e:
-        logger.error(f"Error calculating risk score: {str(e)}")
-        event["risk_score"] = 0
-        return event
+def should_alert(event, threshold=DEFAULT_RISK_ALERT_THRESHOLD):
+    #    """
+    #    Alert on high-severity events and on events at or over the risk threshold
+    #    """
+    return event.get("severity") == "HIGH" or event.get("risk_score", 0) >= threshold
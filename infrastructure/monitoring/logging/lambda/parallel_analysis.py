@@ -0,0 +1,170 @@
+# """
+# Opt-in multi-core analysis of large CloudWatch Logs batches
+# Forked worker processes exchange event chunks with the handler over pipes
+# """
+
+import logging
+import os
+from itertools import chain, islice
+
+logger = logging.getLogger()
+
+DEFAULT_MIN_BATCH = 5000
+DEFAULT_CHUNK_SIZE = 1000
+
+# Chunks a slow worker may fall behind by before dispatching pauses, which
+# bounds the memory held for reordering results
+MAX_CHUNKS_AHEAD_PER_WORKER = 4
+
+
+def configured_workers():
+    #    """
+    #    Resolve LOG_PARALLEL_WORKERS, where "auto" means one worker per core
+    #    """
+    value = os.environ.get("LOG_PARALLEL_WORKERS", "0").strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return int(value or 0)
+
+
+def process_log_events(process, log_events, header, metrics=None):
+    #    """
+    #    Yield process(event, log_group) for every event, in order, using worker
+    #    processes when enabled and the batch is large enough; metrics recorded
+    #    by workers are merged into metrics
+    #    """
+    workers = configured_workers()
+    min_batch = int(os.environ.get("LOG_PARALLEL_MIN_BATCH", DEFAULT_MIN_BATCH))
+    chunk_size = int(os.environ.get("LOG_PARALLEL_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+
+    log_events = iter(log_events)
+    head = list(islice(log_events, min_batch)) if workers > 1 else []
+
+    if workers < 2 or len(head) < min_batch:
+        for log_event in chain(head, log_events):
+            yield process(log_event, header["logGroup"])
+        return
+
+    yield from _process_with_workers(
+        process, chain(head, log_events), header["logGroup"], workers, chunk_size, metrics
+    )
+
+
+def _chunked(items, size):
+    #    """
+    #    Yield successive lists of at most size items
+    #    """
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _worker_main(connection, process, log_group, metrics):
+    #    """
+    #    Process chunks received on the pipe until the parent sends None
+    #    """
+    # Values inherited through fork belong to the parent
+    if metrics is not None:
+        metrics.drain()
+    try:
+        while True:
+            chunk = connection.recv()
+            if chunk is None:
+                break
+            results = [process(log_event, log_group) for log_event in chunk]
+            connection.send((results, metrics.drain() if metrics is not None else None))
+    except EOFError:
+        pass
+    finally:
+        connection.close()
+
+
+def _process_with_workers(
+    process, log_events, log_group, workers, chunk_size, metrics=None
+):
+    #    """
+    #    Fan chunks out to forked workers and yield their results in input order
+    #    """
+    # Imported here because parallel mode is opt-in and multiprocessing
+    # noticeably adds to cold-start import time
+    import multiprocessing
+    from multiprocessing.connection import wait
+
+    # multiprocessing.Pool and Queue need /dev/shm, which Lambda lacks; plain
+    # processes with pipes work, and fork shares the compiled patterns
+    context = multiprocessing.get_context("fork")
+    chunks = _chunked(log_events, chunk_size)
+
+    processes = []
+    idle = []
+    for _ in range(workers):
+        parent_end, child_end = context.Pipe()
+        worker = context.Process(
+            target=_worker_main,
+            args=(child_end, process, log_group, metrics),
+            daemon=True,
+        )
+        worker.start()
+        child_end.close()
+        processes.append((worker, parent_end))
+        idle.append(parent_end)
+
+    pending = {}
+    results = {}
+    next_chunk_id = 0
+    next_to_yield = 0
+    chunks_exhausted = False
+
+    try:
+        while True:
+            # Keep every idle worker busy unless results are too far ahead
+            while (
+                idle
+                and not chunks_exhausted
+                and next_chunk_id - next_to_yield < workers * MAX_CHUNKS_AHEAD_PER_WORKER
+            ):
+                chunk = next(chunks, None)
+                if chunk is None:
+                    chunks_exhausted = True
+                    break
+                connection = idle.pop()
+                pending[connection] = (next_chunk_id, chunk)
+                connection.send(chunk)
+                next_chunk_id += 1
+
+            if not pending:
+                break
+
+            for connection in wait(list(pending)):
+                chunk_id, chunk = pending.pop(connection)
+                try:
+                    results[chunk_id], snapshot = connection.recv()
+                    if snapshot is not None:
+                        metrics.merge(snapshot)
+                    idle.append(connection)
+                except (EOFError, OSError):
+                    # A worker died; finish its chunk here and stop using it
+                    logger.warning("Parallel log worker exited, processing chunk inline")
+                    results[chunk_id] = [process(e, log_group) for e in chunk]
+
+            while next_to_yield in results:
+                yield from results.pop(next_to_yield)
+                next_to_yield += 1
+
+        # Every worker died before the input ran out
+        for chunk in chunks:
+            yield from [process(log_event, log_group) for log_event in chunk]
+
+    finally:
+        for worker, connection in processes:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            connection.close()
+        for worker, _ in processes:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
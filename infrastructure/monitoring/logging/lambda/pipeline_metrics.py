@@ -0,0 +1,191 @@
+# """
+# Per-stage timers and counters for the log processing pipeline
+# Published as CloudWatch Embedded Metric Format (EMF) log lines
+# """
+
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+
+DEFAULT_NAMESPACE = "QuantumBallot/LogProcessor"
+
+# Per-event stages are timed, and JSON/text lines counted, for one event
+# in this many and scaled up, since timing every event costs about a
+# tenth of the work being timed
+DEFAULT_SAMPLE_EVERY = 32
+
+# Metrics per EMF directive are capped by CloudWatch
+MAX_METRICS_PER_RECORD = 100
+
+# Locks held by another thread at fork time would never be released in the
+# child, so forked workers get fresh ones
+_instances = weakref.WeakSet()
+
+
+def _replace_locks_after_fork():
+    for metrics in list(_instances):
+        metrics.lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_replace_locks_after_fork)
+
+
+class PipelineMetrics:
+    #    """
+    #    Accumulate stage durations in seconds and event counters for one invocation
+    #    """
+
+    def __init__(
+        self, stages=(), counters=(), enabled=True, sample_every=DEFAULT_SAMPLE_EVERY
+    ):
+        # Preset names start at zero so hot paths can use += on the dicts
+        self.stages = tuple(stages)
+        self.counter_names = tuple(counters)
+        self.enabled = enabled
+        self.sample_every = max(1, sample_every)
+        # next(sampler) is True for one event in sample_every; a C-level
+        # cycle is cheaper per event than a Python counter
+        self.sampler = itertools.cycle((False,) * (self.sample_every - 1) + (True,))
+        self._tracked = []
+        # Output sinks record from worker threads; the sampled per-event
+        # methods skip the lock since only the handler thread calls them
+        self.lock = threading.Lock()
+        _instances.add(self)
+        self.reset()
+
+    @classmethod
+    def from_environment(cls, stages=(), counters=()):
+        #    """
+        #    Create metrics configured from PIPELINE_METRICS_* environment variables
+        #    """
+        value = os.environ.get("PIPELINE_METRICS_ENABLED", "true").strip().lower()
+        return cls(
+            stages,
+            counters,
+            enabled=value not in ("0", "false", "no", "off"),
+            sample_every=int(
+                os.environ.get("PIPELINE_METRICS_SAMPLE_EVERY", DEFAULT_SAMPLE_EVERY)
+            ),
+        )
+
+    def track(self, read_counters):
+        #    """
+        #    Report increases in cumulative counters returned by read_counters()
+        #    """
+        self._tracked.append([read_counters, read_counters()])
+
+    def collect(self):
+        #    """
+        #    Add tracked counter increases since the last collect
+        #    """
+        for tracked in self._tracked:
+            read_counters, previous = tracked
+            current = read_counters()
+            for name, value in current.items():
+                before = previous.get(name, 0)
+                # A lower value means the source was replaced and restarted at zero
+                if value != before:
+                    self.increment(name, value - before if value > before else value)
+            tracked[1] = current
+
+    def reset(self):
+        # Tracked increases from before the reset are dropped with the rest
+        self.collect()
+        with self.lock:
+            self.timers = dict.fromkeys(self.stages, 0.0)
+            self.counters = dict.fromkeys(self.counter_names, 0)
+
+    def add_time(self, stage, seconds):
+        with self.lock:
+            self.timers[stage] = self.timers.get(stage, 0.0) + seconds
+
+    def add_sampled_time(self, stage, seconds):
+        #    """
+        #    Add the duration of one sampled event, scaled to all events
+        #    """
+        self.timers[stage] += seconds * self.sample_every
+
+    def increment_sampled(self, name):
+        #    """
+        #    Count one sampled event, scaled to all events
+        #    """
+        self.counters[name] += self.sample_every
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def drain(self):
+        #    """
+        #    Return and clear the accumulated values, e.g. to send from a worker
+        #    """
+        self.collect()
+        with self.lock:
+            snapshot = {"timers": self.timers, "counters": self.counters}
+            self.timers = dict.fromkeys(self.stages, 0.0)
+            self.counters = dict.fromkeys(self.counter_names, 0)
+        return snapshot
+
+    def merge(self, snapshot):
+        #    """
+        #    Add values drained from another PipelineMetrics
+        #    """
+        for stage, seconds in snapshot["timers"].items():
+            self.add_time(stage, seconds)
+        for name, value in snapshot["counters"].items():
+            self.increment(name, value)
+
+    def emf_record(self, namespace=DEFAULT_NAMESPACE, dimensions=None, timestamp=None):
+        #    """
+        #    Build an EMF document with timers in milliseconds and counters as counts
+        #    """
+        dimensions = dimensions or {}
+        # Copied under the lock, since a timed-out sink may still be recording
+        with self.lock:
+            timers = dict(self.timers)
+            counters = dict(self.counters)
+        values = {f"{stage}_ms": seconds * 1000 for stage, seconds in timers.items()}
+        values.update(counters)
+        names = sorted(values)[:MAX_METRICS_PER_RECORD]
+
+        record = {
+            "_aws": {
+                "Timestamp": int((timestamp or time.time()) * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": namespace,
+                        "Dimensions": [sorted(dimensions)],
+                        "Metrics": [
+                            {
+                                "Name": name,
+                                "Unit": "Milliseconds" if name.endswith("_ms") else "Count",
+                            }
+                            for name in names
+                        ],
+                    }
+                ],
+            }
+        }
+        record.update(dimensions)
+        record.update((name, values[name]) for name in names)
+        return record
+
+    def emit(self, dimensions=None, stream=None):
+        #    """
+        #    Write one EMF line to stdout, where Lambda forwards it to CloudWatch Logs
+        #    """
+        if not self.enabled:
+            return
+        self.collect()
+        if not (self.timers or self.counters):
+            return
+        namespace = os.environ.get("PIPELINE_METRICS_NAMESPACE", DEFAULT_NAMESPACE)
+        line = json.dumps(self.emf_record(namespace, dimensions), separators=(",", ":"))
+        stream = stream or sys.stdout
+        stream.write(line + "\n")
+        stream.flush()
@@ -0,0 +1,188 @@
+# """
+# Per-minute rollups of security events for dashboards
+# Counts events by finding category and severity per log group, with the
+# top source IPs tracked by a space-saving sketch
+# """
+
+import os
+import time
+from datetime import datetime
+
+DEFAULT_TOP_K = 10
+DEFAULT_SKETCH_CAPACITY = 100
+# Without a grace period each invocation ships its own partial rollups.
+# Holding open minutes until they close saves documents, but anything held
+# when the environment is reclaimed without a SIGTERM is lost
+DEFAULT_GRACE_SECONDS = None
+DEFAULT_MAX_OPEN_BUCKETS = 1000
+
+
+class SpaceSaving:
+    #    """
+    #    Space-saving heavy hitters sketch holding at most capacity items
+    #    """
+
+    def __init__(self, capacity=DEFAULT_SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        # Count inherited from the evicted item; the true count of an item
+        # lies between counts[item] - errors[item] and counts[item]
+        self.errors = {}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, item, count=1):
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            # A linear scan for the minimum is cheap at dashboard-sized
+            # capacities and only runs for items not already tracked
+            victim = min(counts, key=counts.get)
+            floor = counts.pop(victim)
+            del self.errors[victim]
+            counts[item] = floor + count
+            self.errors[item] = floor
+
+    def top(self, k):
+        #    """
+        #    Return up to k (item, count, error) tuples, highest count first
+        #    """
+        ranked = sorted(self.counts.items(), key=lambda entry: (-entry[1], entry[0]))
+        return [(item, count, self.errors[item]) for item, count in ranked[:k]]
+
+
+class _Bucket:
+    __slots__ = ("started", "environment", "events", "categories", "severities", "ips")
+
+    def __init__(self, started, environment, sketch_capacity):
+        self.started = started
+        self.environment = environment
+        self.events = 0
+        self.categories = {}
+        self.severities = {}
+        self.ips = SpaceSaving(sketch_capacity)
+
+
+class RollupAggregator:
+    #    """
+    #    Accumulate per-minute, per-log-group rollups across warm invocations
+    #    """
+
+    def __init__(
+        self,
+        top_k=DEFAULT_TOP_K,
+        sketch_capacity=DEFAULT_SKETCH_CAPACITY,
+        grace_seconds=DEFAULT_GRACE_SECONDS,
+        max_open_buckets=DEFAULT_MAX_OPEN_BUCKETS,
+        clock=time.time,
+    ):
+        self.top_k = top_k
+        self.sketch_capacity = max(sketch_capacity, top_k)
+        self.grace_seconds = grace_seconds
+        self.max_open_buckets = max_open_buckets
+        self.clock = clock
+        # (minute, log_group) -> _Bucket
+        self.buckets = {}
+
+    @property
+    def holding(self):
+        return self.grace_seconds is not None
+
+    @classmethod
+    def from_environment(cls):
+        #    """
+        #    Create an aggregator configured from ROLLUP_* environment variables
+        #    """
+        grace_seconds = os.environ.get("ROLLUP_GRACE_SECONDS")
+        return cls(
+            top_k=int(os.environ.get("ROLLUP_TOP_K", DEFAULT_TOP_K)),
+            sketch_capacity=int(
+                os.environ.get("ROLLUP_SKETCH_CAPACITY", DEFAULT_SKETCH_CAPACITY)
+            ),
+            grace_seconds=(
+                float(grace_seconds) if grace_seconds else DEFAULT_GRACE_SECONDS
+            ),
+            max_open_buckets=int(
+                os.environ.get("ROLLUP_MAX_OPEN_BUCKETS", DEFAULT_MAX_OPEN_BUCKETS)
+            ),
+        )
+
+    def add(self, events):
+        #    """
+        #    Count security events into the bucket for their minute and log group
+        #    """
+        buckets = self.buckets
+        for event in events:
+            # Timestamps are ISO strings, so the first 16 characters name the minute
+            key = (event["timestamp"][:16], event.get("log_group", "unknown"))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = _Bucket(
+                    datetime.fromisoformat(key[0]).timestamp(),
+                    event.get("environment", "unknown"),
+                    self.sketch_capacity,
+                )
+
+            bucket.events += 1
+            categories = bucket.categories
+            # Categories count events, so repeated findings of a type count once
+            for finding_type in {f["type"] for f in event["security_findings"]}:
+                categories[finding_type] = categories.get(finding_type, 0) + 1
+            severity = event.get("severity", "LOW")
+            bucket.severities[severity] = bucket.severities.get(severity, 0) + 1
+            ip_address = event.get("ip_address", "unknown")
+            # JSON logs can set any type, and sketch items must be hashable
+            if not isinstance(ip_address, str):
+                ip_address = "unknown" if ip_address is None else str(ip_address)
+            bucket.ips.add(ip_address)
+
+    def drain(self):
+        #    """
+        #    Return documents for minutes closed for longer than the grace period
+        #    and for the oldest buckets over the open bucket limit; without a
+        #    grace period, for every bucket
+        #    """
+        if not self.holding:
+            return self.flush()
+        cutoff = self.clock() - 60 - self.grace_seconds
+        closed = []
+        still_open = []
+        for key, bucket in self.buckets.items():
+            (closed if bucket.started <= cutoff else still_open).append(key)
+        excess = len(still_open) - self.max_open_buckets
+        if excess > 0:
+            still_open.sort(key=lambda key: self.buckets[key].started)
+            closed.extend(still_open[:excess])
+        return [self._document(key, self.buckets.pop(key)) for key in closed]
+
+    def flush(self):
+        #    """
+        #    Return documents for every bucket, including minutes still open
+        #    """
+        documents = [self._document(key, bucket) for key, bucket in self.buckets.items()]
+        self.buckets = {}
+        return documents
+
+    def _document(self, key, bucket):
+        minute, log_group = key
+        # Late events for a shipped minute start a new bucket, so documents
+        # for the same minute and log group are additive
+        return {
+            "@timestamp": f"{minute}:00",
+            "type": "security_rollup",
+            "interval": "1m",
+            "environment": bucket.environment,
+            "log_group": log_group,
+            "events": bucket.events,
+            "by_category": bucket.categories,
+            "by_severity": bucket.severities,
+            "top_ips": [
+                {"ip": ip, "count": count, "error": error}
+                for ip, count, error in bucket.ips.top(self.top_k)
+            ],
+        }
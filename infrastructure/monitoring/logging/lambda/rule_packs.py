@@ -0,0 +1,190 @@
+# """
+# Versioned security rule packs loaded from JSON or YAML files
+# A pack carries the detection patterns, the severity of each finding type
+# and optionally the prefilter keywords for the fast matcher
+# """
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger()
+
+DEFAULT_TTL_SECONDS = 60
+
+SEVERITY_LEVELS = ("LOW", "MEDIUM", "HIGH")
+
+YAML_EXTENSIONS = (".yaml", ".yml")
+
+
+class RulePack:
+    #    """
+    #    Versioned set of security patterns with their severities
+    #    """
+
+    def __init__(
+        self, name, version, patterns, severities, prefilter_keywords=None, digest=None
+    ):
+        self.name = name
+        self.version = version
+        self.patterns = patterns
+        self.severities = severities
+        self.prefilter_keywords = prefilter_keywords
+        # Set by RulePackProvider to the matcher built for this pack
+        self.compiled = None
+        self.digest = digest or _digest(
+            json.dumps(
+                [name, version, patterns, severities, prefilter_keywords],
+                sort_keys=True,
+            ).encode("utf-8")
+        )
+
+    @property
+    def label(self):
+        return f"{self.name}@{self.version}"
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_rule_pack(document, digest=None):
+    #    """
+    #    Validate a decoded rule pack document and return a RulePack
+    #    """
+    if not isinstance(document, dict):
+        raise ValueError("Rule pack must be a mapping")
+
+    name = document.get("name")
+    version = document.get("version")
+    if not isinstance(name, str) or not name:
+        raise ValueError("Rule pack needs a name")
+    if not isinstance(version, (str, int, float)) or version == "":
+        raise ValueError("Rule pack needs a version")
+
+    patterns = document.get("patterns")
+    if not isinstance(patterns, dict) or not patterns:
+        raise ValueError("Rule pack needs a patterns mapping")
+    for pattern_type, pattern_list in patterns.items():
+        if not isinstance(pattern_list, list) or not all(
+            isinstance(p, str) for p in pattern_list
+        ):
+            raise ValueError(f"Patterns for {pattern_type} must be a list of strings")
+        for pattern in pattern_list:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid pattern for {pattern_type}: {str(e)}")
+
+    severities = document.get("severity", {})
+    if not isinstance(severities, dict):
+        raise ValueError("Rule pack severity must be a mapping")
+    for pattern_type, level in severities.items():
+        if level not in SEVERITY_LEVELS:
+            raise ValueError(f"Unknown severity {level!r} for {pattern_type}")
+
+    # Keywords only suit the patterns they were written for, so a pack
+    # without them is matched without the prefilter
+    keywords = document.get("prefilter_keywords")
+    if keywords is not None:
+        if not isinstance(keywords, list) or not all(
+            isinstance(k, str) and k == k.lower() for k in keywords
+        ):
+            raise ValueError("Prefilter keywords must be a list of lowercase strings")
+        keywords = tuple(keywords)
+
+    return RulePack(name, str(version), patterns, severities, keywords, digest)
+
+
+def load_rule_pack(path):
+    #    """
+    #    Read and validate a JSON or YAML rule pack file
+    #    """
+    with open(path, "rb") as pack_file:
+        data = pack_file.read()
+    return parse_rule_pack(_decode(path, data), _digest(data))
+
+
+def _decode(path, data):
+    if path.endswith(YAML_EXTENSIONS):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML is required for YAML rule packs")
+        try:
+            return yaml.safe_load(data)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML rule pack: {str(e)}")
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON rule pack: {str(e)}")
+
+
+class RulePackProvider:
+    #    """
+    #    Serve a rule pack, reloading it when the file's content hash changes
+    #    and compiling it with compile_pack(pack) into pack.compiled
+    #    """
+
+    def __init__(
+        self, default_pack, compile_pack, path=None, ttl_seconds=DEFAULT_TTL_SECONDS
+    ):
+        self.compile_pack = compile_pack
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.pack = default_pack
+        self.rejected_digest = None
+        self.checked_at = None
+
+    @classmethod
+    def from_environment(cls, default_pack, compile_pack):
+        #    """
+        #    Create a provider configured from RULE_PACK_* environment variables
+        #    """
+        return cls(
+            default_pack,
+            compile_pack,
+            path=os.environ.get("RULE_PACK_PATH") or None,
+            ttl_seconds=float(
+                os.environ.get("RULE_PACK_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+            ),
+        )
+
+    def get_pack(self):
+        #    """
+        #    Return the current pack, checking the file at most once per TTL
+        #    """
+        if self.pack.compiled is None:
+            self.pack.compiled = self.compile_pack(self.pack)
+        if self.path is None:
+            return self.pack
+
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < self.ttl_seconds:
+            return self.pack
+        self.checked_at = now
+
+        try:
+            with open(self.path, "rb") as pack_file:
+                data = pack_file.read()
+            digest = _digest(data)
+            # Touching or rewriting the file with the same rules, or leaving
+            # a rejected pack in place, costs one hash
+            if digest not in (self.pack.digest, self.rejected_digest):
+                try:
+                    pack = parse_rule_pack(_decode(self.path, data), digest)
+                    pack.compiled = self.compile_pack(pack)
+                except (ValueError, re.error):
+                    self.rejected_digest = digest
+                    raise
+                self.pack = pack
+                logger.info(f"Loaded rule pack {pack.label} from {self.path}")
+        except (OSError, ValueError, re.error) as e:
+            # Keep serving the previous pack when a refresh fails
+            logger.error(f"Error loading rule pack {self.path}: {str(e)}")
+
+        return self.pack
@@ -0,0 +1,185 @@
+# """
+# Concurrent fan-out of processed events to output sinks on a shared event loop
+# Each sink has its own in-flight limit and timeout, and a failing or slow
+# sink does not hold up or fail the others
+# """
+
+import logging
+import os
+from time import perf_counter
+
+logger = logging.getLogger()
+
+DEFAULT_TIMEOUT_SECONDS = 60
+DEFAULT_MAX_IN_FLIGHT = 2
+# Sinks are given up on this long before the invocation deadline, so the
+# handler still returns in time
+DEFAULT_DEADLINE_MARGIN_MS = 1000
+
+SINK_OK = "ok"
+SINK_ERROR = "error"
+SINK_TIMEOUT = "timeout"
+
+
+class Sink:
+    #    """
+    #    One output destination: a blocking function run on the worker pool or
+    #    a coroutine function run on the loop
+    #    """
+
+    def __init__(
+        self,
+        name,
+        send,
+        timeout_seconds=DEFAULT_TIMEOUT_SECONDS,
+        max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+    ):
+        self.name = name
+        self.send = send
+        self.timeout_seconds = timeout_seconds
+        self.max_in_flight = max_in_flight
+        # Set by the fan-out, which is where asyncio is first imported
+        self.is_coroutine = None
+        # Created on first use so it belongs to the fan-out's loop
+        self.slots = None
+
+    @classmethod
+    def from_environment(
+        cls,
+        name,
+        send,
+        timeout_seconds=DEFAULT_TIMEOUT_SECONDS,
+        max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+    ):
+        #    """
+        #    Create a sink configured from SINK_<NAME>_* environment variables,
+        #    falling back to SINK_TIMEOUT_SECONDS and SINK_MAX_IN_FLIGHT
+        #    """
+        prefix = f"SINK_{name.upper()}_"
+        return cls(
+            name,
+            send,
+            timeout_seconds=float(
+                os.environ.get(
+                    f"{prefix}TIMEOUT_SECONDS",
+                    os.environ.get("SINK_TIMEOUT_SECONDS", timeout_seconds),
+                )
+            ),
+            max_in_flight=int(
+                os.environ.get(
+                    f"{prefix}MAX_IN_FLIGHT",
+                    os.environ.get("SINK_MAX_IN_FLIGHT", max_in_flight),
+                )
+            ),
+        )
+
+
+class SinkFanout:
+    #    """
+    #    Run registered sinks concurrently and report how each one finished
+    #    """
+
+    def __init__(self, sinks, deadline_margin_ms=DEFAULT_DEADLINE_MARGIN_MS):
+        # Imported here because asyncio noticeably adds to cold-start import
+        # time, and a fan-out is only built by the first invocation
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.sinks = {sink.name: sink for sink in sinks}
+        self.deadline_margin_ms = deadline_margin_ms
+        for sink in sinks:
+            sink.is_coroutine = asyncio.iscoroutinefunction(sink.send)
+        # The loop and worker threads live across warm invocations, so the
+        # workers' pooled connections are reused
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(
+            max_workers=sum(s.max_in_flight for s in sinks if not s.is_coroutine) or 1,
+            thread_name_prefix="sink",
+        )
+
+    def run(self, calls, metrics=None, context=None):
+        #    """
+        #    Send to every sink in calls, a mapping of sink name to argument
+        #    tuple, and return a mapping of sink name to ok, error or timeout;
+        #    with a Lambda context, no sink is waited on past its deadline
+        #    """
+        remaining = None
+        if context is not None:
+            remaining = max(
+                (context.get_remaining_time_in_millis() - self.deadline_margin_ms)
+                / 1000,
+                0,
+            )
+        return self.loop.run_until_complete(
+            self._run_all(calls, metrics, remaining)
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.loop.close()
+
+    async def _run_all(self, calls, metrics, remaining):
+        import asyncio
+
+        names = list(calls)
+        outcomes = await asyncio.gather(
+            *(
+                self._run_sink(self.sinks[name], calls[name], metrics, remaining)
+                for name in names
+            )
+        )
+        return dict(zip(names, outcomes))
+
+    async def _run_sink(self, sink, args, metrics, remaining):
+        import asyncio
+
+        timeout = sink.timeout_seconds
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        started = perf_counter()
+        try:
+            await asyncio.wait_for(self._send(sink, args), timeout)
+            outcome = SINK_OK
+        except asyncio.TimeoutError:
+            logger.error(f"Sink {sink.name} timed out after {timeout:g} seconds")
+            outcome = SINK_TIMEOUT
+        except Exception as e:
+            logger.error(f"Error sending to sink {sink.name}: {str(e)}")
+            outcome = SINK_ERROR
+
+        if metrics is not None:
+            metrics.add_time(f"sink_{sink.name}", perf_counter() - started)
+            if outcome != SINK_OK:
+                metrics.increment(f"sink_{sink.name}_{outcome}s")
+        return outcome
+
+    async def _send(self, sink, args):
+        #    """
+        #    Wait for an in-flight slot, then send; the slot is held until the
+        #    send really finishes, even after its caller has timed out
+        #    """
+        import asyncio
+
+        if sink.slots is None:
+            sink.slots = asyncio.Semaphore(sink.max_in_flight)
+        await sink.slots.acquire()
+
+        if sink.is_coroutine:
+            try:
+                await sink.send(*args)
+            finally:
+                sink.slots.release()
+            return
+
+        # Worker threads cannot be cancelled, so a timed-out call keeps its
+        # slot and a stuck sink is bounded to max_in_flight threads
+        future = self.loop.run_in_executor(self.executor, sink.send, *args)
+
+        def finished(done):
+            sink.slots.release()
+            # Mark a late failure as seen; the timeout was already reported
+            if not done.cancelled():
+                done.exception()
+
+        future.add_done_callback(finished)
+        await asyncio.shield(future)
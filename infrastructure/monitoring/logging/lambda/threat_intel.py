@@ -0,0 +1,379 @@
+# """
+# Threat intelligence IP index for log enrichment
+# Loads IP and CIDR feeds into sorted integer ranges that can be memory-mapped
+# """
+
+import csv
+import json
+import logging
+import mmap
+import os
+import socket
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_right
+
+logger = logging.getLogger()
+
+DEFAULT_TTL_SECONDS = 300
+
+# Placeholder indicators used when no feed is configured
+DEFAULT_INDICATORS = [
+    ("192.168.1.100", "botnet"),
+    ("10.0.0.50", "scanner"),
+    ("172.16.0.25", "malware_c2"),
+]
+
+INDEX_MAGIC = b"QBTI"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sHHIII")
+INDEX_EXTENSIONS = (".qbti", ".bin")
+
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def load_feed(path):
+    #    """
+    #    Read (indicator, threat_type) pairs from a CSV or JSON feed file
+    #    """
+    if path.endswith(".json"):
+        with open(path) as feed_file:
+            data = json.load(feed_file)
+        if isinstance(data, dict):
+            return list(data.items())
+        return [
+            (
+                entry.get("indicator") or entry.get("ip") or entry.get("cidr"),
+                entry.get("threat_type") or entry.get("type") or "unknown",
+            )
+            for entry in data
+        ]
+
+    indicators = []
+    with open(path, newline="") as feed_file:
+        for row in csv.reader(feed_file):
+            if not row or row[0].startswith("#") or row[0] in ("indicator", "ip", "cidr"):
+                continue
+            threat_type = row[1].strip() if len(row) > 1 and row[1].strip() else "unknown"
+            indicators.append((row[0].strip(), threat_type))
+    return indicators
+
+
+def _parse_indicator(indicator):
+    #    """
+    #    Return (family, first, last) integer bounds for an IP or CIDR string
+    #    """
+    address, _, prefix = str(indicator).strip().partition("/")
+    if ":" in address:
+        family, bits = socket.AF_INET6, 128
+    else:
+        family, bits = socket.AF_INET, 32
+    value = int.from_bytes(socket.inet_pton(family, address), "big")
+    prefix_length = int(prefix) if prefix else bits
+    if not 0 <= prefix_length <= bits:
+        raise ValueError(f"Invalid prefix length in {indicator}")
+    host_mask = (1 << (bits - prefix_length)) - 1
+    return family, value & ~host_mask, value | host_mask
+
+
+def _flatten(blocks):
+    #    """
+    #    Turn nested or disjoint (start, end, label) CIDR blocks into sorted,
+    #    non-overlapping ranges where the most specific block wins
+    #    """
+    starts, ends, labels = [], [], []
+
+    def emit(start, end, label):
+        if start > end:
+            return
+        if ends and ends[-1] == start - 1 and labels[-1] == label:
+            ends[-1] = end
+        else:
+            starts.append(start)
+            ends.append(end)
+            labels.append(label)
+
+    # CIDR blocks never partially overlap, so a stack of enclosing blocks
+    # is enough; containing blocks sort before the blocks inside them
+    blocks.sort(key=lambda block: (block[0], -block[1]))
+    stack = []
+    cursor = 0
+    for start, end, label in blocks:
+        while stack and stack[-1][0] < start:
+            enclosing_end, enclosing_label = stack.pop()
+            emit(cursor, enclosing_end, enclosing_label)
+            cursor = enclosing_end + 1
+        if stack:
+            emit(cursor, start - 1, stack[-1][1])
+        stack.append((end, label))
+        cursor = start
+    while stack:
+        enclosing_end, enclosing_label = stack.pop()
+        emit(cursor, enclosing_end, enclosing_label)
+        cursor = enclosing_end + 1
+
+    return starts, ends, labels
+
+
+class _Uint128Sequence:
+    #    """
+    #    Read-only sequence of 128-bit big-endian integers over a byte buffer
+    #    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def __len__(self):
+        return len(self.buffer) // 16
+
+    def __getitem__(self, position):
+        offset = position * 16
+        return int.from_bytes(self.buffer[offset : offset + 16], "big")
+
+
+def _uint32_view(buffer):
+    #    """
+    #    View little-endian uint32 data without copying where the platform allows
+    #    """
+    if _NATIVE_LITTLE_ENDIAN:
+        return memoryview(buffer).cast("I")
+    values = array("I")
+    values.frombytes(bytes(buffer))
+    values.byteswap()
+    return values
+
+
+def _uint32_bytes(values):
+    values = array("I", values)
+    if not _NATIVE_LITTLE_ENDIAN:
+        values.byteswap()
+    return values.tobytes()
+
+
+def _padding(length):
+    return b"\0" * (-length % 8)
+
+
+class ThreatIntelIndex:
+    #    """
+    #    Sorted IPv4 and IPv6 ranges with threat labels, searched by bisection
+    #    """
+
+    def __init__(self, labels, v4, v6, source=None):
+        # v4 and v6 are (starts, ends, label_ids) sequences of equal length
+        self.labels = labels
+        self.v4_starts, self.v4_ends, self.v4_labels = v4
+        self.v6_starts, self.v6_ends, self.v6_labels = v6
+        self.source = source
+
+    def __len__(self):
+        return len(self.v4_starts) + len(self.v6_starts)
+
+    @classmethod
+    def build(cls, indicators):
+        #    """
+        #    Build an index from (indicator, threat_type) pairs, skipping invalid entries
+        #    """
+        labels = []
+        label_ids = {}
+        v4_blocks, v6_blocks = [], []
+        skipped = 0
+
+        for indicator, threat_type in indicators:
+            try:
+                family, first, last = _parse_indicator(indicator)
+            except (OSError, ValueError):
+                skipped += 1
+                continue
+            label = label_ids.get(threat_type)
+            if label is None:
+                label = label_ids[threat_type] = len(labels)
+                labels.append(threat_type)
+            blocks = v4_blocks if family == socket.AF_INET else v6_blocks
+            blocks.append((first, last, label))
+
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid threat intelligence indicators")
+
+        v4_starts, v4_ends, v4_labels = _flatten(v4_blocks)
+        v6_starts, v6_ends, v6_labels = _flatten(v6_blocks)
+        return cls(
+            labels,
+            (array("I", v4_starts), array("I", v4_ends), array("I", v4_labels)),
+            (
+                _Uint128Sequence(b"".join(v.to_bytes(16, "big") for v in v6_starts)),
+                _Uint128Sequence(b"".join(v.to_bytes(16, "big") for v in v6_ends)),
+                array("I", v6_labels),
+            ),
+        )
+
+    def lookup(self, ip_address):
+        #    """
+        #    Return the threat type for an IP address string, or None
+        #    """
+        try:
+            if ":" in ip_address:
+                value = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip_address), "big")
+                starts, ends, label_ids = self.v6_starts, self.v6_ends, self.v6_labels
+            else:
+                value = int.from_bytes(socket.inet_pton(socket.AF_INET, ip_address), "big")
+                starts, ends, label_ids = self.v4_starts, self.v4_ends, self.v4_labels
+        except (OSError, TypeError, ValueError):
+            return None
+
+        position = bisect_right(starts, value) - 1
+        if position >= 0 and value <= ends[position]:
+            return self.labels[label_ids[position]]
+        return None
+
+    def save(self, path):
+        #    """
+        #    Write the index in the memory-mappable on-disk format
+        #    """
+        labels = json.dumps(self.labels).encode("utf-8")
+        v4_count = len(self.v4_starts)
+        v6_count = len(self.v6_starts)
+        sections = [
+            INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, v4_count, v6_count, len(labels)),
+            _padding(INDEX_HEADER.size),
+            labels,
+            _padding(len(labels)),
+            _uint32_bytes(self.v4_starts),
+            _uint32_bytes(self.v4_ends),
+            _uint32_bytes(self.v4_labels),
+            _padding(12 * v4_count),
+            bytes(self.v6_starts.buffer),
+            bytes(self.v6_ends.buffer),
+            _uint32_bytes(self.v6_labels),
+        ]
+
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as index_file:
+            for section in sections:
+                index_file.write(section)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def open(cls, path):
+        #    """
+        #    Memory-map an index file; ranges are read from the page cache on demand
+        #    """
+        # Publishers must replace index files by rename (as save does); writing
+        # into a mapped file in place would change a live index underneath us
+        with open(path, "rb") as index_file:
+            mapped = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, v4_count, v6_count, labels_length = INDEX_HEADER.unpack_from(
+            mapped
+        )
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            mapped.close()
+            raise ValueError(f"{path} is not a threat intelligence index")
+
+        view = memoryview(mapped)
+        offset = INDEX_HEADER.size + len(_padding(INDEX_HEADER.size))
+        labels = json.loads(bytes(view[offset : offset + labels_length]))
+        offset += labels_length + len(_padding(labels_length))
+
+        def take(length):
+            nonlocal offset
+            section = view[offset : offset + length]
+            offset += length
+            return section
+
+        v4 = (
+            _uint32_view(take(4 * v4_count)),
+            _uint32_view(take(4 * v4_count)),
+            _uint32_view(take(4 * v4_count)),
+        )
+        offset += len(_padding(12 * v4_count))
+        v6 = (
+            _Uint128Sequence(take(16 * v6_count)),
+            _Uint128Sequence(take(16 * v6_count)),
+            _uint32_view(take(4 * v6_count)),
+        )
+        return cls(labels, v4, v6, source=path)
+
+
+class ThreatIntelProvider:
+    #    """
+    #    Serve a threat intelligence index, reloading it when the source changes
+    #    """
+
+    def __init__(self, path=None, ttl_seconds=DEFAULT_TTL_SECONDS, cache_path=None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.cache_path = cache_path
+        self.index = None
+        self.signature = None
+        self.checked_at = 0.0
+
+    @classmethod
+    def from_environment(cls):
+        #    """
+        #    Create a provider configured from THREAT_INTEL_* environment variables
+        #    """
+        return cls(
+            path=os.environ.get("THREAT_INTEL_PATH") or None,
+            ttl_seconds=float(
+                os.environ.get("THREAT_INTEL_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+            ),
+            cache_path=os.environ.get("THREAT_INTEL_CACHE_PATH") or None,
+        )
+
+    def get_index(self):
+        #    """
+        #    Return the current index, checking the source at most once per TTL
+        #    """
+        now = time.monotonic()
+        if self.index is not None and now - self.checked_at < self.ttl_seconds:
+            return self.index
+        self.checked_at = now
+
+        if self.path is None:
+            if self.index is None:
+                self.index = ThreatIntelIndex.build(DEFAULT_INDICATORS)
+            return self.index
+
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature != self.signature:
+                self.index = self._load(signature)
+                self.signature = signature
+                logger.info(f"Loaded {len(self.index)} threat intelligence ranges")
+        except (OSError, ValueError) as e:
+            # Keep serving the previous index when a refresh fails
+            logger.error(f"Error loading threat intelligence: {str(e)}")
+            if self.index is None:
+                self.index = ThreatIntelIndex.build(DEFAULT_INDICATORS)
+
+        return self.index
+
+    def _load(self, signature):
+        #    """
+        #    Load the configured source, compiling feeds through the cache file
+        #    """
+        if self.path.endswith(INDEX_EXTENSIONS):
+            return ThreatIntelIndex.open(self.path)
+
+        if self.cache_path:
+            cache_stamp = f"{self.cache_path}.source"
+            stamp = f"{self.path}:{signature[0]}:{signature[1]}"
+            try:
+                with open(cache_stamp) as stamp_file:
+                    if stamp_file.read() == stamp:
+                        return ThreatIntelIndex.open(self.cache_path)
+            except (OSError, ValueError):
+                pass
+
+        index = ThreatIntelIndex.build(load_feed(self.path))
+
+        if self.cache_path:
+            index.save(self.cache_path)
+            with open(cache_stamp, "w") as stamp_file:
+                stamp_file.write(stamp)
+            return ThreatIntelIndex.open(self.cache_path)
+        return index
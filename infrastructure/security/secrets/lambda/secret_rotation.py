@@ -7,17 +7,14 @@ import json
 import logging
 import os
 
-import boto3
-import psycopg2
-from botocore.exceptions import ClientError
+from aws_clients import get_client
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-secrets_client = boto3.client("secretsmanager")
-rds_client = boto3.client("rds")
+# AWS clients are built on first use through aws_clients.get_client; the
+# database driver is imported only by the steps that connect
 
 
 def lambda_handler(event, context):
@@ -62,6 +59,8 @@ def create_secret(secret_arn, token):
     #    """
     #    Create a new secret version with a new password
     #    """
+    from botocore.exceptions import ClientError
+
     try:
         # Get current secret
         current_secret = get_secret_dict(secret_arn, "AWSCURRENT")
@@ -74,7 +73,7 @@ def create_secret(secret_arn, token):
         new_secret["password"] = new_password
 
         # Put new secret version
-        secrets_client.put_secret_value(
+        get_client("secretsmanager").put_secret_value(
             SecretId=secret_arn,
             ClientRequestToken=token,
             SecretString=json.dumps(new_secret),
@@ -160,7 +159,7 @@ def finish_secret(secret_arn, token):
     #    """
     try:
         # Move AWSPENDING to AWSCURRENT
-        secrets_client.update_secret_version_stage(
+        get_client("secretsmanager").update_secret_version_stage(
             SecretId=secret_arn,
             VersionStage="AWSCURRENT",
             ClientRequestToken=token,
@@ -184,7 +183,7 @@ def get_secret_dict(secret_arn, stage, token=None):
         if token:
             kwargs["VersionId"] = token
 
-        response = secrets_client.get_secret_value(**kwargs)
+        response = get_client("secretsmanager").get_secret_value(**kwargs)
         return json.loads(response["SecretString"])
 
     except Exception as e:
@@ -197,7 +196,7 @@ def get_secret_version_id(secret_arn, stage):
     #    Get version ID for a specific stage
     #    """
     try:
-        response = secrets_client.describe_secret(SecretId=secret_arn)
+        response = get_client("secretsmanager").describe_secret(SecretId=secret_arn)
 
         for version_id, version_info in response["VersionIdsToStages"].items():
             if stage in version_info:
@@ -214,6 +213,8 @@ def get_database_connection(secret_dict):
     #    """
     #    Create database connection using secret credentials
     #    """
+    import psycopg2
+
     try:
         connection = psycopg2.connect(
             host=secret_dict["host"],
@@ -269,11 +270,10 @@ def send_notification(message, secret_arn):
     #    Send notification about rotation status
     #    """
     try:
-        sns_client = boto3.client("sns")
         topic_arn = os.environ.get("SNS_TOPIC_ARN")
 
         if topic_arn:
-            sns_client.publish(
+            get_client("sns").publish(
                 TopicArn=topic_arn,
                 Subject=f"Secret Rotation Alert - {os.environ.get('environment', 'unknown')}",
                 Message=f"Secret: {secret_arn}\nMessage: {message}",
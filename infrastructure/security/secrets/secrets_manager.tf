@@ -376,6 +376,10 @@ data "archive_file" "secret_rotation_zip" {
     })
     filename = "lambda_function.py"
   }
+  source {
+    content  = file("${path.module}/../../shared/lambda/aws_clients.py")
+    filename = "aws_clients.py"
+  }
 }
 
 # Lambda Permission for Secrets Manager
@@ -0,0 +1,59 @@
+# """
+# Lazily constructed AWS clients shared by the QuantumBallot Lambda functions
+# Clients are built on first use and cached for the execution environment
+# """
+
+import threading
+
+# (service name, client options) -> client, kept across warm invocations
+_clients = {}
+_session = None
+_lock = threading.Lock()
+
+
+def get_client(service_name, **options):
+    #    """
+    #    Return the cached boto3 client for a service, building it on first use
+    #    """
+    key = (service_name, tuple(sorted(options.items())))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    # boto3 sessions are not thread-safe to build clients from concurrently
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = get_session().client(service_name, **options)
+    return client
+
+
+def get_session():
+    #    """
+    #    Return the shared boto3 session, importing boto3 only when first needed
+    #    """
+    global _session
+
+    if _session is None:
+        import boto3
+
+        _session = boto3.Session()
+    return _session
+
+
+def register_client(service_name, client, **options):
+    #    """
+    #    Use a prebuilt client for a service, e.g. a stub in tests
+    #    """
+    _clients[(service_name, tuple(sorted(options.items())))] = client
+
+
+def reset_clients():
+    #    """
+    #    Forget all cached clients and the session
+    #    """
+    global _session
+
+    with _lock:
+        _clients.clear()
+        _session = None
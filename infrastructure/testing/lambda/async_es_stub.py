@@ -0,0 +1,117 @@
+# """
+# Local asyncio stub of the Elasticsearch _bulk API with scripted latency
+# """
+
+import asyncio
+import gzip
+import json
+import threading
+
+
+class AsyncStubElasticsearch:
+    #    """
+    #    Single-threaded asyncio HTTP server that records bulk requests and
+    #    can hold each response back, like a slow or hung cluster
+    #    """
+
+    def __init__(self, delay_seconds=0.0, status=200):
+        self.delay_seconds = delay_seconds
+        self.status = status
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.server = None
+        self.connections = set()
+
+    @property
+    def endpoint(self):
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def documents(self):
+        with self.lock:
+            return [doc for request in self.requests for _, doc in request["items"]]
+
+    def __enter__(self):
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._serve, "127.0.0.1", 0), self.loop
+        ).result(5)
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self._close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    async def _close(self):
+        self.server.close()
+        # Drop keep-alive and held connections so blocked clients see an
+        # error; newer Pythons also wait for them in wait_closed()
+        connections = list(self.connections)
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        connection = asyncio.current_task()
+        self.connections.add(connection)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for line in header_lines:
+                    if line:
+                        name, _, value = line.partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                await self._respond(writer, request_line.split()[1], headers, body)
+        # Cancelled by _close(); finishing normally keeps asyncio's stream
+        # callback from reporting the cancellation as an error
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections.discard(connection)
+            writer.close()
+
+    async def _respond(self, writer, path, headers, body):
+        if headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        lines = body.decode("utf-8").splitlines()
+        items = [
+            (json.loads(action), json.loads(document))
+            for action, document in zip(lines[::2], lines[1::2])
+        ]
+
+        with self.lock:
+            self.requests.append({"path": path, "headers": headers, "items": items})
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay_seconds)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+        if self.status != 200:
+            payload = {"error": "scripted failure"}
+        else:
+            payload = {
+                "errors": False,
+                "items": [{"index": {"status": 201}} for _ in items],
+            }
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {self.status} Stub\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1")
+            + data
+        )
+        await writer.drain()
@@ -0,0 +1,21 @@
+# """
+# Shared pytest configuration for the Lambda function test suites
+# """
+
+import os
+import sys
+
+INFRASTRUCTURE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+LAMBDA_SOURCE_DIRS = [
+    os.path.join(INFRASTRUCTURE_DIR, "monitoring", "logging", "lambda"),
+    os.path.join(INFRASTRUCTURE_DIR, "security", "secrets", "lambda"),
+    os.path.join(INFRASTRUCTURE_DIR, "shared", "lambda"),
+]
+
+for source_dir in LAMBDA_SOURCE_DIRS + [os.path.dirname(__file__)]:
+    if source_dir not in sys.path:
+        sys.path.insert(0, source_dir)
+
+# boto3 clients need a region even when no AWS call is made
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
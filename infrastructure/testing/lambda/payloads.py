@@ -0,0 +1,46 @@
+# """
+# Helpers for building CloudWatch Logs subscription events in tests
+# """
+
+import base64
+import gzip
+import json
+
+LOG_GROUP = "/aws/security/test-QuantumBallot"
+
+
+def build_log_data(messages, log_group=LOG_GROUP, start_ms=1714564800000):
+    #    """
+    #    Build a decoded subscription document for the given messages
+    #    """
+    return {
+        "messageType": "DATA_MESSAGE",
+        "owner": "123456789012",
+        "logGroup": log_group,
+        "logStream": "backend",
+        "subscriptionFilters": ["test-QuantumBallot-security-events-filter"],
+        "logEvents": [
+            {"id": str(n), "timestamp": start_ms + n, "message": message}
+            for n, message in enumerate(messages)
+        ],
+    }
+
+
+def encode_log_data(log_data):
+    #    """
+    #    Gzip and base64 encode a subscription document like awslogs.data
+    #    """
+    return base64.b64encode(gzip.compress(json.dumps(log_data).encode("utf-8"))).decode(
+        "ascii"
+    )
+
+
+def build_awslogs_event(messages, log_group=LOG_GROUP, start_ms=1714564800000):
+    #    """
+    #    Build a Lambda event carrying the given messages
+    #    """
+    return {
+        "awslogs": {
+            "data": encode_log_data(build_log_data(messages, log_group, start_ms))
+        }
+    }
@@ -0,0 +1,25 @@
+# """
+# In-process stub of the SNS client for offline tests
+# """
+
+import threading
+
+
+class StubSNS:
+    #    """
+    #    Record publish calls in place of boto3's SNS client
+    #    """
+
+    def __init__(self):
+        self.messages = []
+        self.lock = threading.Lock()
+
+    def publish(self, **kwargs):
+        with self.lock:
+            self.messages.append(kwargs)
+            return {"MessageId": str(len(self.messages))}
+
+    @property
+    def publish_count(self):
+        with self.lock:
+            return len(self.messages)
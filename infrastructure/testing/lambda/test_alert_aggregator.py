@@ -0,0 +1,129 @@
+# """
+# Tests for alert aggregation and suppression windows
+# """
+
+from datetime import datetime
+
+import aws_clients
+import log_processor
+from alert_aggregator import AlertAggregator
+from corpus import ATTACK_LINES
+from fake_clock import FakeClock
+from payloads import LOG_GROUP, build_awslogs_event
+from rollups import RollupAggregator
+from sns_stub import StubSNS
+
+SCAN_START = 1714564800
+
+
+def _alert(seconds, ip_address, finding_type="sql_injection"):
+    return {
+        "timestamp": datetime.fromtimestamp(seconds).isoformat(),
+        "log_group": LOG_GROUP,
+        "ip_address": ip_address,
+        "message": "GET /api/elections?id=1 UNION SELECT password FROM users",
+        "severity": "HIGH",
+        "security_findings": [{"type": finding_type}],
+    }
+
+
+def test_repeats_are_suppressed_and_summarised_when_window_closes():
+    clock = FakeClock(SCAN_START)
+    aggregator = AlertAggregator(window_seconds=300, clock=clock)
+
+    first = aggregator.add([_alert(SCAN_START, "203.0.113.7")] * 3)
+    clock.now += 60
+    repeated = aggregator.add([_alert(SCAN_START + 60, "203.0.113.7")] * 2)
+    clock.now += 300
+    after_window = aggregator.add([_alert(SCAN_START + 360, "203.0.113.7")])
+
+    assert [d["kind"] for d in first] == ["new"]
+    assert first[0]["groups"][0]["count"] == 3
+    assert repeated == []
+    assert [d["kind"] for d in after_window] == ["summary", "new"]
+    assert after_window[0]["groups"][0]["count"] == 5
+    assert after_window[0]["groups"][0]["suppressed"] == 2
+
+
+def test_new_fingerprints_alert_immediately_within_window():
+    aggregator = AlertAggregator(window_seconds=300, clock=FakeClock(SCAN_START))
+
+    aggregator.add([_alert(SCAN_START, "203.0.113.7")])
+    digests = aggregator.add(
+        [
+            _alert(SCAN_START, "203.0.113.7"),
+            _alert(SCAN_START, "203.0.113.8"),
+            _alert(SCAN_START, "203.0.113.7", "xss_attempt"),
+        ]
+    )
+
+    assert len(digests) == 1
+    assert [(g["ip_address"], g["finding_type"]) for g in digests[0]["groups"]] == [
+        ("203.0.113.8", "sql_injection"),
+        ("203.0.113.7", "xss_attempt"),
+    ]
+
+
+def test_state_file_is_shared_between_aggregators(tmp_path):
+    clock = FakeClock(SCAN_START)
+    state_path = str(tmp_path / "alert_state.json")
+
+    AlertAggregator(window_seconds=300, state_path=state_path, clock=clock).add(
+        [_alert(SCAN_START, "203.0.113.7")]
+    )
+    restarted = AlertAggregator(window_seconds=300, state_path=state_path, clock=clock)
+
+    assert restarted.add([_alert(SCAN_START, "203.0.113.7")]) == []
+    clock.now += 300
+    assert [d["kind"] for d in restarted.flush()] == ["summary"]
+
+
+def test_sustained_scan_publishes_far_fewer_messages(monkeypatch):
+    sns = StubSNS()
+    clock = FakeClock(SCAN_START)
+    monkeypatch.setattr(aws_clients, "_clients", {})
+    aws_clients.register_client("sns", sns)
+    monkeypatch.setattr(
+        log_processor, "_alert_aggregator", AlertAggregator(window_seconds=300, clock=clock)
+    )
+    monkeypatch.setenv("SNS_TOPIC_ARN", "arn:aws:sns:us-east-1:123456789012:alerts")
+
+    # Ten minutes of invocations every three seconds from the same scanner
+    invocations = 200
+    for n in range(invocations):
+        clock.now = SCAN_START + 3 * n
+        log_processor.send_security_alert([_alert(clock.now, "203.0.113.7")] * 5)
+    clock.now += 300
+    log_processor.send_security_alert([])
+
+    assert sns.publish_count == 4
+    assert sns.publish_count * 50 <= invocations
+    assert [m["Subject"].split(" - ")[0] for m in sns.messages] == [
+        "Security Alert",
+        "Security Alert Digest",
+        "Security Alert",
+        "Security Alert Digest",
+    ]
+    assert "Count: 500 (495 suppressed)" in sns.messages[1]["Message"]
+
+
+def test_unhashable_ip_does_not_suppress_other_alerts(monkeypatch):
+    sns = StubSNS()
+    monkeypatch.setattr(aws_clients, "_clients", {})
+    aws_clients.register_client("sns", sns)
+    monkeypatch.setattr(log_processor, "_alert_aggregator", AlertAggregator())
+    monkeypatch.setattr(
+        log_processor, "_rollup_aggregator", RollupAggregator(grace_seconds=float("inf"))
+    )
+    monkeypatch.setenv("SNS_TOPIC_ARN", "arn:aws:sns:us-east-1:123456789012:alerts")
+    monkeypatch.delenv("ELASTICSEARCH_ENDPOINT", raising=False)
+    list_ip = (
+        '{"message": "GET /search?q=1 UNION SELECT password FROM users",'
+        ' "ip_address": ["1.2.3.4"]}'
+    )
+
+    log_processor.lambda_handler(build_awslogs_event([list_ip, ATTACK_LINES[0]]), None)
+
+    (message,) = sns.messages
+    assert '["1.2.3.4"]' in message["Message"]
+    assert "2 high-severity or high-risk security events" in message["Message"]
@@ -0,0 +1,102 @@
+# """
+# Tests for the bounded security analysis cache
+# """
+
+import log_processor
+from analysis_cache import AnalysisCache
+from corpus import ATTACK_LINES, CLEAN_LINES
+from pipeline_metrics import PipelineMetrics
+
+
+class CountingAnalyzer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, message):
+        self.calls += 1
+        return log_processor.SECURITY_PATTERN_MATCHER.analyze(message)
+
+
+def test_repeated_messages_are_analyzed_until_cached():
+    analyzer = CountingAnalyzer()
+    cache = AnalysisCache(analyzer)
+    line = ATTACK_LINES[0]
+
+    results = [cache.analyze(line) for _ in range(5)]
+
+    # Cached on the second sighting, served from the cache after that
+    assert analyzer.calls == 2
+    assert (cache.hits, cache.misses) == (3, 2)
+    assert all(r == log_processor.SECURITY_PATTERN_MATCHER.analyze(line) for r in results)
+    assert results[2] is not results[3]
+
+
+def test_cached_findings_match_uncached_on_corpus():
+    cache = AnalysisCache(log_processor.SECURITY_PATTERN_MATCHER.analyze)
+
+    for _ in range(3):
+        for line in ATTACK_LINES + CLEAN_LINES:
+            assert cache.analyze(line) == log_processor.SECURITY_PATTERN_MATCHER.analyze(
+                line
+            )
+    assert cache.hits == len(ATTACK_LINES + CLEAN_LINES)
+
+
+def test_entries_are_capped_least_recently_used_first():
+    cache = AnalysisCache(CountingAnalyzer(), max_entries=3)
+    lines = ATTACK_LINES[:5]
+
+    for line in lines:
+        cache.analyze(line)
+        cache.analyze(line)
+    cache.analyze(lines[2])
+
+    assert len(cache) == 3
+    assert cache.evictions == 2
+    hits = cache.hits
+    cache.analyze(lines[2])
+    cache.analyze(lines[0])
+    assert cache.hits == hits + 1
+
+
+def test_unique_flood_does_not_evict_repeated_messages():
+    cache = AnalysisCache(CountingAnalyzer(), max_entries=100)
+    hot = ATTACK_LINES[0]
+    cache.analyze(hot)
+    cache.analyze(hot)
+
+    for n in range(10000):
+        cache.analyze(f"{CLEAN_LINES[0]} request={n}")
+
+    assert len(cache) == 1
+    hits = cache.hits
+    cache.analyze(hot)
+    assert cache.hits == hits + 1
+
+
+def test_long_messages_are_not_cached():
+    analyzer = CountingAnalyzer()
+    cache = AnalysisCache(analyzer, max_message_length=64)
+    line = ATTACK_LINES[0] + " " * 64
+
+    for _ in range(3):
+        cache.analyze(line)
+
+    assert analyzer.calls == 3
+    assert len(cache) == 0
+
+
+def test_cache_counters_are_reported_per_drain():
+    cache = AnalysisCache(CountingAnalyzer())
+    metrics = PipelineMetrics()
+    cache.analyze(ATTACK_LINES[0])
+    metrics.track(cache.counters)
+
+    for _ in range(4):
+        cache.analyze(ATTACK_LINES[0])
+    first = metrics.drain()["counters"]
+    cache.analyze(ATTACK_LINES[0])
+    second = metrics.drain()["counters"]
+
+    assert first == {"analysis_cache_hits": 3, "analysis_cache_misses": 1}
+    assert second == {"analysis_cache_hits": 1}
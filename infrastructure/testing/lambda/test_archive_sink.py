@@ -0,0 +1,177 @@
+# """
+# Tests for the columnar security event archive
+# """
+
+import os
+
+import pytest
+
+import log_processor
+from archive_sink import ArchiveSink
+from corpus import ATTACK_LINES, CLEAN_LINES
+from payloads import LOG_GROUP, build_awslogs_event
+from pipeline_metrics import PipelineMetrics
+
+
+def _event(n, month="2024-05", log_group=LOG_GROUP):
+    return {
+        "timestamp": f"{month}-01T12:00:{n % 60:02d}",
+        "log_group": log_group,
+        "level": "WARN",
+        "user": f"voter-{n % 3}",
+        "ip_address": f"203.0.113.{n % 2}",
+        "user_agent": "curl/8.0",
+        "message": ATTACK_LINES[n % len(ATTACK_LINES)],
+        "security_findings": [
+            {"type": "sql_injection", "matched_text": "union select"},
+            {"type": "xss_attempt", "matched_text": "<script>"},
+        ],
+        "severity": "HIGH",
+        "risk_score": 80,
+        "threat_intelligence": {"threat_type": "scanner"} if n % 2 else None,
+        "rule_pack": "builtin@1",
+    }
+
+
+def _files(root):
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root)
+        for directory, _, names in os.walk(root)
+        for name in names
+    )
+
+
+def test_events_are_partitioned_by_environment_log_group_and_month(tmp_path):
+    pytest.importorskip("pyarrow")
+    sink = ArchiveSink(str(tmp_path), "staging")
+
+    sink.write(
+        [_event(0), _event(1, month="2024-06"), _event(2, log_group="/aws/ecs/api")]
+    )
+
+    directories = [os.path.dirname(f) for f in _files(str(tmp_path))]
+    assert directories == [
+        "environment=staging/log_group=%2Faws%2Fecs%2Fapi/month=2024-05",
+        "environment=staging/log_group=%2Faws%2Fsecurity%2Ftest-QuantumBallot/month=2024-05",
+        "environment=staging/log_group=%2Faws%2Fsecurity%2Ftest-QuantumBallot/month=2024-06",
+    ]
+    assert not any(".tmp" in f for f in _files(str(tmp_path)))
+
+
+def test_parquet_row_groups_and_dictionary_columns(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    sink = ArchiveSink(str(tmp_path), "dev", row_group_size=4)
+
+    (path,) = sink.write([_event(n) for n in range(10)])
+    parquet_file = pq.ParquetFile(path)
+    table = parquet_file.read()
+
+    assert parquet_file.metadata.num_row_groups == 3
+    assert table.num_rows == 10
+    for column in ("ip_address", "user", "severity"):
+        assert str(table.schema.field(column).type).startswith("dictionary")
+    assert str(table.schema.field("finding_types").type.value_type).startswith(
+        "dictionary"
+    )
+    first = table.slice(0, 2).to_pylist()
+    assert first[0]["finding_types"] == ["sql_injection", "xss_attempt"]
+    assert [row["threat_type"] for row in first] == [None, "scanner"]
+    assert first[1]["timestamp"].isoformat() == "2024-05-01T12:00:01"
+
+
+def test_arrow_ipc_batches(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    sink = ArchiveSink(str(tmp_path), "dev", file_format="arrow", row_group_size=4)
+
+    (path,) = sink.write([_event(n) for n in range(10)])
+    with pa.ipc.open_file(path) as reader:
+        assert reader.num_record_batches == 3
+        assert reader.read_all().column("risk_score").to_pylist() == [80] * 10
+
+
+def test_non_string_fields_from_json_logs_are_archived_as_text(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    sink = ArchiveSink(str(tmp_path), "dev")
+    mixed = _event(1)
+    mixed.update({"level": 5, "user": {"id": 1}, "ip_address": ["203.0.113.9"]})
+
+    (path,) = sink.write([_event(0), mixed])
+    rows = pq.read_table(path).to_pylist()
+
+    assert [row["level"] for row in rows] == ["WARN", "5"]
+    assert rows[1]["user"] == '{"id": 1}'
+    assert rows[1]["ip_address"] == '["203.0.113.9"]'
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        ArchiveSink("/tmp/archive", "dev", file_format="csv")
+
+
+def test_handler_archives_security_events(monkeypatch, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setenv("ARCHIVE_PATH", str(tmp_path))
+    monkeypatch.setenv("ENVIRONMENT", "test")
+    monkeypatch.setenv("ARCHIVE_BUFFER_MAX_EVENTS", "0")
+    monkeypatch.setattr(log_processor, "_archive_buffer", None)
+    monkeypatch.setattr(log_processor, "_archive_sink", None)
+
+    log_processor.lambda_handler(build_awslogs_event(ATTACK_LINES[:4] + CLEAN_LINES), None)
+
+    (path,) = _files(str(tmp_path))
+    assert path.startswith("environment=test/")
+    table = pq.read_table(os.path.join(str(tmp_path), path))
+    assert table.column("message").to_pylist() == ATTACK_LINES[:4]
+    assert set(table.column("rule_pack").to_pylist()) == {"builtin@1"}
+
+
+def test_failed_archive_write_is_retried(monkeypatch, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setenv("ARCHIVE_PATH", str(tmp_path))
+    monkeypatch.delenv("ARCHIVE_BUFFER_MAX_EVENTS", raising=False)
+    monkeypatch.setattr(log_processor, "_archive_buffer", None)
+    monkeypatch.setattr(log_processor, "_archive_sink", None)
+    buffer = log_processor.get_archive_buffer()
+    sink = log_processor._archive_sink
+    write = sink.write
+
+    def fail_once(events):
+        monkeypatch.setattr(sink, "write", write)
+        raise OSError("archive volume unavailable")
+
+    monkeypatch.setattr(sink, "write", fail_once)
+
+    assert not buffer.enabled
+    with pytest.raises(OSError):
+        buffer.add([_event(0)])
+    buffer.add([_event(1)])
+
+    (path,) = _files(str(tmp_path))
+    table = pq.read_table(os.path.join(str(tmp_path), path))
+    assert table.num_rows == 2
+
+
+def test_archive_retries_are_capped(monkeypatch, tmp_path):
+    monkeypatch.setenv("ARCHIVE_PATH", str(tmp_path))
+    monkeypatch.setenv("ARCHIVE_BUFFER_MAX_RETAINED_EVENTS", "2")
+    monkeypatch.setattr(log_processor, "_archive_buffer", None)
+    monkeypatch.setattr(log_processor, "_archive_sink", None)
+    metrics = PipelineMetrics()
+    monkeypatch.setattr(log_processor, "PIPELINE_METRICS", metrics)
+    buffer = log_processor.get_archive_buffer()
+
+    def unavailable(events):
+        raise OSError("archive volume unavailable")
+
+    monkeypatch.setattr(log_processor._archive_sink, "write", unavailable)
+
+    for n in range(5):
+        with pytest.raises(OSError):
+            buffer.add([_event(n)])
+
+    assert [e["message"] for e in buffer.events] == [
+        _event(3)["message"],
+        _event(4)["message"],
+    ]
+    metrics.collect()
+    assert metrics.counters["archive_events_dropped"] == 3
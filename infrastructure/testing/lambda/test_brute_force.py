@@ -0,0 +1,159 @@
+# """
+# Tests for sliding-window brute-force detection
+# """
+
+from datetime import datetime
+
+import log_processor
+from brute_force import BruteForceDetector, SlidingWindowCounter
+
+ATTACK_START = 1714564800
+
+
+def _failed_login(seconds, ip_address, user="unknown"):
+    return {
+        "timestamp": datetime.fromtimestamp(seconds).isoformat(),
+        "ip_address": ip_address,
+        "user": user,
+        "severity": "LOW",
+        "security_findings": [{"type": "brute_force"}],
+    }
+
+
+def _replay(detector, trace, batch_size=7):
+    #    """
+    #    Feed a trace through the detector in several batches, like separate invocations
+    #    """
+    for start in range(0, len(trace), batch_size):
+        detector.observe(trace[start : start + batch_size])
+    return trace
+
+
+def test_counter_slides_and_expires_buckets():
+    counter = SlidingWindowCounter(window_seconds=60, bucket_seconds=10, max_keys=10)
+
+    for offset in range(0, 60, 5):
+        counter.add("ip", ATTACK_START + offset)
+
+    assert counter.total("ip", ATTACK_START + 59) == 12
+    assert counter.total("ip", ATTACK_START + 69) == 10
+    assert counter.add("ip", ATTACK_START + 200) == 1
+    assert counter.add("ip", ATTACK_START + 50) == 1
+
+
+def test_counter_evicts_least_recently_seen_keys():
+    counter = SlidingWindowCounter(window_seconds=60, bucket_seconds=10, max_keys=2)
+
+    counter.add("a", ATTACK_START)
+    counter.add("b", ATTACK_START)
+    counter.add("a", ATTACK_START + 1)
+    counter.add("c", ATTACK_START + 2)
+
+    assert list(counter.keys) == ["a", "c"]
+    assert counter.evictions == 1
+
+
+def test_fast_attacker_crosses_ip_threshold_in_replayed_trace():
+    detector = BruteForceDetector(window_seconds=300, ip_threshold=20, user_threshold=100)
+    trace = [_failed_login(ATTACK_START + 8 * n, "203.0.113.7") for n in range(30)]
+
+    _replay(detector, trace)
+
+    attempts = [e["brute_force"]["ip_attempts"] for e in trace]
+    assert attempts == list(range(1, 31))
+    assert [e["brute_force"]["threshold_exceeded"] for e in trace] == [
+        n >= 19 for n in range(30)
+    ]
+    assert trace[19]["severity"] == "HIGH"
+    assert trace[18]["severity"] == "LOW"
+
+
+def test_slow_attacker_stays_under_threshold():
+    detector = BruteForceDetector(window_seconds=300, ip_threshold=20)
+    trace = [_failed_login(ATTACK_START + 60 * n, "198.51.100.23") for n in range(40)]
+
+    _replay(detector, trace)
+
+    assert max(e["brute_force"]["ip_attempts"] for e in trace) <= 6
+    assert not any(e["brute_force"]["threshold_exceeded"] for e in trace)
+
+
+def test_distributed_attack_on_one_user_crosses_user_threshold():
+    detector = BruteForceDetector(ip_threshold=20, user_threshold=10)
+    trace = [
+        _failed_login(ATTACK_START + n, f"10.0.{n}.1", user="election-admin")
+        for n in range(12)
+    ]
+
+    _replay(detector, trace, batch_size=3)
+
+    assert [e["brute_force"]["user_attempts"] for e in trace] == list(range(1, 13))
+    assert trace[9]["brute_force"]["threshold_exceeded"]
+    assert not trace[8]["brute_force"]["threshold_exceeded"]
+
+
+def test_events_without_brute_force_findings_are_ignored():
+    detector = BruteForceDetector()
+    event = {"security_findings": [{"type": "sql_injection"}], "severity": "HIGH"}
+
+    detector.observe([event])
+
+    assert "brute_force" not in event
+
+
+def test_non_string_users_from_json_logs_are_counted():
+    detector = BruteForceDetector()
+    events = [
+        log_processor.process_log_event(
+            {
+                "id": str(n),
+                "timestamp": ATTACK_START * 1000 + n,
+                "message": '{"message":"failed login","user":{"id":1}}',
+            },
+            "/test",
+        )
+        for n in range(2)
+    ]
+
+    detector.observe(events)
+
+    assert [e["brute_force"]["user_attempts"] for e in events] == [1, 2]
+    assert list(detector.user_counter.keys) == ['{"id": 1}']
+
+
+def test_state_survives_through_snapshot(tmp_path):
+    path = str(tmp_path / "brute_force.json")
+    first = BruteForceDetector(state_path=path, snapshot_interval=0)
+    _replay(first, [_failed_login(ATTACK_START + n, "203.0.113.7") for n in range(5)])
+
+    second = BruteForceDetector(state_path=path)
+    event = _failed_login(ATTACK_START + 6, "203.0.113.7")
+    second.observe([event])
+
+    assert event["brute_force"]["ip_attempts"] == 6
+
+
+def test_snapshot_with_different_layout_is_ignored(tmp_path):
+    path = str(tmp_path / "brute_force.json")
+    _replay(
+        BruteForceDetector(state_path=path, snapshot_interval=0),
+        [_failed_login(ATTACK_START, "203.0.113.7")],
+    )
+
+    detector = BruteForceDetector(state_path=path, bucket_seconds=30)
+
+    assert not detector.ip_counter.keys
+
+
+def test_risk_score_uses_window_counts():
+    below = {"security_findings": [{"type": "brute_force"}]}
+    below["brute_force"] = {"threshold_exceeded": False}
+    above = {"security_findings": [{"type": "brute_force"}]}
+    above["brute_force"] = {"threshold_exceeded": True}
+    unobserved = {"security_findings": [{"type": "brute_force"}]}
+
+    log_processor.enrich_security_events([below, above, unobserved])
+
+    assert below["risk_score"] == 10
+    assert above["risk_score"] == 35
+    assert unobserved["risk_score"] == 35
@@ -0,0 +1,55 @@
+# """
+# Tests for streaming CloudWatch Logs payload decoding
+# """
+
+import json
+
+import pytest
+
+from cloudwatch_payload import iter_log_events
+from corpus import ATTACK_LINES, CLEAN_LINES
+from payloads import build_log_data, encode_log_data
+
+
+@pytest.mark.parametrize("chunk_size", [4, 12, 64, 4096])
+def test_streaming_decode_matches_full_decode(chunk_size):
+    log_data = build_log_data(ATTACK_LINES + CLEAN_LINES + ["ünïcödé ✓ ballot"])
+    header = {}
+
+    events = list(iter_log_events(encode_log_data(log_data), header, chunk_size))
+
+    assert events == log_data["logEvents"]
+    assert header == {k: v for k, v in log_data.items() if k != "logEvents"}
+
+
+def test_events_before_log_group_are_held_until_it_is_known():
+    log_data = build_log_data(CLEAN_LINES)
+    reordered = {"logEvents": log_data.pop("logEvents"), **log_data}
+    header = {}
+    seen_groups = []
+
+    for _ in iter_log_events(encode_log_data(reordered), header, chunk_size=8):
+        seen_groups.append(header.get("logGroup"))
+
+    assert seen_groups == [log_data["logGroup"]] * len(CLEAN_LINES)
+
+
+def test_empty_log_events():
+    header = {}
+    assert list(iter_log_events(encode_log_data(build_log_data([])), header)) == []
+    assert header["messageType"] == "DATA_MESSAGE"
+
+
+def test_truncated_payload_raises():
+    data = encode_log_data(build_log_data(CLEAN_LINES))
+    truncated = data[: len(data) // 2 // 4 * 4]
+
+    with pytest.raises(ValueError):
+        list(iter_log_events(truncated, {}))
+
+
+def test_large_batch_streams_in_order():
+    messages = [json.dumps({"message": f"event {n}", "level": "INFO"}) for n in range(20000)]
+    events = iter_log_events(encode_log_data(build_log_data(messages)), {})
+
+    assert [e["message"] for e in events] == messages
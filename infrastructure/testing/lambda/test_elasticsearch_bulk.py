@@ -0,0 +1,107 @@
+# """
+# Tests for the Elasticsearch bulk indexer against a local stub server
+# """
+
+from datetime import datetime
+
+import elasticsearch_bulk
+import log_processor
+from elasticsearch_bulk import BulkIndexer
+from es_stub import StubElasticsearch
+
+
+def _documents(count, index_name="quantumballot-security-2024-05"):
+    return [(index_name, {"n": n, "message": "x" * 50}) for n in range(count)]
+
+
+def _indexer(endpoint, **kwargs):
+    kwargs.setdefault("backoff_seconds", 0)
+    return BulkIndexer(endpoint, **kwargs)
+
+
+def test_batches_are_capped_by_count_and_compressed():
+    with StubElasticsearch() as stub:
+        stats = _indexer(stub.endpoint, max_batch_docs=4).index(_documents(10))
+
+    assert stats == {"indexed": 10, "failed": 0, "retried": 0, "requests": 3}
+    assert [len(r["items"]) for r in stub.requests] == [4, 4, 2]
+    assert all(r["headers"]["Content-Encoding"] == "gzip" for r in stub.requests)
+    assert [d["n"] for d in stub.documents] == list(range(10))
+    assert stub.requests[0]["items"][0][0] == {
+        "index": {"_index": "quantumballot-security-2024-05"}
+    }
+
+
+def test_batches_are_capped_by_size():
+    with StubElasticsearch() as stub:
+        stats = _indexer(stub.endpoint, max_batch_bytes=300).index(_documents(6))
+
+    assert stats["indexed"] == 6
+    assert all(len(r["items"]) <= 2 for r in stub.requests)
+
+
+def test_keep_alive_connection_is_reused_across_calls():
+    with StubElasticsearch() as stub:
+        indexer = _indexer(stub.endpoint, max_batch_docs=2)
+        indexer.index(_documents(4))
+        indexer.index(_documents(4))
+        elasticsearch_bulk.discard_connection(stub.endpoint)
+
+    assert len(stub.requests) == 4
+    assert stub.connections == 1
+
+
+def test_only_failed_items_are_retried():
+    with StubElasticsearch(item_statuses=[[201, 429, 400, 503]]) as stub:
+        stats = _indexer(stub.endpoint).index(_documents(4))
+        elasticsearch_bulk.discard_connection(stub.endpoint)
+
+    assert stats == {"indexed": 3, "failed": 1, "retried": 2, "requests": 2}
+    assert [d["n"] for _, d in stub.requests[1]["items"]] == [1, 3]
+
+
+def test_whole_request_failures_are_retried_until_limit():
+    with StubElasticsearch(request_statuses=[503, 503, 503]) as stub:
+        stats = _indexer(stub.endpoint, max_retries=2).index(_documents(3))
+        elasticsearch_bulk.discard_connection(stub.endpoint)
+
+    assert stats == {"indexed": 0, "failed": 3, "retried": 6, "requests": 3}
+
+
+def test_rejected_request_is_not_retried():
+    with StubElasticsearch(request_statuses=[403]) as stub:
+        stats = _indexer(stub.endpoint).index(_documents(3))
+        elasticsearch_bulk.discard_connection(stub.endpoint)
+
+    assert stats["failed"] == 3
+    assert stats["requests"] == 1
+
+
+def test_send_to_elasticsearch_ships_events(monkeypatch):
+    with StubElasticsearch() as stub:
+        monkeypatch.setenv("ELASTICSEARCH_ENDPOINT", stub.endpoint)
+        log_processor.send_to_elasticsearch([{"severity": "HIGH"}, {"severity": "LOW"}])
+        elasticsearch_bulk.discard_connection(stub.endpoint)
+
+    assert [d["severity"] for d in stub.documents] == ["HIGH", "LOW"]
+    assert stub.requests[0]["items"][0][0]["index"]["_index"].startswith(
+        "quantumballot-security-"
+    )
+
+
+def test_events_are_indexed_by_their_own_month(monkeypatch):
+    events = [
+        {"timestamp": "2024-05-31T23:59:59.999000", "severity": "LOW"},
+        {"timestamp": "2024-06-01T00:00:00", "severity": "LOW"},
+        {"severity": "LOW"},
+    ]
+
+    with StubElasticsearch() as stub:
+        monkeypatch.setenv("ELASTICSEARCH_ENDPOINT", stub.endpoint)
+        log_processor.send_to_elasticsearch(events)
+        elasticsearch_bulk.discard_connection(stub.endpoint)
+
+    indices = [item["index"]["_index"] for item, _ in stub.requests[0]["items"]]
+    assert indices[:2] == ["quantumballot-security-2024-05", "quantumballot-security-2024-06"]
+    # Events without a timestamp fall back to the current month
+    assert indices[2] == f"quantumballot-security-{datetime.now().strftime('%Y-%m')}"
@@ -0,0 +1,106 @@
+# """
+# Tests for batch threat intelligence enrichment and risk scoring
+# """
+
+import copy
+
+import legacy_reference
+import log_processor
+from corpus import ATTACK_LINES
+from es_stub import StubElasticsearch
+from payloads import LOG_GROUP, build_awslogs_event
+from rollups import RollupAggregator
+
+IP_ADDRESSES = ["10.0.0.50", "192.168.1.100", "203.0.113.7", "unknown", ""]
+
+
+def _security_events():
+    #    """
+    #    Security events covering every finding type, IP verdict and brute-force state
+    #    """
+    events = []
+    for n, line in enumerate(ATTACK_LINES * 3):
+        event = log_processor.process_log_event(
+            {"timestamp": 1714564800000 + n, "message": line}, LOG_GROUP
+        )
+        event["ip_address"] = IP_ADDRESSES[n % len(IP_ADDRESSES)]
+        if n % 4 == 1:
+            event["brute_force"] = {"threshold_exceeded": n % 8 == 1}
+        events.append(event)
+    return events
+
+
+def test_batch_scores_match_per_event_functions(monkeypatch):
+    monkeypatch.setattr(log_processor, "_threat_intel_provider", None)
+    monkeypatch.delenv("THREAT_INTEL_PATH", raising=False)
+    events = _security_events()
+    expected = [
+        legacy_reference.calculate_risk_score(
+            legacy_reference.enrich_with_threat_intelligence(event)
+        )
+        for event in copy.deepcopy(events)
+    ]
+
+    log_processor.enrich_security_events(events)
+
+    assert events == expected
+    assert any("threat_intelligence" in e for e in events)
+    assert max(e["risk_score"] for e in events) == 100
+
+
+def test_batch_resolves_each_distinct_ip_once(monkeypatch):
+    lookups = []
+    index = log_processor.get_threat_intel_provider().get_index()
+    monkeypatch.setattr(index, "lookup", lambda ip: lookups.append(ip))
+
+    log_processor.enrich_security_events(_security_events())
+
+    assert sorted(lookups) == sorted(IP_ADDRESSES)
+
+
+def test_non_string_ips_are_scored_without_lookup(monkeypatch):
+    monkeypatch.setattr(log_processor, "_threat_intel_provider", None)
+    monkeypatch.delenv("THREAT_INTEL_PATH", raising=False)
+    events = _security_events()[:3]
+    events[0]["ip_address"] = ["10.0.0.50"]
+    events[1]["ip_address"] = {"client": "10.0.0.50"}
+    events[2]["ip_address"] = "10.0.0.50"
+
+    log_processor.enrich_security_events(events)
+
+    assert all("risk_score" in e for e in events)
+    assert "threat_intelligence" not in events[0]
+    assert "threat_intelligence" not in events[1]
+    assert "threat_intelligence" in events[2]
+
+
+def test_alert_decision_uses_risk_score():
+    assert log_processor.should_alert({"severity": "HIGH", "risk_score": 10})
+    assert log_processor.should_alert({"severity": "MEDIUM", "risk_score": 80})
+    assert not log_processor.should_alert({"severity": "MEDIUM", "risk_score": 74})
+    assert log_processor.should_alert({"severity": "LOW", "risk_score": 40}, threshold=40)
+
+
+def test_handler_ships_scores_and_alerts_on_risk(monkeypatch):
+    alerts = []
+    monkeypatch.setattr(log_processor, "send_security_alert", alerts.extend)
+    monkeypatch.setattr(log_processor, "_threat_intel_provider", None)
+    monkeypatch.delenv("THREAT_INTEL_PATH", raising=False)
+    # Rollups for the 2024 test timestamps would otherwise ship immediately
+    monkeypatch.setattr(
+        log_processor, "_rollup_aggregator", RollupAggregator(grace_seconds=float("inf"))
+    )
+    # MEDIUM path traversal from a known scanner scores 70
+    lines = [
+        "GET /static/../app.env from 10.0.0.50",
+        "GET /static/../app.env from 203.0.113.9",
+    ]
+
+    with StubElasticsearch() as stub:
+        monkeypatch.setenv("ELASTICSEARCH_ENDPOINT", stub.endpoint)
+        monkeypatch.setenv("RISK_ALERT_THRESHOLD", "70")
+        log_processor.lambda_handler(build_awslogs_event(lines), None)
+
+    assert [d["risk_score"] for d in stub.documents] == [70, 30]
+    assert [d["severity"] for d in stub.documents] == ["MEDIUM", "MEDIUM"]
+    assert [a["ip_address"] for a in alerts] == ["10.0.0.50"]
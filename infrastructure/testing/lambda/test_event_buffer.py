@@ -0,0 +1,122 @@
+# """
+# Tests for the cross-invocation event buffer
+# """
+
+import signal
+
+import pytest
+
+import log_processor
+from corpus import ATTACK_LINES
+from es_stub import StubElasticsearch
+from event_buffer import EventBuffer
+from fake_clock import FakeClock, FakeContext
+from payloads import build_awslogs_event
+from rollups import RollupAggregator
+
+
+def test_disabled_buffer_flushes_every_batch():
+    flushed = []
+    buffer = EventBuffer(flushed.append)
+
+    assert buffer.add([1, 2])
+    assert buffer.add([3])
+    assert not buffer.add([])
+    assert flushed == [[1, 2], [3]]
+
+
+def test_flushes_on_size_age_and_deadline():
+    flushed = []
+    clock = FakeClock()
+    buffer = EventBuffer(
+        flushed.append, max_events=5, max_age_seconds=30, deadline_margin_ms=2000, clock=clock
+    )
+
+    assert not buffer.add([1, 2, 3], FakeContext())
+    assert buffer.add([4, 5], FakeContext())
+
+    buffer.add([6], FakeContext())
+    clock.now += 30
+    assert buffer.add([], FakeContext())
+
+    buffer.add([7], FakeContext())
+    assert buffer.add([8], FakeContext(remaining_ms=1500))
+
+    assert flushed == [[1, 2, 3, 4, 5], [6], [7, 8]]
+
+
+def test_failed_flush_keeps_events_for_the_next_flush():
+    flushed = []
+
+    def flush_events(events):
+        if not flushed:
+            flushed.append(None)
+            raise OSError("archive volume unavailable")
+        flushed.append(events)
+
+    buffer = EventBuffer(flush_events)
+
+    with pytest.raises(OSError):
+        buffer.add([1, 2])
+    assert buffer.events == [1, 2]
+    assert buffer.add([3])
+    assert flushed == [None, [1, 2, 3]]
+
+
+def test_repeated_failures_keep_only_the_newest_events():
+    def flush_events(events):
+        raise OSError("archive volume unavailable")
+
+    buffer = EventBuffer(flush_events, max_retained_events=5)
+
+    for batch in ([1, 2, 3], [4, 5, 6], [7, 8]):
+        with pytest.raises(OSError):
+            buffer.add(batch)
+
+    assert buffer.events == [4, 5, 6, 7, 8]
+    assert buffer.dropped == 3
+
+
+def test_sigterm_flushes_then_chains_previous_handler():
+    flushed = []
+    previous = []
+    original = signal.signal(signal.SIGTERM, lambda signum, frame: previous.append(signum))
+    try:
+        buffer = EventBuffer(flushed.append, max_events=100)
+        buffer.install_shutdown_hooks()
+        buffer.add([1, 2])
+
+        signal.raise_signal(signal.SIGTERM)
+    finally:
+        signal.signal(signal.SIGTERM, original)
+
+    assert flushed == [[1, 2]]
+    assert previous == [signal.SIGTERM]
+
+
+def test_small_invocations_share_bulk_requests(monkeypatch):
+    monkeypatch.setattr(log_processor, "send_security_alert", lambda events: None)
+    monkeypatch.setattr(
+        log_processor, "_rollup_aggregator", RollupAggregator(grace_seconds=float("inf"))
+    )
+    invocations = 100
+
+    with StubElasticsearch() as stub:
+        monkeypatch.setenv("ELASTICSEARCH_ENDPOINT", stub.endpoint)
+        monkeypatch.setattr(
+            log_processor,
+            "_event_buffer",
+            EventBuffer(log_processor.send_to_elasticsearch, max_events=150),
+        )
+        for n in range(invocations):
+            log_processor.lambda_handler(
+                build_awslogs_event(ATTACK_LINES[n % 10 : n % 10 + 3]), FakeContext()
+            )
+        log_processor.get_event_buffer().flush()
+
+    # HIGH events skip the buffer on the priority lane; the rest are coalesced
+    bulk_requests = [
+        r for r in stub.requests if "-priority-" not in r["items"][0][0]["index"]["_index"]
+    ]
+    assert len(stub.documents) == 3 * invocations
+    assert len(bulk_requests) * 10 <= invocations
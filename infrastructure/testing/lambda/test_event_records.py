@@ -0,0 +1,104 @@
+# """
+# Tests for the slotted security event and finding records
+# """
+
+import copy
+import json
+import pickle
+
+import pytest
+
+import log_processor
+from event_records import Finding, SecurityEvent, to_document
+
+
+def _event():
+    return log_processor.process_log_event(
+        {
+            "id": "1",
+            "timestamp": 1714564800000,
+            "message": "GET /search?q=1' UNION SELECT password FROM users from 10.0.0.50",
+        },
+        "/test",
+    )
+
+
+def test_events_read_and_update_like_dicts():
+    event = _event()
+
+    assert isinstance(event, SecurityEvent)
+    assert event["severity"] == "HIGH"
+    assert event.get("risk_score") is None
+    assert event.get("risk_score", 0) == 0
+    assert "brute_force" not in event
+    assert event.get("keys") is None
+
+    event["risk_score"] = 50
+    assert event["risk_score"] == 50
+    assert "risk_score" in event
+    assert list(event)[-1] == "risk_score"
+    del event["risk_score"]
+    assert "risk_score" not in event
+
+    with pytest.raises(KeyError):
+        event["unexpected_field"] = 1
+    with pytest.raises(KeyError):
+        event["threat_intelligence"]
+
+
+def test_findings_refer_to_patterns_by_id():
+    (finding,) = _event()["security_findings"]
+
+    assert finding == {
+        "type": "sql_injection",
+        "pattern_id": "sql_injection:0",
+        "matched_text": "UNION SELECT",
+    }
+    assert (
+        log_processor.SECURITY_PATTERN_MATCHER.pattern_ids[finding["pattern_id"]]
+        == log_processor.SECURITY_PATTERNS["sql_injection"][0]
+    )
+
+
+def test_records_serialize_to_plain_documents():
+    event = _event()
+    event["risk_score"] = 90
+
+    document = json.loads(json.dumps(to_document(event)))
+
+    assert type(to_document(event)) is dict
+    assert to_document(document) is document
+    assert document == event.to_dict()
+    assert document["security_findings"][0]["pattern_id"] == "sql_injection:0"
+    assert "pattern" not in document["security_findings"][0]
+    assert "brute_force" not in document
+
+
+def test_json_nulls_are_kept_as_values():
+    event = log_processor.process_log_event(
+        {
+            "id": "1",
+            "timestamp": 1714564800000,
+            "message": json.dumps(
+                {"message": "<script>alert(1)</script>", "user": None}
+            ),
+        },
+        "/test",
+    )
+
+    assert "user" in event
+    assert event.get("user", "unknown") is None
+    assert json.loads(json.dumps(to_document(event)))["user"] is None
+    with pytest.raises(KeyError):
+        del event["user"]
+
+
+def test_records_copy_and_pickle():
+    event = _event()
+
+    assert copy.deepcopy(event) == event
+    assert pickle.loads(pickle.dumps(event)) == event
+    assert "risk_score" not in pickle.loads(pickle.dumps(event))
+    assert Finding("xss_attempt", "xss_attempt:0", "<script>") != Finding(
+        "xss_attempt", "xss_attempt:1", "<script>"
+    )
@@ -0,0 +1,115 @@
+# """
+# Tests for load-aware sampling of lower-severity security events
+# """
+
+import copy
+
+import log_processor
+from corpus import ATTACK_LINES
+from es_stub import StubElasticsearch
+from event_sampler import AdaptiveSampler
+from fake_clock import FakeClock
+from payloads import build_awslogs_event
+from rollups import RollupAggregator
+
+SAMPLING_START = 1714564800.0
+
+
+def _events(count, severity="LOW", offset=0):
+    return [
+        {
+            "timestamp": f"2024-05-01T12:00:00.{offset + n:06d}",
+            "log_group": "/test",
+            "message": "permission denied for user admin",
+            "severity": severity,
+        }
+        for n in range(count)
+    ]
+
+
+def test_disabled_sampler_passes_events_through_unchanged():
+    events = _events(1000)
+
+    assert AdaptiveSampler().sample(events) is events
+    assert "sample_weight" not in events[0]
+
+
+def test_events_within_budget_are_all_kept_with_unit_weight():
+    sampler = AdaptiveSampler(
+        target_events_per_second=100, clock=FakeClock(SAMPLING_START)
+    )
+
+    kept = sampler.sample(_events(500))
+
+    assert len(kept) == 500
+    assert {e["sample_weight"] for e in kept} == {1.0}
+
+
+def test_over_budget_keeps_high_events_and_weights_sampled_ones():
+    sampler = AdaptiveSampler(
+        target_events_per_second=100,
+        window_seconds=10,
+        clock=FakeClock(SAMPLING_START),
+    )
+    high = _events(50, severity="HIGH", offset=900000)
+
+    kept = sampler.sample(_events(10000) + high)
+
+    sampled = [e for e in kept if e["severity"] == "LOW"]
+    assert [e for e in kept if e["severity"] == "HIGH"] == high
+    assert {e["sample_weight"] for e in high} == {1.0}
+    assert {e["sample_weight"] for e in sampled} == {10.0}
+    # Weights reconstruct the original count to within sampling error
+    assert abs(sum(e["sample_weight"] for e in sampled) - 10000) < 1000
+    assert sampler.counters() == {
+        "events_sampled_kept": len(kept),
+        "events_sampled_dropped": 10050 - len(kept),
+    }
+
+
+def test_decisions_are_deterministic_per_fingerprint():
+    events = _events(5000, severity="MEDIUM")
+
+    first = AdaptiveSampler(
+        target_events_per_second=50, clock=FakeClock(SAMPLING_START)
+    )
+    second = AdaptiveSampler(
+        target_events_per_second=50, clock=FakeClock(SAMPLING_START)
+    )
+
+    kept = first.sample(copy.deepcopy(events))
+    assert kept == second.sample(copy.deepcopy(events))
+    assert 0 < len(kept) < len(events)
+
+
+def test_rate_window_slides():
+    clock = FakeClock(SAMPLING_START)
+    sampler = AdaptiveSampler(target_events_per_second=10, window_seconds=5, clock=clock)
+
+    sampler.sample(_events(500))
+    assert sampler.probability() == 0.1
+
+    clock.now += 5
+    assert len(sampler.sample(_events(20))) == 20
+    assert sampler.probability() == 1.0
+
+
+def test_handler_ships_sampled_events_but_rolls_up_every_event(monkeypatch):
+    monkeypatch.setattr(log_processor, "send_security_alert", lambda events: None)
+    monkeypatch.setattr(
+        log_processor,
+        "EVENT_SAMPLER",
+        AdaptiveSampler(target_events_per_second=1, window_seconds=10),
+    )
+    rollups = RollupAggregator(grace_seconds=float("inf"))
+    monkeypatch.setattr(log_processor, "_rollup_aggregator", rollups)
+    lines = ["GET /../etc/passwd from 10.0.0.50"] * 200 + ATTACK_LINES[:1]
+
+    with StubElasticsearch() as stub:
+        monkeypatch.setenv("ELASTICSEARCH_ENDPOINT", stub.endpoint)
+        log_processor.lambda_handler(build_awslogs_event(lines), None)
+
+    shipped = stub.documents
+    assert 0 < len(shipped) < 100
+    assert any(d["severity"] == "HIGH" and d["sample_weight"] == 1.0 for d in shipped)
+    assert sum(d["events"] for d in rollups.flush()) == 201
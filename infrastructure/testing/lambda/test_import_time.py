@@ -0,0 +1,83 @@
+# """
+# Import-time regression tests for the Lambda cold start path
+# """
+
+import os
+import subprocess
+import sys
+
+import aws_clients
+from conftest import LAMBDA_SOURCE_DIRS
+
+# Modules a cold start must not import before a handler needs them
+DEFERRED_MODULES = (
+    "boto3",
+    "botocore",
+    "psycopg2",
+    "multiprocessing",
+    "pyarrow",
+    "asyncio",
+    "concurrent",
+)
+
+
+def import_times(module):
+    #    """
+    #    Import module in a fresh interpreter and return {module: cumulative microseconds}
+    #    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(LAMBDA_SOURCE_DIRS))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def _deferred(times):
+    return sorted(
+        name for name in times if name.split(".")[0] in DEFERRED_MODULES
+    )
+
+
+def test_log_processor_import_defers_aws_sdk():
+    times = import_times("log_processor")
+
+    assert "log_processor" in times
+    assert _deferred(times) == []
+
+
+def test_secret_rotation_import_defers_aws_sdk_and_driver():
+    times = import_times("secret_rotation")
+
+    assert "secret_rotation" in times
+    assert _deferred(times) == []
+
+
+class FakeSession:
+    def __init__(self):
+        self.created = []
+
+    def client(self, service_name, **options):
+        self.created.append(service_name)
+        return object()
+
+
+def test_clients_are_built_once_on_first_use(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(aws_clients, "_clients", {})
+    monkeypatch.setattr(aws_clients, "_session", session)
+
+    sns = aws_clients.get_client("sns")
+
+    assert aws_clients.get_client("sns") is sns
+    assert aws_clients.get_client("sns", region_name="eu-west-1") is not sns
+    assert session.created == ["sns", "sns"]
@@ -0,0 +1,274 @@
+# """
+# Tests for the log processing Lambda security analysis
+# """
+
+import json
+import random
+from datetime import datetime
+from time import perf_counter
+
+import legacy_reference
+import log_processor
+from corpus import (
+    ATTACK_LINES,
+    CLEAN_LINES,
+    FIELD_FRAGMENTS,
+    JSON_LINES,
+    NEAR_MISS_LINES,
+)
+from payloads import build_awslogs_event
+
+
+def _with_pattern_text(findings, matcher=None):
+    #    """
+    #    Findings in the reference shape, with pattern IDs resolved to the pattern
+    #    """
+    matcher = matcher or log_processor.SECURITY_PATTERN_MATCHER
+    return [
+        {
+            "type": f["type"],
+            "pattern": matcher.pattern_ids[f["pattern_id"]],
+            "matched_text": f["matched_text"],
+        }
+        for f in findings
+    ]
+
+
+def test_combined_matcher_matches_reference_on_corpus():
+    for line in ATTACK_LINES + CLEAN_LINES:
+        assert _with_pattern_text(
+            log_processor.analyze_security_patterns(line)
+        ) == legacy_reference.analyze_security_patterns(line)
+
+
+def test_combined_matcher_reports_every_matching_pattern():
+    findings = log_processor.analyze_security_patterns(
+        "x' or 1=1; cat /etc/passwd && rm -rf / <script>alert(1)</script>"
+    )
+
+    assert [f["type"] for f in findings] == [
+        "sql_injection",
+        "xss_attempt",
+        "xss_attempt",
+        "command_injection",
+        "command_injection",
+        "path_traversal",
+    ]
+
+
+def test_clean_line_has_no_findings():
+    assert log_processor.analyze_security_patterns(CLEAN_LINES[0]) == []
+
+
+def test_combined_matcher_matches_reference_on_mixed_fragments():
+    rng = random.Random(1337)
+    fragments = [line.split(" ", 1)[-1] for line in ATTACK_LINES + CLEAN_LINES]
+    for _ in range(500):
+        line = " ".join(rng.sample(fragments, rng.randint(1, 4)))
+        assert _with_pattern_text(
+            log_processor.analyze_security_patterns(line)
+        ) == legacy_reference.analyze_security_patterns(line)
+
+
+def test_combined_matcher_handles_non_ascii_case_folding():
+    for line in ["x UNION ſELECT 1", "GET /é/../etc/passwd", "Ünauthorized access"]:
+        assert _with_pattern_text(
+            log_processor.analyze_security_patterns(line)
+        ) == legacy_reference.analyze_security_patterns(line)
+
+
+def test_matcher_supports_case_sensitive_and_backreference_patterns():
+    patterns = {
+        "custom": [r"DROP\s+DATABASE", r"(['\"]).*\1\s*--", r"(?i)(token=\w+)"],
+    }
+    matcher = log_processor.SecurityPatternMatcher(patterns)
+
+    for line in [
+        "DROP DATABASE ballots",
+        "drop database ballots",
+        "name='x' -- TOKEN=abc",
+        'say "hi" --',
+        "nothing to see",
+    ]:
+        assert _with_pattern_text(
+            matcher.analyze(line), matcher
+        ) == legacy_reference.analyze_security_patterns(line, patterns)
+
+
+def test_prefilter_does_not_change_findings():
+    unfiltered = log_processor.SecurityPatternMatcher(log_processor.SECURITY_PATTERNS)
+    for line in ATTACK_LINES + CLEAN_LINES + NEAR_MISS_LINES:
+        assert log_processor.SECURITY_PATTERN_MATCHER.analyze(
+            line
+        ) == unfiltered.analyze(line)
+
+
+def test_prefilter_does_not_change_findings_on_mutated_lines():
+    rng = random.Random(2024)
+    unfiltered = log_processor.SecurityPatternMatcher(log_processor.SECURITY_PATTERNS)
+    whitespace = " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+    for _ in range(2000):
+        line = rng.choice(ATTACK_LINES + CLEAN_LINES + NEAR_MISS_LINES)
+        chars = [
+            rng.choice(whitespace) if c == " " and rng.random() < 0.3 else c
+            for c in line
+        ]
+        line = "".join(c.upper() if rng.random() < 0.3 else c for c in chars)
+        assert log_processor.SECURITY_PATTERN_MATCHER.analyze(
+            line
+        ) == unfiltered.analyze(line), repr(line)
+
+
+def test_prefilter_skips_clean_lines():
+    matcher = log_processor.SecurityPatternMatcher(
+        log_processor.SECURITY_PATTERNS, log_processor.SECURITY_PREFILTER_KEYWORDS
+    )
+    for line in CLEAN_LINES:
+        matcher.analyze(line)
+
+    assert matcher.prefilter_checked == len(CLEAN_LINES)
+    assert matcher.prefilter_skipped >= len(CLEAN_LINES) - 1
+
+
+def test_lambda_handler_counts_processed_and_security_events():
+    response = log_processor.lambda_handler(
+        build_awslogs_event(ATTACK_LINES[:3] + CLEAN_LINES), None
+    )
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {
+        "processed_events": 3 + len(CLEAN_LINES),
+        "security_events": 3,
+        "high_severity_events": 3,
+    }
+
+
+def test_parse_json_message_matches_reference_for_objects_and_text():
+    for line in JSON_LINES + CLEAN_LINES + ["{not json", "", "   ", "[1, 2]", "42"]:
+        expected = legacy_reference.parse_json_message(line)
+        parsed = log_processor.parse_json_message(line)
+        if not isinstance(expected, dict):
+            assert parsed is None
+            continue
+        # orjson reads integers beyond 64 bits as floats; only the string
+        # fields process_log_event reads have to agree exactly
+        for field in ("message", "level", "user", "ip_address", "user_agent"):
+            assert parsed.get(field) == expected.get(field)
+        assert parsed.keys() == expected.keys()
+
+
+def test_process_log_event_same_with_and_without_fast_decoder(monkeypatch):
+    lines = JSON_LINES + ATTACK_LINES
+    events = [{"message": line, "timestamp": 1714564800000} for line in lines]
+    accelerated = [log_processor.process_log_event(e, "group") for e in events]
+
+    monkeypatch.setattr(log_processor, "_fast_json_loads", None)
+    stdlib = [log_processor.process_log_event(e, "group") for e in events]
+
+    assert accelerated == stdlib
+    assert accelerated[2]["ip_address"] == "192.168.1.100"
+
+
+def test_extract_fields_matches_reference_helpers():
+    for line in ATTACK_LINES + CLEAN_LINES + NEAR_MISS_LINES + FIELD_FRAGMENTS:
+        assert log_processor.extract_fields(line) == legacy_reference.extract_fields(line)
+
+    rng = random.Random(7)
+    for _ in range(3000):
+        line = rng.choice([" ", "", "|"]).join(
+            rng.choice(FIELD_FRAGMENTS) for _ in range(rng.randint(1, 6))
+        )
+        assert log_processor.extract_fields(line) == legacy_reference.extract_fields(
+            line
+        ), repr(line)
+
+
+def test_text_fields_only_extracted_for_findings(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        log_processor, "extract_fields", lambda m: calls.append(m) or ("INFO",) * 4
+    )
+
+    for line in CLEAN_LINES + ATTACK_LINES[:2]:
+        log_processor.process_log_event({"message": line, "timestamp": 0}, "group")
+
+    assert calls == ATTACK_LINES[:2]
+
+
+def _detections(findings):
+    return [(f["type"], f["matched_text"]) for f in findings]
+
+
+def test_bounded_patterns_keep_detection_on_corpus():
+    unbounded = log_processor.SecurityPatternMatcher(
+        legacy_reference.UNBOUNDED_SECURITY_PATTERNS
+    )
+    assert legacy_reference.UNBOUNDED_SECURITY_PATTERNS != log_processor.SECURITY_PATTERNS
+
+    rng = random.Random(17)
+    fragments = [line.split(" ", 1)[-1] for line in ATTACK_LINES + CLEAN_LINES]
+    mixed = [" ".join(rng.sample(fragments, rng.randint(1, 4))) for _ in range(500)]
+    for line in ATTACK_LINES + CLEAN_LINES + NEAR_MISS_LINES + mixed:
+        assert _detections(
+            log_processor.SECURITY_PATTERN_MATCHER.analyze(line)
+        ) == _detections(unbounded.analyze(line)), line
+
+
+def test_pathological_messages_scan_quickly():
+    # Each took seconds to minutes with the unbounded patterns
+    matcher = log_processor.SecurityPatternMatcher(
+        log_processor.SECURITY_PATTERNS, max_scan_length=float("inf")
+    )
+    for message in [
+        "select " * 20000,
+        "select" + " " * 100000,
+        "<script " * 20000,
+    ]:
+        started = perf_counter()
+        assert matcher.analyze(message) == []
+        assert perf_counter() - started < 2.0
+
+
+def test_long_messages_are_scanned_in_windows():
+    matcher = log_processor.SecurityPatternMatcher(
+        log_processor.SECURITY_PATTERNS, scan_window=1024, max_scan_length=8192
+    )
+    # The SQL injection straddles the end of the first window
+    message = "x" * 1015 + " union select 1 " + "y" * 3000 + " ../../etc/passwd " + "z" * 1000
+
+    findings = matcher.analyze(message)
+
+    assert [f["type"] for f in findings] == [
+        "sql_injection",
+        "path_traversal",
+        "path_traversal",
+    ]
+    assert findings[0]["matched_text"] == "union select"
+    assert matcher.windowed_scans == 1
+    assert matcher.truncated_scans == 0
+
+
+def test_scan_stops_at_max_scan_length():
+    matcher = log_processor.SecurityPatternMatcher(
+        log_processor.SECURITY_PATTERNS, scan_window=1024, max_scan_length=4096
+    )
+
+    assert matcher.analyze("x" * 5000 + " union select 1") == []
+    assert matcher.analyze("x" * 3000 + " union select 1" + "x" * 5000) != []
+    assert matcher.counters() == {"scan_windowed": 2, "scan_truncated": 2}
+
+
+def test_event_timestamps_match_datetime_isoformat():
+    rng = random.Random(5)
+    start = 1714564800000
+    timestamps = [start, start + 1, start + 999, start + 1000, start - 1]
+    timestamps += sorted(start + rng.randrange(0, 86400000) for _ in range(2000))
+    timestamps += [rng.randrange(0, 4102444800000) for _ in range(2000)]
+
+    for timestamp in timestamps:
+        assert log_processor.format_event_timestamp(
+            timestamp
+        ) == datetime.fromtimestamp(timestamp / 1000).isoformat()
+    assert log_processor.format_event_timestamp(
+        1714564800123.5
+    ) == datetime.fromtimestamp(1714564800123.5 / 1000).isoformat()
@@ -0,0 +1,101 @@
+# """
+# Tests for the priority and bulk output lanes of the log processor
+# """
+
+import threading
+import time
+
+import log_processor
+from corpus import ATTACK_LINES
+from es_stub import StubElasticsearch
+from event_buffer import EventBuffer
+from payloads import build_awslogs_event
+from pipeline_metrics import PipelineMetrics
+from rollups import RollupAggregator
+
+# SQL injection is HIGH, path traversal MEDIUM
+LINES = [ATTACK_LINES[0], "GET /static/../app.env from 203.0.113.9"]
+
+
+class StalledSink:
+    #    """
+    #    Bulk flush that blocks until released, like a hung _bulk request
+    #    """
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.released = threading.Event()
+        self.events = []
+
+    def __call__(self, events):
+        self.entered.set()
+        self.released.wait(10)
+        self.events.extend(events)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_alerts_are_not_blocked_by_a_stalled_bulk_sink(monkeypatch):
+    sink = StalledSink()
+    alerted = threading.Event()
+    alerts = []
+
+    def send_security_alert(alert_events):
+        alerts.extend(alert_events)
+        alerted.set()
+
+    monkeypatch.setattr(log_processor, "send_security_alert", send_security_alert)
+    monkeypatch.setattr(log_processor, "_event_buffer", EventBuffer(sink))
+    monkeypatch.setattr(
+        log_processor, "_rollup_aggregator", RollupAggregator(grace_seconds=float("inf"))
+    )
+    metrics = PipelineMetrics(
+        stages=("decode", "json_parse", "pattern_match", "field_extraction"),
+        counters=("lines", "json_lines", "text_lines", "security_events"),
+    )
+    monkeypatch.setattr(log_processor, "PIPELINE_METRICS", metrics)
+    monkeypatch.setattr(log_processor, "_next_metrics_sample", metrics.sampler.__next__)
+
+    with StubElasticsearch() as stub:
+        monkeypatch.setenv("ELASTICSEARCH_ENDPOINT", stub.endpoint)
+        handler = threading.Thread(
+            target=log_processor.lambda_handler, args=(build_awslogs_event(LINES), None)
+        )
+        handler.start()
+        try:
+            assert sink.entered.wait(5)
+            # The bulk lane is stuck, yet the alert and the priority index
+            # have already gone out
+            assert alerted.wait(5)
+            assert [a["severity"] for a in alerts] == ["HIGH"]
+            assert _wait_for(lambda: stub.requests)
+            priority = [item for r in stub.requests for item, _ in r["items"]]
+            assert [i["index"]["_index"][:32] for i in priority] == [
+                "quantumballot-security-priority-"
+            ]
+            assert handler.is_alive()
+        finally:
+            sink.released.set()
+            handler.join(10)
+
+    assert not handler.is_alive()
+    assert [e["severity"] for e in sink.events] == ["MEDIUM"]
+    assert metrics.timers["time_to_alert"] > 0
+
+
+def test_send_to_elasticsearch_priority_index(monkeypatch, caplog):
+    with StubElasticsearch() as stub:
+        monkeypatch.setenv("ELASTICSEARCH_ENDPOINT", stub.endpoint)
+        log_processor.send_to_elasticsearch([{"severity": "HIGH"}], priority=True)
+        log_processor.send_to_elasticsearch([])
+
+    (request,) = stub.requests
+    assert request["items"][0][0]["index"]["_index"].startswith(
+        "quantumballot-security-priority-"
+    )
+    assert not [r for r in caplog.records if r.levelname == "ERROR"]
@@ -0,0 +1,85 @@
+# """
+# Tests for opt-in parallel log event analysis
+# """
+
+import os
+
+import log_processor
+from corpus import ATTACK_LINES, CLEAN_LINES
+from parallel_analysis import process_log_events
+from payloads import LOG_GROUP, build_awslogs_event, build_log_data
+
+PARENT_PID = os.getpid()
+
+
+def _events(count):
+    messages = [(ATTACK_LINES + CLEAN_LINES)[n % 32] for n in range(count)]
+    return build_log_data(messages)["logEvents"]
+
+
+def _tag_with_pid(log_event, log_group):
+    return (log_event["id"], log_group, os.getpid())
+
+
+def _exit_in_child_on_event_7(log_event, log_group):
+    if log_event["id"] == "7" and os.getpid() != PARENT_PID:
+        os._exit(1)
+    return log_event["id"]
+
+
+def _configure(monkeypatch, workers, min_batch, chunk_size=10):
+    monkeypatch.setenv("LOG_PARALLEL_WORKERS", str(workers))
+    monkeypatch.setenv("LOG_PARALLEL_MIN_BATCH", str(min_batch))
+    monkeypatch.setenv("LOG_PARALLEL_CHUNK_SIZE", str(chunk_size))
+
+
+def test_parallel_results_match_serial_order(monkeypatch):
+    events = _events(250)
+    header = {"logGroup": LOG_GROUP}
+    serial = [log_processor.process_log_event(e, LOG_GROUP) for e in events]
+
+    _configure(monkeypatch, workers=3, min_batch=50)
+    parallel = list(process_log_events(log_processor.process_log_event, iter(events), header))
+
+    assert parallel == serial
+
+
+def test_parallel_mode_uses_worker_processes(monkeypatch):
+    _configure(monkeypatch, workers=2, min_batch=20)
+    results = list(
+        process_log_events(_tag_with_pid, iter(_events(100)), {"logGroup": LOG_GROUP})
+    )
+
+    assert [r[0] for r in results] == [str(n) for n in range(100)]
+    assert {r[1] for r in results} == {LOG_GROUP}
+    assert PARENT_PID not in {r[2] for r in results}
+
+
+def test_small_batches_fall_back_to_serial(monkeypatch):
+    _configure(monkeypatch, workers=4, min_batch=100)
+    results = list(
+        process_log_events(_tag_with_pid, iter(_events(99)), {"logGroup": LOG_GROUP})
+    )
+
+    assert {r[2] for r in results} == {PARENT_PID}
+
+
+def test_dead_worker_chunk_is_processed_inline(monkeypatch):
+    _configure(monkeypatch, workers=2, min_batch=10, chunk_size=5)
+    results = list(
+        process_log_events(
+            _exit_in_child_on_event_7, iter(_events(60)), {"logGroup": LOG_GROUP}
+        )
+    )
+
+    assert results == [str(n) for n in range(60)]
+
+
+def test_lambda_handler_parallel_mode(monkeypatch):
+    _configure(monkeypatch, workers=2, min_batch=10)
+    event = build_awslogs_event((ATTACK_LINES + CLEAN_LINES) * 3)
+
+    response = log_processor.lambda_handler(event, None)
+
+    assert '"processed_events": 96' in response["body"]
+    assert f'"security_events": {len(ATTACK_LINES) * 3}' in response["body"]
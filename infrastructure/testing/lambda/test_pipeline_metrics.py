@@ -0,0 +1,146 @@
+# """
+# Tests for per-stage pipeline metrics and their EMF output
+# """
+
+import io
+import json
+import sys
+import threading
+
+import log_processor
+from corpus import ATTACK_LINES, CLEAN_LINES
+from payloads import build_awslogs_event
+from pipeline_metrics import PipelineMetrics
+
+STAGES = ("decode", "json_parse", "pattern_match", "field_extraction")
+COUNTERS = ("lines", "json_lines", "text_lines", "security_events")
+
+
+def _use_metrics(monkeypatch, **options):
+    metrics = PipelineMetrics(STAGES, COUNTERS, **options)
+    monkeypatch.setattr(log_processor, "PIPELINE_METRICS", metrics)
+    monkeypatch.setattr(log_processor, "_next_metrics_sample", metrics.sampler.__next__)
+    return metrics
+
+
+def _messages():
+    json_lines = [json.dumps({"level": "INFO", "message": line}) for line in CLEAN_LINES[:4]]
+    return json_lines + ATTACK_LINES[:3] + CLEAN_LINES[4:9]
+
+
+def _emitted(capsys):
+    lines = [line for line in capsys.readouterr().out.splitlines() if '"_aws"' in line]
+    assert len(lines) == 1
+    return json.loads(lines[0])
+
+
+def test_emf_record_declares_timers_and_counters():
+    metrics = PipelineMetrics(stages=("decode",), counters=("lines",))
+    metrics.add_time("decode", 0.25)
+    metrics.increment("lines", 7)
+
+    record = metrics.emf_record("Test/Namespace", {"Environment": "dev"}, timestamp=1714564800)
+    directive = record["_aws"]["CloudWatchMetrics"][0]
+
+    assert record["_aws"]["Timestamp"] == 1714564800000
+    assert directive["Namespace"] == "Test/Namespace"
+    assert directive["Dimensions"] == [["Environment"]]
+    assert directive["Metrics"] == [
+        {"Name": "decode_ms", "Unit": "Milliseconds"},
+        {"Name": "lines", "Unit": "Count"},
+    ]
+    assert record["Environment"] == "dev"
+    assert record["decode_ms"] == 250
+    assert record["lines"] == 7
+
+
+def test_drain_and_merge_combine_worker_values():
+    parent = PipelineMetrics(stages=("decode",), counters=("lines",))
+    worker = PipelineMetrics(stages=("decode",), counters=("lines",))
+    parent.increment("lines", 2)
+    worker.add_time("decode", 0.5)
+    worker.increment("lines", 3)
+    worker.increment("sql_injection_findings")
+
+    parent.merge(worker.drain())
+
+    assert parent.counters == {"lines": 5, "sql_injection_findings": 1}
+    assert parent.timers == {"decode": 0.5}
+    assert worker.counters == {"lines": 0}
+    assert worker.timers == {"decode": 0.0}
+
+
+def test_handler_emits_stage_metrics(monkeypatch, capsys):
+    _use_metrics(monkeypatch, sample_every=1)
+
+    log_processor.lambda_handler(build_awslogs_event(_messages()), None)
+    record = _emitted(capsys)
+
+    assert record["lines"] == 12
+    assert record["json_lines"] == 4
+    assert record["text_lines"] == 8
+    assert record["security_events"] == 3
+    assert record["bytes_decoded"] > 0
+    assert sum(v for k, v in record.items() if k.endswith("_findings")) >= 3
+    for stage in STAGES + ("handler",):
+        assert record[f"{stage}_ms"] > 0
+
+
+def test_sampled_line_counts_are_scaled(monkeypatch, capsys):
+    _use_metrics(monkeypatch, sample_every=4)
+
+    log_processor.lambda_handler(build_awslogs_event(_messages()), None)
+    record = _emitted(capsys)
+
+    # One line in four is classified and counted four times
+    assert record["json_lines"] + record["text_lines"] == 12
+    assert record["json_lines"] % 4 == 0
+
+
+def test_worker_metrics_are_merged(monkeypatch, capsys):
+    monkeypatch.setenv("LOG_PARALLEL_WORKERS", "2")
+    monkeypatch.setenv("LOG_PARALLEL_MIN_BATCH", "10")
+    monkeypatch.setenv("LOG_PARALLEL_CHUNK_SIZE", "5")
+    _use_metrics(monkeypatch, sample_every=1)
+
+    log_processor.lambda_handler(build_awslogs_event(_messages() * 5), None)
+    record = _emitted(capsys)
+
+    assert record["lines"] == 60
+    assert record["json_lines"] == 20
+    assert record["text_lines"] == 40
+    assert record["pattern_match_ms"] > 0
+
+
+def test_disabled_metrics_emit_nothing():
+    metrics = PipelineMetrics(STAGES, COUNTERS, enabled=False)
+    metrics.increment("lines")
+    stream = io.StringIO()
+
+    metrics.emit({"Environment": "dev"}, stream)
+
+    assert stream.getvalue() == ""
+
+
+def test_sink_threads_do_not_lose_updates():
+    metrics = PipelineMetrics(STAGES, COUNTERS)
+    # Switch threads as often as possible so unlocked updates would collide
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def ship():
+        for _ in range(5000):
+            metrics.increment("ship_requests")
+            metrics.add_time("ship", 0.001)
+
+    threads = [threading.Thread(target=ship) for _ in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert metrics.counters["ship_requests"] == 20000
+    assert round(metrics.timers["ship"], 6) == 20.0
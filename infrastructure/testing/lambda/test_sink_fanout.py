@@ -0,0 +1,212 @@
+# """
+# Tests for the concurrent output sink fan-out
+# """
+
+import asyncio
+import threading
+import time
+
+import log_processor
+from async_es_stub import AsyncStubElasticsearch
+from corpus import ATTACK_LINES
+from elasticsearch_bulk import BulkIndexer
+from event_buffer import EventBuffer
+from fake_clock import FakeContext
+from payloads import build_awslogs_event
+from pipeline_metrics import PipelineMetrics
+from rollups import RollupAggregator
+from sink_fanout import Sink, SinkFanout
+
+# SQL injection is HIGH, path traversal MEDIUM
+LINES = [ATTACK_LINES[0], "GET /static/../app.env from 203.0.113.9"]
+
+
+def _indexer_sink(endpoint):
+    #    """
+    #    Blocking sink shipping documents through the real bulk client
+    #    """
+    indexer = BulkIndexer(endpoint, max_retries=0, timeout=10)
+
+    def send(documents):
+        indexer.index(("test-index", document) for document in documents)
+
+    return send
+
+
+def test_sinks_send_concurrently():
+    with AsyncStubElasticsearch(delay_seconds=0.3) as stub:
+        fanout = SinkFanout(
+            [
+                Sink("first", _indexer_sink(stub.endpoint)),
+                Sink("second", _indexer_sink(stub.endpoint)),
+            ]
+        )
+        outcomes = fanout.run({"first": ([{"n": 1}],), "second": ([{"n": 2}],)})
+        fanout.close()
+
+    assert outcomes == {"first": "ok", "second": "ok"}
+    # Both requests were held by the stub at the same time
+    assert stub.max_in_flight == 2
+    assert sorted(d["n"] for d in stub.documents) == [1, 2]
+
+
+def test_slow_sink_times_out_without_holding_up_the_others():
+    metrics = PipelineMetrics()
+
+    with AsyncStubElasticsearch(delay_seconds=5) as slow, AsyncStubElasticsearch() as fast:
+        fanout = SinkFanout(
+            [
+                Sink("slow", _indexer_sink(slow.endpoint), timeout_seconds=0.2),
+                Sink("fast", _indexer_sink(fast.endpoint)),
+            ]
+        )
+        started = time.monotonic()
+        outcomes = fanout.run({"slow": ([{"n": 1}],), "fast": ([{"n": 2}],)}, metrics)
+        elapsed = time.monotonic() - started
+
+        assert outcomes == {"slow": "timeout", "fast": "ok"}
+        assert elapsed < 2
+        assert [d["n"] for d in fast.documents] == [2]
+
+    assert metrics.counters == {"sink_slow_timeouts": 1}
+    assert set(metrics.timers) == {"sink_slow", "sink_fast"}
+
+
+def test_failing_sink_does_not_fail_the_others():
+    metrics = PipelineMetrics()
+    sent = []
+
+    def broken(events):
+        raise RuntimeError("archive bucket is gone")
+
+    fanout = SinkFanout([Sink("archive", broken), Sink("alerts", sent.extend)])
+    outcomes = fanout.run({"archive": ([1],), "alerts": ([2],)}, metrics)
+    fanout.close()
+
+    assert outcomes == {"archive": "error", "alerts": "ok"}
+    assert sent == [2]
+    assert metrics.counters == {"sink_archive_errors": 1}
+
+
+def test_stuck_sink_is_bounded_to_its_in_flight_limit():
+    released = threading.Event()
+    calls = []
+
+    def stuck(events):
+        calls.append(events)
+        released.wait(10)
+
+    fanout = SinkFanout([Sink("stuck", stuck, timeout_seconds=0.1, max_in_flight=1)])
+    try:
+        assert fanout.run({"stuck": (1,)}) == {"stuck": "timeout"}
+        # The timed-out call still holds the only slot, so the next one
+        # waits for it instead of starting another thread
+        assert fanout.run({"stuck": (2,)}) == {"stuck": "timeout"}
+        assert calls == [1]
+    finally:
+        released.set()
+
+    assert fanout.run({"stuck": (3,)}) == {"stuck": "ok"}
+    assert calls == [1, 3]
+    fanout.close()
+
+
+def test_sink_timeouts_are_cut_short_by_the_invocation_deadline():
+    released = threading.Event()
+
+    def stuck(events):
+        released.wait(10)
+
+    fanout = SinkFanout([Sink("stuck", stuck)], deadline_margin_ms=1000)
+    try:
+        started = time.monotonic()
+        outcomes = fanout.run({"stuck": (1,)}, context=FakeContext(1200))
+        elapsed = time.monotonic() - started
+    finally:
+        released.set()
+        fanout.close()
+
+    assert outcomes == {"stuck": "timeout"}
+    assert elapsed < 2
+
+
+def test_coroutine_sinks_run_on_the_loop_and_are_cancelled_on_timeout():
+    delays = [10, 0]
+    sent = []
+
+    async def send(events):
+        await asyncio.sleep(delays.pop(0))
+        sent.append(events)
+
+    fanout = SinkFanout([Sink("async", send, timeout_seconds=0.2, max_in_flight=1)])
+    assert fanout.run({"async": (1,)}) == {"async": "timeout"}
+    # Cancelling the timed-out send gave its slot back
+    assert fanout.run({"async": (2,)}) == {"async": "ok"}
+    assert sent == [2]
+    fanout.close()
+
+
+def test_sink_settings_from_environment(monkeypatch):
+    monkeypatch.setenv("SINK_TIMEOUT_SECONDS", "5")
+    monkeypatch.setenv("SINK_ARCHIVE_TIMEOUT_SECONDS", "30")
+    monkeypatch.setenv("SINK_ARCHIVE_MAX_IN_FLIGHT", "4")
+
+    archive = Sink.from_environment("archive", print)
+    alerts = Sink.from_environment("alerts", print)
+
+    assert (archive.timeout_seconds, archive.max_in_flight) == (30, 4)
+    assert (alerts.timeout_seconds, alerts.max_in_flight) == (5, 2)
+
+
+def test_stateful_sinks_take_one_call_at_a_time(monkeypatch):
+    monkeypatch.setattr(log_processor, "_sink_fanout", None)
+    monkeypatch.delenv("SINK_MAX_IN_FLIGHT", raising=False)
+    monkeypatch.setenv("SINK_ROLLUPS_MAX_IN_FLIGHT", "3")
+
+    fanout = log_processor.get_sink_fanout()
+    fanout.close()
+
+    assert {name: sink.max_in_flight for name, sink in fanout.sinks.items()} == {
+        "alerts": 1,
+        "priority": 2,
+        "elasticsearch": 1,
+        "archive": 1,
+        "rollups": 3,
+    }
+
+
+def test_handler_returns_when_elasticsearch_hangs(monkeypatch):
+    alerts = []
+    metrics = PipelineMetrics(
+        stages=("decode", "json_parse", "pattern_match", "field_extraction"),
+        counters=("lines", "json_lines", "text_lines", "security_events"),
+    )
+    monkeypatch.setattr(log_processor, "send_security_alert", alerts.extend)
+    monkeypatch.setattr(
+        log_processor, "_event_buffer", EventBuffer(log_processor.send_to_elasticsearch)
+    )
+    monkeypatch.setattr(
+        log_processor, "_rollup_aggregator", RollupAggregator(grace_seconds=float("inf"))
+    )
+    monkeypatch.setattr(log_processor, "PIPELINE_METRICS", metrics)
+    monkeypatch.setattr(log_processor, "_next_metrics_sample", metrics.sampler.__next__)
+    # Rebuilt so the sinks pick up the timeout below
+    monkeypatch.setattr(log_processor, "_sink_fanout", None)
+    monkeypatch.setenv("SINK_TIMEOUT_SECONDS", "0.3")
+    monkeypatch.setenv("ELASTICSEARCH_BULK_MAX_RETRIES", "0")
+
+    with AsyncStubElasticsearch(delay_seconds=5) as stub:
+        monkeypatch.setenv("ELASTICSEARCH_ENDPOINT", stub.endpoint)
+        started = time.monotonic()
+        response = log_processor.lambda_handler(build_awslogs_event(LINES), None)
+        elapsed = time.monotonic() - started
+
+        assert response["statusCode"] == 200
+        assert elapsed < 3
+        assert [a["severity"] for a in alerts] == ["HIGH"]
+        # Both Elasticsearch lanes reached the cluster and were given up on
+        assert len(stub.requests) == 2
+
+    assert metrics.counters["sink_priority_timeouts"] == 1
+    assert metrics.counters["sink_elasticsearch_timeouts"] == 1
+    assert "sink_alerts_timeouts" not in metrics.counters
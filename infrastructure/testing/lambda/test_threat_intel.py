@@ -0,0 +1,149 @@
+# """
+# Tests for the threat intelligence IP index
+# """
+
+import ipaddress
+import json
+import os
+import random
+
+import log_processor
+from threat_intel import ThreatIntelIndex, ThreatIntelProvider, load_feed
+
+NESTED_FEED = [
+    ("10.0.0.0/8", "internal_scanner"),
+    ("10.1.0.0/16", "botnet"),
+    ("10.1.2.3", "malware_c2"),
+    ("10.2.0.0/24", "botnet"),
+    ("192.0.2.0/24", "tor_exit"),
+    ("2001:db8::/32", "scanner"),
+    ("2001:db8:1::/48", "botnet"),
+    ("2001:db8:1::42", "malware_c2"),
+    ("not-an-ip", "ignored"),
+]
+
+
+def _reference_lookup(feed, ip_address):
+    #    """
+    #    Most specific matching network via ipaddress, for comparison
+    #    """
+    address = ipaddress.ip_address(ip_address)
+    best = None
+    for indicator, threat_type in feed:
+        try:
+            network = ipaddress.ip_network(indicator, strict=False)
+        except ValueError:
+            continue
+        if address.version == network.version and address in network:
+            if best is None or network.prefixlen > best[0].prefixlen:
+                best = (network, threat_type)
+    return best[1] if best else None
+
+
+def _sample_addresses():
+    rng = random.Random(7)
+    addresses = ["10.1.2.3", "10.1.2.4", "10.0.0.0", "10.255.255.255", "11.0.0.0"]
+    addresses += ["2001:db8:1::42", "2001:db8:1::43", "2001:db9::1"]
+    v4_bases = [0x0A000000, 0x0A010000, 0xC0000200]
+    for _ in range(500):
+        v4 = rng.choice(v4_bases) + rng.randrange(1 << 17)
+        v6 = (0x20010DB8 << 96) + rng.randrange(1 << 82)
+        addresses.append(str(ipaddress.IPv4Address(v4)))
+        addresses.append(str(ipaddress.IPv6Address(v6)))
+    return addresses
+
+
+def test_most_specific_range_wins():
+    index = ThreatIntelIndex.build(NESTED_FEED)
+
+    for ip_address in _sample_addresses():
+        assert index.lookup(ip_address) == _reference_lookup(NESTED_FEED, ip_address), ip_address
+
+
+def test_invalid_addresses_do_not_match():
+    index = ThreatIntelIndex.build(NESTED_FEED)
+
+    for value in ["", "unknown", "10.1.2", "10.1.2.3.4", "999.1.1.1", "2001:db8::g", None]:
+        assert index.lookup(value) is None
+
+
+def test_memory_mapped_index_matches_built_index(tmp_path):
+    built = ThreatIntelIndex.build(NESTED_FEED)
+    path = str(tmp_path / "feed.qbti")
+    built.save(path)
+
+    mapped = ThreatIntelIndex.open(path)
+
+    assert mapped.labels == built.labels
+    assert len(mapped) == len(built)
+    for ip_address in _sample_addresses():
+        assert mapped.lookup(ip_address) == built.lookup(ip_address)
+
+
+def test_csv_and_json_feeds_load_the_same_indicators(tmp_path):
+    csv_path = tmp_path / "feed.csv"
+    csv_path.write_text(
+        "indicator,threat_type\n# comment\n10.0.0.0/8,scanner\n192.0.2.1,botnet\n2001:db8::1\n"
+    )
+    json_path = tmp_path / "feed.json"
+    json_path.write_text(
+        json.dumps(
+            [
+                {"indicator": "10.0.0.0/8", "threat_type": "scanner"},
+                {"ip": "192.0.2.1", "type": "botnet"},
+                {"cidr": "2001:db8::1"},
+            ]
+        )
+    )
+
+    expected = [("10.0.0.0/8", "scanner"), ("192.0.2.1", "botnet"), ("2001:db8::1", "unknown")]
+    assert load_feed(str(csv_path)) == expected
+    assert load_feed(str(json_path)) == expected
+
+
+def test_provider_reloads_changed_feed_after_ttl(tmp_path):
+    feed_path = tmp_path / "feed.csv"
+    feed_path.write_text("198.51.100.0/24,scanner\n")
+    provider = ThreatIntelProvider(
+        path=str(feed_path), ttl_seconds=0, cache_path=str(tmp_path / "cache.qbti")
+    )
+
+    assert provider.get_index().lookup("198.51.100.9") == "scanner"
+    assert provider.get_index().source == str(tmp_path / "cache.qbti")
+
+    feed_path.write_text("198.51.100.0/24,botnet\n203.0.113.5,scanner\n")
+    os.utime(feed_path, ns=(0, 10**18))
+    assert provider.get_index().lookup("198.51.100.9") == "botnet"
+    assert provider.get_index().lookup("203.0.113.5") == "scanner"
+
+
+def test_provider_keeps_previous_index_when_refresh_fails(tmp_path):
+    index_path = tmp_path / "feed.qbti"
+    ThreatIntelIndex.build([("198.51.100.0/24", "scanner")]).save(str(index_path))
+    provider = ThreatIntelProvider(path=str(index_path), ttl_seconds=0)
+    assert provider.get_index().lookup("198.51.100.1") == "scanner"
+
+    # Index files are published by rename, never rewritten under a live mapping
+    broken_path = tmp_path / "broken.qbti"
+    broken_path.write_bytes(b"garbage that is long enough for a header")
+    os.replace(broken_path, index_path)
+    assert provider.get_index().lookup("198.51.100.1") == "scanner"
+
+    index_path.unlink()
+    assert provider.get_index().lookup("198.51.100.1") == "scanner"
+
+
+def test_enrichment_uses_default_indicators(monkeypatch):
+    monkeypatch.delenv("THREAT_INTEL_PATH", raising=False)
+    monkeypatch.setattr(log_processor, "_threat_intel_provider", None)
+
+    flagged = {"ip_address": "10.0.0.50", "security_findings": []}
+    clean = {"ip_address": "10.0.0.51", "security_findings": []}
+    log_processor.enrich_security_events([flagged, clean])
+
+    assert flagged["threat_intelligence"] == {
+        "malicious_ip": True,
+        "threat_type": "scanner",
+        "confidence": "HIGH",
+    }
+    assert "threat_intelligence" not in clean
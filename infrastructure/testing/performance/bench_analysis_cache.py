@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# """
+# Compare cached and uncached security analysis on repeated and unique messages
+# """
+
+import argparse
+
+from bench_common import best_of, build_corpus, report
+
+import log_processor
+from analysis_cache import AnalysisCache
+from corpus import ATTACK_LINES, CLEAN_LINES
+
+
+def measure(corpus, repeat):
+    #    """
+    #    Return (uncached seconds, cached seconds, cache) for one pass over corpus
+    #    """
+    analyze = log_processor.SECURITY_PATTERN_MATCHER.analyze
+    uncached = best_of(lambda: [analyze(line) for line in corpus], repeat)
+
+    caches = []
+
+    def run_cached():
+        # A fresh cache per run, as in a cold Lambda container
+        cache = AnalysisCache(analyze)
+        caches.append(cache)
+        return [cache.analyze(line) for line in corpus]
+
+    cached = best_of(run_cached, repeat)
+    return uncached, cached, caches[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--attack-rate", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Retry storms and scanners replay the same lines
+    repeated = build_corpus(ATTACK_LINES, CLEAN_LINES, args.lines, args.attack_rate)
+    # Request ids make every line distinct, the cache's worst case
+    unique = [f"{line} request_id={n:08x}" for n, line in enumerate(repeated)]
+
+    for name, corpus in (("repeated", repeated), ("unique", unique)):
+        uncached, cached, cache = measure(corpus, args.repeat)
+        report(
+            f"{name} messages: {args.lines} lines, attack rate {args.attack_rate}",
+            [
+                ("uncached lines/s", f"{args.lines / uncached:,.0f}"),
+                ("cached lines/s", f"{args.lines / cached:,.0f}"),
+                ("hit rate", f"{cache.hits / (cache.hits + cache.misses):.1%}"),
+                ("cached entries", f"{len(cache):,}"),
+                ("speedup", f"{uncached / cached:.2f}x"),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# """
+# Measure archive write throughput and size per event for Parquet and Arrow
+# IPC against gzipped JSON lines of the same events
+# """
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from bench_common import best_of, report
+
+import log_processor
+from archive_sink import ArchiveSink
+from event_records import to_document
+from payload_generator import generate_messages
+from payloads import LOG_GROUP
+
+
+def build_events(count):
+    #    """
+    #    Security events as process_log_event and enrichment produce them
+    #    """
+    events = []
+    for n, message in enumerate(generate_messages(count * 4, attack_rate=0.25)):
+        event = log_processor.process_log_event(
+            {"id": str(n), "timestamp": 1714564800000 + n, "message": message}, LOG_GROUP
+        )
+        if event:
+            events.append(event)
+    return log_processor.enrich_security_events(events[:count])
+
+
+def directory_size(root):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(root)
+        for name in names
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    events = build_events(args.events)
+    rows = []
+    for file_format in ("parquet", "arrow"):
+        root = tempfile.mkdtemp()
+        try:
+            sink = ArchiveSink(root, "bench", file_format=file_format)
+            seconds = best_of(lambda: sink.write(events), args.repeat)
+            size = directory_size(root) / sink.files_written
+        finally:
+            shutil.rmtree(root)
+        rows.append((f"{file_format} events/s", f"{len(events) / seconds:,.0f}"))
+        rows.append((f"{file_format} bytes/event", f"{size / len(events):.1f}"))
+
+    def write_json_lines():
+        with gzip.open(os.path.join(root, "events.jsonl.gz"), "wt") as output:
+            for event in events:
+                output.write(json.dumps(to_document(event)) + "\n")
+
+    root = tempfile.mkdtemp()
+    try:
+        seconds = best_of(write_json_lines, args.repeat)
+        size = directory_size(root)
+    finally:
+        shutil.rmtree(root)
+    rows.append(("gzip JSON lines events/s", f"{len(events) / seconds:,.0f}"))
+    rows.append(("gzip JSON lines bytes/event", f"{size / len(events):.1f}"))
+
+    report(f"archive writes, {len(events)} security events", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# """
+# Shared helpers for the Lambda performance benchmarks
+# """
+
+import os
+import sys
+import time
+
+INFRASTRUCTURE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+for source_dir in (
+    os.path.join(INFRASTRUCTURE_DIR, "monitoring", "logging", "lambda"),
+    os.path.join(INFRASTRUCTURE_DIR, "security", "secrets", "lambda"),
+    os.path.join(INFRASTRUCTURE_DIR, "shared", "lambda"),
+    os.path.join(INFRASTRUCTURE_DIR, "testing", "lambda"),
+):
+    if source_dir not in sys.path:
+        sys.path.insert(0, source_dir)
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+
+def best_of(func, repeat=5):
+    #    """
+    #    Return the fastest wall-clock duration in seconds of several runs
+    #    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def build_corpus(attack_lines, clean_lines, size, attack_rate, seed=42):
+    #    """
+    #    Build a deterministic corpus with the given fraction of attack lines
+    #    """
+    import random
+
+    rng = random.Random(seed)
+    return [
+        rng.choice(attack_lines) if rng.random() < attack_rate else rng.choice(clean_lines)
+        for _ in range(size)
+    ]
+
+
+def report(title, rows):
+    #    """
+    #    Print benchmark rows as an aligned table
+    #    """
+    print(title)
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        print(f"  {name.ljust(width)}  {value}")
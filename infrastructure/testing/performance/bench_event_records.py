@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# """
+# Compare memory and serialization cost of slotted event records against
+# the per-event dicts, with pattern text in every finding, they replaced
+# """
+
+import argparse
+import copy
+import json
+import tracemalloc
+
+from bench_common import best_of, report
+
+import log_processor
+from event_records import to_document
+from payload_generator import generate_messages
+from payloads import LOG_GROUP
+
+
+def build_records(count):
+    #    """
+    #    Security event records as process_log_event produces them
+    #    """
+    records = []
+    for n, message in enumerate(generate_messages(count * 4, attack_rate=0.25)):
+        event = log_processor.process_log_event(
+            {"id": str(n), "timestamp": 1714564800000 + n, "message": message}, LOG_GROUP
+        )
+        if event:
+            records.append(event)
+    return records[:count]
+
+
+def as_legacy_dicts(records):
+    #    """
+    #    The same events in the previous dict shape, findings carrying the pattern
+    #    """
+    pattern_ids = log_processor.SECURITY_PATTERN_MATCHER.pattern_ids
+    events = []
+    for record in records:
+        event = record.to_dict()
+        event["security_findings"] = [
+            {
+                "type": f["type"],
+                "pattern": pattern_ids[f["pattern_id"]],
+                "matched_text": f["matched_text"],
+            }
+            for f in record["security_findings"]
+        ]
+        events.append(event)
+    return events
+
+
+def copy_record(record):
+    event = copy.copy(record)
+    event.security_findings = [copy.copy(f) for f in record.security_findings]
+    return event
+
+
+def allocated_bytes(build):
+    #    """
+    #    Bytes still allocated after build() returns, with the result kept alive
+    #    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = build_records(args.events)
+    legacy = as_legacy_dicts(records)
+    count = len(records)
+
+    # Only the per-event containers are measured; field strings are shared
+    record_bytes = allocated_bytes(lambda: [copy_record(r) for r in records])
+    legacy_bytes = allocated_bytes(
+        lambda: [
+            dict(e, security_findings=[dict(f) for f in e["security_findings"]])
+            for e in legacy
+        ]
+    )
+
+    record_seconds = best_of(
+        lambda: [json.dumps(to_document(r)) for r in records], args.repeat
+    )
+    legacy_seconds = best_of(lambda: [json.dumps(e) for e in legacy], args.repeat)
+    record_size = sum(len(json.dumps(to_document(r))) for r in records)
+    legacy_size = sum(len(json.dumps(e)) for e in legacy)
+
+    report(
+        f"event records, {count} security events",
+        [
+            ("dict events bytes/event", f"{legacy_bytes / count:,.0f}"),
+            ("slotted records bytes/event", f"{record_bytes / count:,.0f}"),
+            ("dict events serialized/s", f"{count / legacy_seconds:,.0f}"),
+            ("slotted records serialized/s", f"{count / record_seconds:,.0f}"),
+            ("dict document bytes/event", f"{legacy_size / count:,.0f}"),
+            ("record document bytes/event", f"{record_size / count:,.0f}"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
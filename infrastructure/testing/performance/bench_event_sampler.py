@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# """
+# Measure sampling throughput and how many LOW/MEDIUM events reach
+# Elasticsearch during a brute-force spike at several target budgets
+# """
+
+import argparse
+
+from bench_common import best_of, report
+
+from event_sampler import AdaptiveSampler
+
+
+def build_events(count, high_every=50):
+    #    """
+    #    A spike of permission-denied lines with an occasional HIGH event
+    #    """
+    return [
+        {
+            "timestamp": f"2024-05-01T12:00:{n // 1000 % 60:02d}.{n % 1000:03d}000",
+            "log_group": "/aws/security/bench",
+            "message": f"permission denied for user admin from 10.0.{n % 7}.{n % 251}",
+            "severity": "HIGH" if n % high_every == 0 else "LOW",
+        }
+        for n in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    events = build_events(args.events)
+    high = sum(1 for e in events if e["severity"] == "HIGH")
+    rows = []
+    for target in (0, 5000, 500, 50):
+        # Each run gets a fresh sampler so every run sees the whole spike
+        samplers = iter(
+            [AdaptiveSampler(target_events_per_second=target) for _ in range(args.repeat)]
+        )
+        kept = []
+        seconds = best_of(lambda: kept.append(next(samplers).sample(events)), args.repeat)
+        shipped = kept[-1]
+        weighted = sum(e.get("sample_weight", 1.0) for e in shipped)
+        label = f"target {target} events/s" if target else "sampling disabled"
+        rows.append((f"{label}: events/s", f"{len(events) / seconds:,.0f}"))
+        rows.append(
+            (
+                f"{label}: shipped (HIGH {high})",
+                f"{len(shipped):,} (weighted {weighted:,.0f})",
+            )
+        )
+
+    report(f"adaptive sampling, {len(events)} events in one 10s window", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# """
+# Compare the precompiled field extractor with the original four helpers
+# """
+
+import argparse
+
+from bench_common import best_of, report
+
+import legacy_reference
+import log_processor
+from corpus import ATTACK_LINES, CLEAN_LINES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = ((ATTACK_LINES + CLEAN_LINES) * args.lines)[: args.lines]
+    for line in corpus[:100]:
+        assert log_processor.extract_fields(line) == legacy_reference.extract_fields(line)
+
+    legacy = best_of(
+        lambda: [legacy_reference.extract_fields(l) for l in corpus], args.repeat
+    )
+    single_pass = best_of(
+        lambda: [log_processor.extract_fields(l) for l in corpus], args.repeat
+    )
+
+    report(
+        f"field extraction, {args.lines} lines",
+        [
+            ("four helpers lines/s", f"{args.lines / legacy:,.0f}"),
+            ("compiled extractor lines/s", f"{args.lines / single_pass:,.0f}"),
+            ("speedup", f"{legacy / single_pass:.1f}x"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
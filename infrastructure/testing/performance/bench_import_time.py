@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# """
+# Report Lambda module import time from python -X importtime
+# """
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from bench_common import INFRASTRUCTURE_DIR, report
+
+SOURCE_DIRS = [
+    os.path.join(INFRASTRUCTURE_DIR, "monitoring", "logging", "lambda"),
+    os.path.join(INFRASTRUCTURE_DIR, "security", "secrets", "lambda"),
+    os.path.join(INFRASTRUCTURE_DIR, "shared", "lambda"),
+]
+
+
+def measure(module):
+    #    """
+    #    Return the module's cumulative import microseconds and those of its
+    #    direct imports, for one fresh interpreter
+    #    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(SOURCE_DIRS))
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    # Children are listed before their parent, one indent level deeper
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == module:
+                return int(cumulative), children
+            children = {}
+    raise RuntimeError(f"{module} not found in import time output")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in ("log_processor", "secret_rotation"):
+        runs = [measure(module) for _ in range(args.runs)]
+        totals = [total for total, _ in runs]
+        slowest = sorted(runs[-1][1].items(), key=lambda item: -item[1])[: args.top]
+        report(
+            f"{module} import, median of {args.runs} runs",
+            [("total", f"{statistics.median(totals) / 1000:.1f} ms")]
+            + [(name, f"{micros / 1000:.1f} ms") for name, micros in slowest],
+        )
+
+
+if __name__ == "__main__":
+    main()
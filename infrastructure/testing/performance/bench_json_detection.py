@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# """
+# Measure JSON detection throughput on JSON and plain-text corpora for the
+# original exception-driven parse and the first-byte check with the stdlib
+# and accelerated decoders
+# """
+
+import argparse
+
+from bench_common import best_of, report
+
+import legacy_reference
+import log_processor
+from corpus import ATTACK_LINES, CLEAN_LINES, JSON_LINES
+
+
+def lines_per_second(func, corpus, repeat):
+    return len(corpus) / best_of(lambda: [func(line) for line in corpus], repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpora = {
+        "json": (JSON_LINES[:5] * args.lines)[: args.lines],
+        "text": ((CLEAN_LINES + ATTACK_LINES) * args.lines)[: args.lines],
+    }
+    accelerated = log_processor._fast_json_loads
+
+    for name, corpus in corpora.items():
+        rows = [
+            (
+                "legacy json.loads lines/s",
+                f"{lines_per_second(legacy_reference.parse_json_message, corpus, args.repeat):,.0f}",
+            )
+        ]
+
+        log_processor._fast_json_loads = None
+        rows.append(
+            (
+                "first-byte + stdlib lines/s",
+                f"{lines_per_second(log_processor.parse_json_message, corpus, args.repeat):,.0f}",
+            )
+        )
+
+        if accelerated is not None:
+            log_processor._fast_json_loads = accelerated
+            rows.append(
+                (
+                    f"first-byte + {accelerated.__module__} lines/s",
+                    f"{lines_per_second(log_processor.parse_json_message, corpus, args.repeat):,.0f}",
+                )
+            )
+
+        report(f"{name} corpus, {args.lines} lines", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# """
+# Find the batch size at which parallel log event analysis breaks even with
+# serial analysis on this machine
+# """
+
+import argparse
+import os
+
+from bench_common import best_of, build_corpus, report
+
+import log_processor
+from corpus import ATTACK_LINES, CLEAN_LINES
+from parallel_analysis import process_log_events
+from payloads import LOG_GROUP, build_log_data
+
+
+def run(events, workers):
+    os.environ["LOG_PARALLEL_WORKERS"] = str(workers)
+    return sum(
+        1
+        for _ in process_log_events(
+            log_processor.process_log_event, iter(events), {"logGroup": LOG_GROUP}
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[500, 2000, 5000, 20000, 50000]
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--attack-rate", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["LOG_PARALLEL_MIN_BATCH"] = "0"
+    print(f"cpu_count={os.cpu_count()}")
+
+    for batch_size in args.batch_sizes:
+        corpus = build_corpus(ATTACK_LINES, CLEAN_LINES, batch_size, args.attack_rate)
+        events = build_log_data(corpus)["logEvents"]
+        serial = best_of(lambda: run(events, 1), args.repeat)
+        rows = [("serial ms", f"{serial * 1000:.1f}")]
+        for workers in args.workers:
+            parallel = best_of(lambda: run(events, workers), args.repeat)
+            rows.append(
+                (f"{workers} workers ms", f"{parallel * 1000:.1f} ({serial / parallel:.2f}x)")
+            )
+        report(f"batch of {batch_size} events", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# """
+# Time security analysis on adversarial messages of doubling length, for
+# the original unbounded patterns and the bounded ones; a growth factor
+# near 2x per doubling means linear worst-case cost
+# """
+
+import argparse
+import time
+
+from bench_common import report
+
+import legacy_reference
+import log_processor
+
+# Each shape repeats a prefix that starts a match which never completes
+SHAPES = {
+    "select without from": lambda size: "select " * (size // 7),
+    "select then whitespace": lambda size: "select" + " " * (size - 6),
+    "unclosed script tags": lambda size: "<script " * (size // 8),
+    "quote or without digits": lambda size: "' or " * (size // 5),
+    "union then whitespace": lambda size: "union" + " " * (size - 5),
+}
+
+
+def time_analyze(matcher, message):
+    start = time.perf_counter()
+    matcher.analyze(message)
+    return time.perf_counter() - start
+
+
+def growth_rows(matcher, shape, sizes, budget):
+    #    """
+    #    Time each size until one run exceeds the budget in seconds
+    #    """
+    rows, previous = [], None
+    for size in sizes:
+        elapsed = time_analyze(matcher, shape(size))
+        growth = f"{elapsed / previous:.1f}x" if previous else "-"
+        rows.append((f"{size:,} chars", f"{elapsed * 1000:9.1f} ms  growth {growth}"))
+        previous = elapsed
+        if elapsed > budget:
+            rows.append(("...", "stopped, over budget"))
+            break
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--min-size", type=int, default=256)
+    parser.add_argument("--max-size", type=int, default=1 << 20)
+    parser.add_argument("--budget", type=float, default=2.0)
+    args = parser.parse_args()
+
+    sizes = []
+    size = args.min_size
+    while size <= args.max_size:
+        sizes.append(size)
+        size *= 2
+
+    # No windows or scan limit, so the timings show the cost of the patterns
+    unlimited = {"scan_window": float("inf"), "max_scan_length": float("inf")}
+    unbounded = log_processor.SecurityPatternMatcher(
+        legacy_reference.UNBOUNDED_SECURITY_PATTERNS,
+        log_processor.SECURITY_PREFILTER_KEYWORDS,
+        **unlimited,
+    )
+    bounded = log_processor.SecurityPatternMatcher(
+        log_processor.SECURITY_PATTERNS,
+        log_processor.SECURITY_PREFILTER_KEYWORDS,
+        **unlimited,
+    )
+    limited = log_processor.SecurityPatternMatcher(
+        log_processor.SECURITY_PATTERNS, log_processor.SECURITY_PREFILTER_KEYWORDS
+    )
+
+    for name, shape in SHAPES.items():
+        report(
+            f"{name}: unbounded patterns",
+            growth_rows(unbounded, shape, sizes, args.budget),
+        )
+        report(
+            f"{name}: bounded patterns", growth_rows(bounded, shape, sizes, args.budget)
+        )
+        report(
+            f"{name}: bounded, windowed, {log_processor.DEFAULT_MAX_SCAN_LENGTH:,} char limit",
+            growth_rows(limited, shape, sizes, args.budget),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# """
+# Benchmark the precompiled security pattern matcher against the original
+# per-pattern re.search implementation
+# """
+
+import argparse
+
+from bench_common import best_of, build_corpus, report
+
+import legacy_reference
+import log_processor
+from corpus import ATTACK_LINES, CLEAN_LINES
+
+
+def with_pattern_text(findings):
+    #    """
+    #    Findings in the reference shape, with pattern IDs resolved to the pattern
+    #    """
+    pattern_ids = log_processor.SECURITY_PATTERN_MATCHER.pattern_ids
+    return [
+        {
+            "type": f["type"],
+            "pattern": pattern_ids[f["pattern_id"]],
+            "matched_text": f["matched_text"],
+        }
+        for f in findings
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--attack-rate", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(ATTACK_LINES, CLEAN_LINES, args.lines, args.attack_rate)
+
+    for line in corpus:
+        assert with_pattern_text(
+            log_processor.analyze_security_patterns(line)
+        ) == legacy_reference.analyze_security_patterns(line), line
+
+    legacy = best_of(
+        lambda: [legacy_reference.analyze_security_patterns(l) for l in corpus],
+        args.repeat,
+    )
+    unfiltered_matcher = log_processor.SecurityPatternMatcher(
+        log_processor.SECURITY_PATTERNS
+    )
+    unfiltered = best_of(
+        lambda: [unfiltered_matcher.analyze(l) for l in corpus], args.repeat
+    )
+    matcher = log_processor.SecurityPatternMatcher(
+        log_processor.SECURITY_PATTERNS, log_processor.SECURITY_PREFILTER_KEYWORDS
+    )
+    compiled = best_of(lambda: [matcher.analyze(l) for l in corpus], args.repeat)
+
+    report(
+        f"analyze_security_patterns: {args.lines} lines, attack rate {args.attack_rate}",
+        [
+            ("legacy lines/s", f"{args.lines / legacy:,.0f}"),
+            ("compiled lines/s", f"{args.lines / unfiltered:,.0f}"),
+            ("compiled + prefilter lines/s", f"{args.lines / compiled:,.0f}"),
+            (
+                "prefilter skip ratio",
+                f"{matcher.prefilter_skipped / matcher.prefilter_checked:.1%}",
+            ),
+            ("speedup", f"{legacy / compiled:.1f}x"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# """
+# Compare peak memory and latency of whole-payload and streaming decoding
+# of CloudWatch Logs subscription payloads
+# """
+
+import argparse
+import json
+import random
+import tracemalloc
+
+from bench_common import best_of, report
+
+import legacy_reference
+from cloudwatch_payload import iter_log_events
+from payloads import build_log_data, encode_log_data
+
+
+def build_payload(events, seed=7):
+    #    """
+    #    Build an awslogs.data string with poorly compressible JSON messages
+    #    """
+    rng = random.Random(seed)
+    messages = [
+        json.dumps(
+            {
+                "level": "INFO",
+                "message": f"POST /api/vote/{rng.getrandbits(64):016x} 201",
+                "request_id": f"{rng.getrandbits(128):032x}",
+                "ip_address": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+            }
+        )
+        for _ in range(events)
+    ]
+    return encode_log_data(build_log_data(messages))
+
+
+def consume_legacy(data):
+    _, events = legacy_reference.decode_log_events(data)
+    return sum(1 for _ in events)
+
+
+def consume_streaming(data):
+    return sum(1 for _ in iter_log_events(data, {}))
+
+
+def peak_memory(func, data):
+    #    """
+    #    Return the peak traced allocation in bytes while running func
+    #    """
+    tracemalloc.start()
+    try:
+        func(data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, nargs="+", default=[2000, 10000, 40000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for events in args.events:
+        data = build_payload(events)
+        assert consume_legacy(data) == consume_streaming(data) == events
+
+        legacy_time = best_of(lambda: consume_legacy(data), args.repeat)
+        streaming_time = best_of(lambda: consume_streaming(data), args.repeat)
+        report(
+            f"{events} events, {len(data) / 1024 / 1024:.2f} MiB awslogs.data",
+            [
+                ("legacy peak MiB", f"{peak_memory(consume_legacy, data) / 2**20:.2f}"),
+                (
+                    "streaming peak MiB",
+                    f"{peak_memory(consume_streaming, data) / 2**20:.2f}",
+                ),
+                ("legacy ms", f"{legacy_time * 1000:.1f}"),
+                ("streaming ms", f"{streaming_time * 1000:.1f}"),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# """
+# Estimate the per-event cost of pipeline metrics against the handler's
+# per-event cost, since a sub-1% difference is below run-to-run noise
+# when timing the handler with and without instrumentation
+# """
+
+import argparse
+import contextlib
+import io
+import logging
+import timeit
+from time import perf_counter
+
+from bench_common import best_of, report
+
+import log_processor
+from payload_generator import generate_batches
+from pipeline_metrics import DEFAULT_SAMPLE_EVERY, PipelineMetrics
+
+# The statements process_log_event runs for every event
+UNSAMPLED_HOOK = """
+sampled = next_sample()
+if sampled:
+    pass
+if sampled:
+    pass
+if sampled:
+    pass
+"""
+
+# The extra statements it runs for one sampled event
+SAMPLED_HOOK = """
+started = perf_counter()
+parsed = perf_counter()
+metrics.add_sampled_time("json_parse", parsed - started)
+metrics.add_sampled_time("pattern_match", perf_counter() - parsed)
+metrics.increment_sampled("json_lines")
+"""
+
+
+def hook_cost(statement, namespace, number):
+    #    """
+    #    Return the fastest per-execution seconds of statement, less loop overhead
+    #    """
+    timed = min(timeit.repeat(statement, globals=namespace, number=number, repeat=7))
+    empty = min(timeit.repeat("pass", globals=namespace, number=number, repeat=7))
+    return max(0.0, timed - empty) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batches", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--sample-every", type=int, default=DEFAULT_SAMPLE_EVERY)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Sinks are not configured here; their warnings would flood the output
+    logging.disable(logging.WARNING)
+    batches = [event for _, event in generate_batches(args.batches, args.batch_size)]
+    events = args.batches * args.batch_size
+
+    def run_handler():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for event in batches:
+                log_processor.lambda_handler(event, None)
+
+    handler = best_of(run_handler, args.repeat) / events
+
+    metrics = PipelineMetrics(
+        stages=("json_parse", "pattern_match"),
+        counters=("json_lines",),
+        sample_every=args.sample_every,
+    )
+    namespace = {
+        "next_sample": metrics.sampler.__next__,
+        "metrics": metrics,
+        "perf_counter": perf_counter,
+    }
+    unsampled = hook_cost(UNSAMPLED_HOOK, namespace, 1000000)
+    sampled = hook_cost(SAMPLED_HOOK, namespace, 200000) / args.sample_every
+    emit = best_of(lambda: metrics.emit({"Environment": "bench"}, io.StringIO()), 50)
+    per_event = unsampled + sampled + emit / args.batch_size
+
+    report(
+        f"pipeline metrics, {events} events, 1 in {args.sample_every} sampled",
+        [
+            ("handler ns/event", f"{handler * 1e9:,.0f}"),
+            ("unsampled hook ns/event", f"{unsampled * 1e9:.1f}"),
+            ("sampled hook ns/event", f"{sampled * 1e9:.1f}"),
+            ("EMF emit ns/event", f"{emit / args.batch_size * 1e9:.1f}"),
+            ("estimated overhead", f"{per_event / handler:.2%}"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
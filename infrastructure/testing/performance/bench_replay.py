@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# """
+# Replay synthetic CloudWatch Logs batches through log_processor.lambda_handler
+# offline, against local Elasticsearch and SNS stubs
+# """
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+
+from bench_common import INFRASTRUCTURE_DIR, report
+
+import aws_clients
+from es_stub import StubElasticsearch
+from payload_generator import generate_batches
+from sns_stub import StubSNS
+
+
+class ReplayContext:
+    #    """
+    #    Minimal Lambda context with a fixed time budget per invocation
+    #    """
+
+    def __init__(self, timeout_ms=300000):
+        self.deadline = time.monotonic() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def peak_rss_mib():
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=INFRASTRUCTURE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def replay(batches, batch_size, json_rate, attack_rate, warmup, seed):
+    #    """
+    #    Run every batch through the handler and return the measured results
+    #    """
+    payloads = list(
+        generate_batches(
+            batches + warmup, batch_size, json_rate, attack_rate, seed=seed
+        )
+    )
+    sns = StubSNS()
+    aws_clients.register_client("sns", sns)
+
+    with StubElasticsearch() as elasticsearch:
+        os.environ["ELASTICSEARCH_ENDPOINT"] = elasticsearch.endpoint
+        os.environ["SNS_TOPIC_ARN"] = "arn:aws:sns:us-east-1:123456789012:replay"
+        # Imported after the environment is set up, as in a cold start
+        import log_processor
+
+        baseline_rss = peak_rss_mib()
+        latencies = []
+        events = 0
+        for number, (count, event) in enumerate(payloads):
+            start = time.perf_counter()
+            log_processor.lambda_handler(event, ReplayContext())
+            elapsed = time.perf_counter() - start
+            if number >= warmup:
+                latencies.append(elapsed)
+                events += count
+        log_processor.get_event_buffer().flush()
+
+        # Downstream counts cover warmup batches too
+        return {
+            "events": events,
+            "events_per_second": events / sum(latencies),
+            "p50_batch_ms": percentile(latencies, 0.50) * 1000,
+            "p99_batch_ms": percentile(latencies, 0.99) * 1000,
+            "max_batch_ms": max(latencies) * 1000,
+            "baseline_rss_mib": baseline_rss,
+            "peak_rss_mib": peak_rss_mib(),
+            "documents_indexed": len(elasticsearch.documents),
+            "bulk_requests": len(elasticsearch.requests),
+            "sns_publishes": sns.publish_count,
+        }
+
+
+def compare(previous, current):
+    #    """
+    #    Rows showing how each numeric result changed against a previous run
+    #    """
+    rows = []
+    for key, value in current["results"].items():
+        before = previous.get("results", {}).get(key)
+        if isinstance(value, (int, float)) and before:
+            rows.append((key, f"{before:,.2f} -> {value:,.2f} ({value / before:.2f}x)"))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--json-rate", type=float, default=0.3)
+    parser.add_argument("--attack-rate", type=float, default=0.05)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    config = {
+        "batches": args.batches,
+        "batch_size": args.batch_size,
+        "json_rate": args.json_rate,
+        "attack_rate": args.attack_rate,
+        "warmup": args.warmup,
+        "seed": args.seed,
+    }
+    results = replay(
+        args.batches, args.batch_size, args.json_rate, args.attack_rate, args.warmup, args.seed
+    )
+    run = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+
+    report(
+        f"replay at {run['revision']}: {args.batches} batches of {args.batch_size} events",
+        [
+            (key, f"{value:,}" if isinstance(value, int) else f"{value:,.2f}")
+            for key, value in results.items()
+        ],
+    )
+
+    if args.compare:
+        with open(args.compare) as previous_file:
+            previous = json.load(previous_file)
+        if previous.get("config") != config:
+            print("warning: previous run used a different configuration")
+        report(f"compared with {previous.get('revision', 'unknown')}", compare(previous, run))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(run, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
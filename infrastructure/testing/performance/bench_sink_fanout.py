@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# """
+# Compare shipping to output sinks one after another with the concurrent
+# sink fan-out, against stub Elasticsearch clusters with request latency
+# """
+
+import argparse
+import contextlib
+
+from bench_common import best_of, report
+
+from async_es_stub import AsyncStubElasticsearch
+from elasticsearch_bulk import BulkIndexer
+from sink_fanout import Sink, SinkFanout
+
+
+def indexer_sink(endpoint):
+    indexer = BulkIndexer(endpoint, max_retries=0)
+
+    def send(documents):
+        indexer.index(("bench-index", document) for document in documents)
+
+    return send
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sinks", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = [{"n": n, "message": "x" * 200} for n in range(args.documents)]
+
+    with contextlib.ExitStack() as stack:
+        stubs = [
+            stack.enter_context(
+                AsyncStubElasticsearch(delay_seconds=args.latency_ms / 1000)
+            )
+            for _ in range(args.sinks)
+        ]
+        sends = [indexer_sink(stub.endpoint) for stub in stubs]
+        fanout = SinkFanout([Sink(f"sink{n}", send) for n, send in enumerate(sends)])
+        calls = {name: (documents,) for name in fanout.sinks}
+
+        def sequential():
+            for send in sends:
+                send(documents)
+
+        sequential_seconds = best_of(sequential, args.repeat)
+        fanout_seconds = best_of(lambda: fanout.run(calls), args.repeat)
+        fanout.close()
+
+    report(
+        f"sink fan-out, {args.sinks} sinks at {args.latency_ms:g} ms, "
+        f"{args.documents} documents each",
+        [
+            ("sequential ms/invocation", f"{sequential_seconds * 1000:,.1f}"),
+            ("fan-out ms/invocation", f"{fanout_seconds * 1000:,.1f}"),
+            ("speedup", f"{sequential_seconds / fanout_seconds:.1f}x"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# """
+# Measure threat intelligence index build, cold-start open, lookup latency and memory
+# """
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from bench_common import best_of, report
+
+from threat_intel import ThreatIntelIndex, load_feed
+
+THREAT_TYPES = ["botnet", "scanner", "malware_c2", "tor_exit", "phishing"]
+
+
+def build_feed(entries, seed=42):
+    #    """
+    #    Mostly single IPv4 addresses with some IPv4 CIDRs and IPv6 entries
+    #    """
+    rng = random.Random(seed)
+    feed = []
+    for _ in range(entries):
+        roll = rng.random()
+        threat_type = rng.choice(THREAT_TYPES)
+        if roll < 0.95:
+            value = rng.getrandbits(32)
+            indicator = ".".join(str((value >> shift) & 255) for shift in (24, 16, 8, 0))
+        elif roll < 0.99:
+            prefix = rng.randint(16, 30)
+            indicator = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/{prefix}"
+        else:
+            indicator = f"2001:db8:{rng.getrandbits(16):x}:{rng.getrandbits(16):x}::/{rng.choice([48, 64, 128])}"
+        feed.append((indicator, threat_type))
+    return feed
+
+
+def queries(feed, count, seed=7):
+    #    """
+    #    Half known single addresses, half random IPv4 addresses
+    #    """
+    rng = random.Random(seed)
+    known = [indicator for indicator, _ in feed if "/" not in indicator]
+    result = []
+    for n in range(count):
+        if n % 2:
+            result.append(rng.choice(known))
+        else:
+            value = rng.getrandbits(32)
+            result.append(".".join(str((value >> shift) & 255) for shift in (24, 16, 8, 0)))
+    return result
+
+
+def allocated(func):
+    #    """
+    #    Return func's result and the bytes it left allocated
+    #    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    feed = build_feed(args.entries)
+    with tempfile.TemporaryDirectory() as directory:
+        feed_path = os.path.join(directory, "feed.csv")
+        index_path = os.path.join(directory, "feed.qbti")
+        with open(feed_path, "w") as feed_file:
+            feed_file.writelines(f"{indicator},{threat_type}\n" for indicator, threat_type in feed)
+
+        start = time.perf_counter()
+        built = ThreatIntelIndex.build(load_feed(feed_path))
+        build_seconds = time.perf_counter() - start
+        built.save(index_path)
+
+        start = time.perf_counter()
+        mapped, mapped_bytes = allocated(lambda: ThreatIntelIndex.open(index_path))
+        open_seconds = time.perf_counter() - start
+
+        _, built_bytes = allocated(
+            lambda: ThreatIntelIndex.build(feed[: args.entries // 10])
+        )
+        _, dict_bytes = allocated(
+            lambda: {indicator: t for indicator, t in feed[: args.entries // 10]}
+        )
+
+        sample = queries(feed, args.lookups)
+        for address in sample[:1000]:
+            assert mapped.lookup(address) == built.lookup(address)
+        in_memory = best_of(lambda: [built.lookup(a) for a in sample], args.repeat)
+        memory_mapped = best_of(lambda: [mapped.lookup(a) for a in sample], args.repeat)
+        hits = sum(1 for a in sample if mapped.lookup(a) is not None)
+
+        report(
+            f"threat intel index, {args.entries:,} entries, {len(built):,} ranges",
+            [
+                ("feed parse + build", f"{build_seconds:.2f} s"),
+                ("index file size", f"{os.path.getsize(index_path) / 1e6:.1f} MB"),
+                ("mmap open (cold start)", f"{open_seconds * 1e3:.2f} ms"),
+                ("heap after mmap open", f"{mapped_bytes / 1e3:.1f} KB"),
+                ("heap per entry, built index", f"{built_bytes * 10 / args.entries:.1f} B"),
+                ("heap per entry, exact-match dict table", f"{dict_bytes * 10 / args.entries:.1f} B"),
+                ("lookup, in-memory arrays", f"{in_memory / len(sample) * 1e6:.2f} us"),
+                ("lookup, memory-mapped", f"{memory_mapped / len(sample) * 1e6:.2f} us"),
+                ("hit rate", f"{hits / len(sample):.0%}"),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# """
+# Compare per-event datetime formatting of timestamps and index names with
+# the cached second prefix and per-batch monthly index names
+# """
+
+import argparse
+from datetime import datetime
+
+from bench_common import best_of, report
+
+import log_processor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--events-per-second", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # CloudWatch batches are in time order with many events per second
+    step = max(1, 1000 // args.events_per_second)
+    timestamps = [1714564800000 + n * step for n in range(args.events)]
+    for timestamp in timestamps[:1000]:
+        assert log_processor.format_event_timestamp(
+            timestamp
+        ) == datetime.fromtimestamp(timestamp / 1000).isoformat()
+
+    per_event = best_of(
+        lambda: [datetime.fromtimestamp(t / 1000).isoformat() for t in timestamps],
+        args.repeat,
+    )
+    cached = best_of(
+        lambda: [log_processor.format_event_timestamp(t) for t in timestamps],
+        args.repeat,
+    )
+
+    events = [{"timestamp": log_processor.format_event_timestamp(t)} for t in timestamps]
+    wall_clock = best_of(
+        lambda: [
+            (f"quantumballot-security-{datetime.now().strftime('%Y-%m')}", e)
+            for e in events
+        ],
+        args.repeat,
+    )
+    per_batch = best_of(
+        lambda: list(
+            log_processor.monthly_index_names("quantumballot-security", events)
+        ),
+        args.repeat,
+    )
+
+    report(
+        f"timestamp formatting, {args.events} events at "
+        f"{args.events_per_second}/s",
+        [
+            ("fromtimestamp().isoformat() events/s", f"{args.events / per_event:,.0f}"),
+            ("cached second prefix events/s", f"{args.events / cached:,.0f}"),
+            ("speedup", f"{per_event / cached:.1f}x"),
+            ("now().strftime() index names/s", f"{args.events / wall_clock:,.0f}"),
+            ("per-batch monthly index names/s", f"{args.events / per_batch:,.0f}"),
+            ("speedup", f"{wall_clock / per_batch:.1f}x"),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
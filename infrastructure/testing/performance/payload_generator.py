@@ -0,0 +1,57 @@
+# """
+# Synthetic CloudWatch Logs subscription payloads for replay benchmarks
+# """
+
+import json
+import random
+
+from bench_common import build_corpus
+
+from corpus import ATTACK_LINES, CLEAN_LINES
+from payloads import LOG_GROUP, build_log_data, encode_log_data
+
+LEVELS = ["INFO", "INFO", "INFO", "WARN", "ERROR", "DEBUG"]
+
+
+def generate_messages(batch_size, json_rate=0.3, attack_rate=0.05, seed=42):
+    #    """
+    #    Build log lines with the given fractions of JSON lines and attack lines
+    #    """
+    rng = random.Random(seed)
+    attacker_ips = [f"203.0.113.{n}" for n in range(1, 51)]
+    lines = build_corpus(ATTACK_LINES, CLEAN_LINES, batch_size, attack_rate, seed)
+
+    messages = []
+    for line in lines:
+        if rng.random() < json_rate:
+            record = {
+                "level": rng.choice(LEVELS),
+                "message": line,
+                "user": f"voter-{rng.randrange(10000)}",
+                "ip_address": rng.choice(attacker_ips)
+                if line in ATTACK_LINES
+                else f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+                "request_id": f"{rng.getrandbits(64):016x}",
+            }
+            messages.append(json.dumps(record))
+        else:
+            messages.append(line)
+    return messages
+
+
+def generate_batches(
+    batches,
+    batch_size,
+    json_rate=0.3,
+    attack_rate=0.05,
+    log_group=LOG_GROUP,
+    seed=42,
+    start_ms=1714564800000,
+):
+    #    """
+    #    Yield (event count, Lambda event) pairs carrying gzip+base64 awslogs.data
+    #    """
+    for number in range(batches):
+        messages = generate_messages(batch_size, json_rate, attack_rate, seed + number)
+        log_data = build_log_data(messages, log_group, start_ms + number * 60000)
+        yield len(messages), {"awslogs": {"data": encode_log_data(log_data)}}